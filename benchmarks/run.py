@@ -0,0 +1,297 @@
+"""Benchmark suite of parsing, factorizing, convergence and sampling on
+synthetic ERRORR sections, with the results saved as JSON to compare commits
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --compare base.json results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+import numpy as np
+from synthetic import synthetic_section
+
+# bump when the layout of the results file changes
+RESULTS_VERSION = 1
+
+# numbers of groups of the synthetic sections, from a coarse library
+# structure to fine-group structures
+DEFAULT_GROUPS = (30, 300, 1500, 3000)
+
+# number of realizations drawn by the sampling benchmark
+NUM_SAMPLES = 1000
+
+# a benchmark that takes this much longer, or this much more memory, than
+# the baseline is a regression
+DEFAULT_THRESHOLD = 1.25
+
+
+def _parse_covariance(data):
+    from pyerr import Covariance
+
+    indices = (0, data.num_groups)
+    return lambda: Covariance(data.covariance_lines, data.num_groups, indices)
+
+
+def _section(data):
+    from pyerr import Section
+
+    return lambda: Section(data.energy_lines, data.mean_lines, data.covariance_lines)
+
+
+def _get_eigenvalues(data):
+    section = _section(data)()
+
+    def run():
+        section.clear_cache()
+        section.get_eigenvalues()
+
+    return run
+
+
+def _convergence(data):
+    section = _section(data)()
+    section.get_eigenvalues()
+    return section.quantify_uncertainty_convergence
+
+
+def _pca_realizations(data):
+    section = _section(data)()
+    section.get_eigenvalues()
+    return lambda: section.get_pca_realizations(NUM_SAMPLES, seed=0)
+
+
+# each benchmark takes the synthetic section and returns the function that
+# is timed, after setting up what it needs
+BENCHMARKS = {
+    "parse_covariance": _parse_covariance,
+    "section": _section,
+    "get_eigenvalues": _get_eigenvalues,
+    "quantify_uncertainty_convergence": _convergence,
+    "get_pca_realizations": _pca_realizations,
+}
+
+
+def check_section(data):
+    """Function to check that a synthetic section is parsed back to the
+    values that were written, so that the benchmarks time the real thing
+
+    Parameters
+    ----------
+    data : SimpleNamespace
+        the synthetic section
+
+    Returns
+    -------
+    None
+
+    """
+    section = _section(data)()
+    for name in ("group_boundaries", "mean_values", "covariance_matrix"):
+        if not np.allclose(getattr(section, name), getattr(data, name), rtol=1e-6, atol=1e-9):
+            raise AssertionError(f"The synthetic {name} is not parsed back correctly")
+
+
+def run_benchmark(run, repeat):
+    """Function to time a benchmark and measure its peak memory
+
+    A first run warms up the caches and the lazy imports, the peak memory
+    is measured with tracemalloc in a second run, and the timed runs are
+    without tracemalloc.
+
+    Parameters
+    ----------
+    run : callable
+        the function that is timed
+
+    repeat : int
+        the number of timed runs
+
+    Returns
+    -------
+    dictionary
+        the time of each run, their median and minimum in seconds, and the
+        peak memory allocated during a run in bytes
+
+    """
+    run()
+    tracemalloc.start()
+    run()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {
+        "seconds": times,
+        "median_seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def run(groups=DEFAULT_GROUPS, benchmarks=None, repeat=5, startup=False):
+    """Function to run the benchmark suite
+
+    Parameters
+    ----------
+    groups : list, optional, default is DEFAULT_GROUPS
+        the numbers of groups of the synthetic sections
+
+    benchmarks : list, optional, default is None
+        the names of the benchmarks to run, from BENCHMARKS. If None, all
+        of them are run
+
+    repeat : int, optional, default is 5
+        the number of timed runs of each benchmark
+
+    startup : bool, optional, default is False
+        if True, the import times of startup.py are measured as well
+
+    Returns
+    -------
+    dictionary
+        the metadata of the run and a list of results, one for each
+        benchmark and number of groups
+
+    """
+    import pyerr
+
+    if benchmarks is None:
+        benchmarks = list(BENCHMARKS)
+    results = []
+    for num_groups in groups:
+        data = synthetic_section(num_groups)
+        check_section(data)
+        for name in benchmarks:
+            result = run_benchmark(BENCHMARKS[name](data), repeat)
+            results.append({"benchmark": name, "num_groups": num_groups, **result})
+            print(
+                f"{name:34s} {num_groups:5d} groups {result['median_seconds']:10.4f} s "
+                f"{result['peak_memory_bytes'] / 1024**2:10.1f} MiB",
+                flush=True,
+            )
+
+    output = {"version": RESULTS_VERSION, "metadata": _metadata(pyerr, repeat), "results": results}
+    if startup:
+        import startup as startup_benchmark
+
+        output["startup"] = startup_benchmark.run(repeat)["results"]
+    return output
+
+
+def compare(baseline, results, threshold=DEFAULT_THRESHOLD):
+    """Function to compare two results files by the median time and the
+    peak memory of each benchmark that is in both
+
+    Parameters
+    ----------
+    baseline : dictionary
+        the results of the baseline, for example of the main branch
+
+    results : dictionary
+        the new results
+
+    threshold : float, optional, default is DEFAULT_THRESHOLD
+        ratio of the new median time or peak memory to the baseline one
+        above which a benchmark is a regression
+
+    Returns
+    -------
+    list
+        one dictionary per benchmark and number of groups, with the time
+        and memory ratios and whether it is a regression
+
+    """
+    base = {(r["benchmark"], r["num_groups"]): r for r in baseline["results"]}
+    rows = []
+    for result in results["results"]:
+        key = (result["benchmark"], result["num_groups"])
+        if key not in base:
+            continue
+        time_ratio = result["median_seconds"] / max(base[key]["median_seconds"], 1e-12)
+        memory_ratio = result["peak_memory_bytes"] / max(base[key]["peak_memory_bytes"], 1)
+        rows.append(
+            {
+                "benchmark": key[0],
+                "num_groups": key[1],
+                "time_ratio": time_ratio,
+                "memory_ratio": memory_ratio,
+                "regression": time_ratio > threshold or memory_ratio > threshold,
+            }
+        )
+    return rows
+
+
+def _metadata(pyerr, repeat):
+    """Function to describe the run, so that results can be matched to the
+    commit and the machine"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "pyerr_version": pyerr.__version__,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python_version": platform.python_version(),
+        "numpy_version": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "num_samples": NUM_SAMPLES,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", type=int, nargs="+", default=list(DEFAULT_GROUPS))
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--startup", action="store_true", help="also time the imports")
+    parser.add_argument("--output", help="JSON file of the results")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASELINE", "RESULTS"), help="compare two JSON files"
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.compare is not None:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            results = json.load(f)
+        rows = compare(baseline, results, args.threshold)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(
+                f"{row['benchmark']:34s} {row['num_groups']:5d} groups "
+                f"time x{row['time_ratio']:6.2f}  memory x{row['memory_ratio']:6.2f}  {flag}"
+            )
+        return 1 if any(row["regression"] for row in rows) else 0
+
+    results = run(args.groups, args.benchmarks, args.repeat, args.startup)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
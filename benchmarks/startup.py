@@ -0,0 +1,112 @@
+"""Benchmark of the time it takes to import pyerr, each statement in a new
+interpreter, with the heavy modules that each statement imports
+
+    python benchmarks/startup.py --repeat 20 --output startup.json
+"""
+
+import sys
+import json
+import argparse
+import platform
+import subprocess
+import statistics
+
+# statements that are timed, from the cheapest to the most expensive
+STATEMENTS = {
+    "import pyerr": "import pyerr",
+    "import Section": "from pyerr import Section",
+    "import ErrorrOutput": "from pyerr import ErrorrOutput",
+    "import process_tapes": "from pyerr import process_tapes",
+}
+
+# modules that "import pyerr" should not import
+HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "fortranformat", "ENDFtk", "scipy"]
+
+# the code run in each interpreter, which prints the time and the modules
+TEMPLATE = """
+import sys, json, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [name for name in {modules!r} if name in sys.modules]]))
+"""
+
+
+def time_statement(statement, repeat):
+    """Function to time a statement in repeat new interpreters
+
+    Parameters
+    ----------
+    statement : str
+        the import statement
+
+    repeat : int
+        the number of interpreters
+
+    Returns
+    -------
+    dictionary
+        the median and the smallest time in seconds, and the heavy modules
+        that the statement imported
+
+    """
+    code = TEMPLATE.format(statement=statement, modules=HEAVY_MODULES)
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        seconds, modules = json.loads(result.stdout)
+        times.append(seconds)
+    return {
+        "median_seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "heavy_modules": modules,
+    }
+
+
+def run(repeat=10):
+    """Function to run the startup benchmark
+
+    Parameters
+    ----------
+    repeat : int, optional, default is 10
+        the number of interpreters each statement is timed in
+
+    Returns
+    -------
+    dictionary
+        the results of each statement, with the pyerr and Python versions
+
+    """
+    import pyerr
+
+    results = {name: time_statement(statement, repeat) for name, statement in STATEMENTS.items()}
+    return {
+        "pyerr_version": pyerr.__version__,
+        "python_version": platform.python_version(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="JSON file of the results, printed if not given")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    for name, result in results["results"].items():
+        modules = ", ".join(result["heavy_modules"]) or "-"
+        print(f"{name:24s} {1e3 * result['median_seconds']:8.1f} ms   {modules}")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    # "import pyerr" must stay free of the heavy modules
+    return 1 if len(results["results"]["import pyerr"]["heavy_modules"]) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
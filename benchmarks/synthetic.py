@@ -0,0 +1,196 @@
+"""Synthetic ERRORR sections with any number of groups, for the benchmarks
+
+The energy grid (MF1 MT451), the mean values (MF3) and the relative
+covariance matrix (MF33) are written in the same fixed-width ENDF format as
+an ERRORR output, with one LIST record of full rows per group.
+"""
+
+import numpy as np
+from types import SimpleNamespace
+
+# MAT, MT and ZA of the synthetic material
+MAT = 9999
+MT = 18
+ZA = 92235.0
+AWR = 233.0248
+
+# lowest and highest energy of the group boundaries, in eV
+ENERGY_RANGE = (1e-5, 2e7)
+
+# correlation length of the covariance matrix, in lethargy
+CORRELATION_LENGTH = 3.0
+
+# values with a smaller magnitude are written as zero
+SMALLEST_VALUE = 1e-9
+
+_BLANK = ord(" ")
+_ZERO = ord("0")
+
+
+def float_fields(values):
+    """Function to format numbers as 11 character ENDF floats, such as
+    " 2.487540+0", vectorized over all of the numbers
+
+    Parameters
+    ----------
+    values : np.array
+        the numbers, whose exponents have to be between -9 and 9
+
+    Returns
+    -------
+    np.array
+        2D uint8 array of shape (len(values), 11) with the characters
+
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    magnitude = np.abs(values)
+    nonzero = magnitude >= SMALLEST_VALUE
+
+    exponent = np.zeros(len(values), dtype=np.int64)
+    exponent[nonzero] = np.floor(np.log10(magnitude[nonzero]))
+    digits = np.zeros(len(values), dtype=np.int64)
+    digits[nonzero] = np.rint(magnitude[nonzero] / 10.0 ** exponent[nonzero] * 1e6)
+    # rounding can carry into another digit, as in 9.9999996 -> 10.000000
+    carry = digits >= 10**7
+    digits[carry] //= 10
+    exponent[carry] += 1
+    if np.any(np.abs(exponent) > 9):
+        raise ValueError("Only exponents between -9 and 9 can be written")
+
+    fields = np.full((len(values), 11), _BLANK, dtype=np.uint8)
+    fields[values <= -SMALLEST_VALUE, 0] = ord("-")
+    fields[:, 2] = ord(".")
+    for i, column in enumerate([1, 3, 4, 5, 6, 7, 8]):
+        fields[:, column] = _ZERO + digits // 10 ** (6 - i) % 10
+    fields[:, 9] = np.where(exponent < 0, ord("-"), ord("+"))
+    fields[:, 10] = _ZERO + np.abs(exponent)
+    return fields
+
+
+def int_fields(values):
+    """Function to format integers as 11 character ENDF fields
+
+    Parameters
+    ----------
+    values : list
+        the integers
+
+    Returns
+    -------
+    np.array
+        2D uint8 array of shape (len(values), 11) with the characters
+
+    """
+    text = "".join(f"{int(value):11d}" for value in values)
+    return np.frombuffer(text.encode("ascii"), dtype=np.uint8).reshape((-1, 11))
+
+
+def cont_fields(c1, c2, l1, l2, n1, n2):
+    """Function to format a CONT record, two floats and four integers"""
+    return np.concatenate([float_fields([c1, c2]), int_fields([l1, l2, n1, n2])])
+
+
+def format_lines(fields, mf, mt):
+    """Function to put fields six to a line, with the MAT, MF, MT and line
+    number in columns 67-80
+
+    Parameters
+    ----------
+    fields : np.array
+        2D uint8 array of shape (num_fields, 11)
+
+    mf : int
+        the MF number
+
+    mt : int
+        the MT number
+
+    Returns
+    -------
+    list
+        the lines
+
+    """
+    num_lines = -(-len(fields) // 6)
+    padded = np.full((num_lines * 6, 11), _BLANK, dtype=np.uint8)
+    padded[: len(fields)] = fields
+    body = padded.reshape((num_lines, 66)).tobytes().decode("ascii")
+    control = f"{MAT:4d}{mf:2d}{mt:3d}"
+    return [
+        body[66 * i : 66 * (i + 1)] + control + f"{(i + 1) % 100000:5d}" for i in range(num_lines)
+    ]
+
+
+def send_lines(mf):
+    """Function to get the SEND line and the empty string after it, as at
+    the end of the content of a section"""
+    return [" " * 66 + f"{MAT:4d}{mf:2d}  099999", ""]
+
+
+def synthetic_section(num_groups, seed=0):
+    """Function to create the lines of a synthetic ERRORR section
+
+    The groups are equally spaced in lethargy. The relative uncertainty
+    grows with the energy, and the correlation decays exponentially with
+    the lethargy between the groups, so the matrix is positive definite.
+
+    Parameters
+    ----------
+    num_groups : int
+        the number of energy groups
+
+    seed : int, optional, default is 0
+        seed of the small random variations of the mean values
+
+    Returns
+    -------
+    SimpleNamespace
+        energy_lines, mean_lines and covariance_lines of the section, and
+        the group_boundaries, mean_values and covariance_matrix that were
+        written, before they were rounded to the 7 significant digits of
+        the file
+
+    """
+    rng = np.random.default_rng(seed)
+    boundaries = np.geomspace(*ENERGY_RANGE, num_groups + 1)
+    lethargy = np.log(np.sqrt(boundaries[:-1] * boundaries[1:]))
+    mean_values = (2.0 + 50.0 / np.sqrt(np.exp(lethargy))) * rng.uniform(0.95, 1.05, num_groups)
+    fraction = (lethargy - lethargy[0]) / (lethargy[-1] - lethargy[0])
+    uncertainty = 0.01 + 0.1 * fraction
+    distance = np.abs(lethargy[:, np.newaxis] - lethargy[np.newaxis, :])
+    covariance = np.outer(uncertainty, uncertainty) * np.exp(-distance / CORRELATION_LENGTH)
+
+    energy_fields = np.concatenate(
+        [
+            cont_fields(ZA, AWR, 0, 0, -11, 0),
+            cont_fields(0.0, 0.0, num_groups, 0, num_groups + 1, 0),
+            float_fields(boundaries),
+        ]
+    )
+    mean_fields = np.concatenate(
+        [cont_fields(ZA, 0.0, 0, 0, num_groups, 0), float_fields(mean_values)]
+    )
+
+    # one LIST record per row, with its control line and the padded row
+    row_fields = -(-num_groups // 6) * 6
+    records = np.full((num_groups, 6 + row_fields, 11), _BLANK, dtype=np.uint8)
+    for row in range(num_groups):
+        records[row, :6] = cont_fields(0.0, 0.0, num_groups, 1, num_groups, row + 1)
+    records[:, 6 : 6 + num_groups] = float_fields(covariance).reshape((num_groups, num_groups, 11))
+    covariance_fields = np.concatenate(
+        [
+            cont_fields(ZA, AWR, 0, 0, 0, 1),
+            cont_fields(0.0, 0.0, 0, MT, 0, num_groups),
+            records.reshape((-1, 11)),
+        ]
+    )
+
+    return SimpleNamespace(
+        num_groups=num_groups,
+        energy_lines=format_lines(energy_fields, 1, 451) + send_lines(1),
+        mean_lines=format_lines(mean_fields, 3, MT) + send_lines(3),
+        covariance_lines=format_lines(covariance_fields, 33, MT) + send_lines(33),
+        group_boundaries=boundaries,
+        mean_values=mean_values,
+        covariance_matrix=covariance,
+    )
@@ -1,7 +1,49 @@
-__version__ = "1.1.2"
+__version__ = "1.24.0"
 
-from pyerr._energy import EnergyGroupControl, EnergyGroupValues, EnergyGroups
-from pyerr._mean import MeanControl, MeanValues, Mean
-from pyerr._covariance import CovarianceControl, Covariance
-from pyerr._section import Section
-from pyerr.errorr import ErrorrOutput
+import importlib
+
+# the module of each public name. The modules are only imported when a name
+# is first used, so "import pyerr" does not import pandas, pyarrow,
+# fortranformat or ENDFtk, or even the parsers
+_EXPORTS = {
+    "EnergyGroupControl": "pyerr._energy",
+    "EnergyGroupValues": "pyerr._energy",
+    "EnergyGroups": "pyerr._energy",
+    "MeanControl": "pyerr._mean",
+    "MeanValues": "pyerr._mean",
+    "Mean": "pyerr._mean",
+    "PackedSymmetricMatrix": "pyerr._packed",
+    "CSRMatrix": "pyerr._sparse",
+    "CovarianceError": "pyerr._validation",
+    "CovarianceWarning": "pyerr._validation",
+    "ValidationReport": "pyerr._validation",
+    "CovarianceControl": "pyerr._covariance",
+    "Covariance": "pyerr._covariance",
+    "Section": "pyerr._section",
+    "LazySections": "pyerr._sections",
+    "JointCovariance": "pyerr._joint",
+    "sample_sections": "pyerr._parallel",
+    "SectionCache": "pyerr._cache",
+    "TapeIndex": "pyerr._tape",
+    "export_parquet": "pyerr._export",
+    "ErrorrOutput": "pyerr.errorr",
+    "ErrorrTape": "pyerr.errorr",
+    "find_tapes": "pyerr._batch",
+    "process_tape": "pyerr._batch",
+    "process_tapes": "pyerr._batch",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'pyerr' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    # later lookups find the name without calling __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,4 @@
+import sys
+from pyerr._batch import main
+
+sys.exit(main())
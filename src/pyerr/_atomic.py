@@ -0,0 +1,67 @@
+import os
+import json
+import uuid
+import numpy as np
+
+
+def temporary_name(path):
+    """Function to get a unique temporary name next to a path
+
+    Parameters
+    ----------
+    path : str
+        the file that will be written
+
+    Returns
+    -------
+    str
+        a name in the same directory, so that renaming it is atomic
+
+    """
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+
+
+def write_json(path, content):
+    """Function to write a JSON file under a temporary name and rename it,
+    so that other processes never read a partial file
+
+    Parameters
+    ----------
+    path : str
+        the file to write
+
+    content : dictionary or list
+        the JSON content
+
+    Returns
+    -------
+    None
+
+    """
+    temporary = temporary_name(path)
+    with open(temporary, "w") as f:
+        json.dump(content, f)
+    os.replace(temporary, path)
+
+
+def write_array(path, array):
+    """Function to write an array to a .npy file under a temporary name and
+    rename it, so that other processes never read a partial file
+
+    Parameters
+    ----------
+    path : str
+        the .npy file to write
+
+    array : np.array
+        the array
+
+    Returns
+    -------
+    None
+
+    """
+    temporary = temporary_name(path)
+    with open(temporary, "wb") as f:
+        np.save(f, np.asarray(array))
+    os.replace(temporary, path)
@@ -0,0 +1,380 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyerr._tape import INDEX_SUFFIX
+from pyerr._validation import CovarianceError, VALIDATION_POLICIES
+from pyerr._covariance import STORAGE_MODES
+from pyerr.errorr import ErrorrTape, BACKENDS
+
+# columns of the table of sections written by process_tapes, one row per
+# section of every material of every tape
+SECTION_SCHEMA = pa.schema(
+    [
+        ("filename", pa.string()),
+        ("MAT", pa.int32()),
+        ("MF", pa.int32()),
+        ("MT", pa.int32()),
+        ("num_groups", pa.int32()),
+        ("lower_energy", pa.float64()),
+        ("upper_energy", pa.float64()),
+        ("max_uncertainty", pa.float64()),
+        ("ok", pa.bool_()),
+        ("num_bad_diagonal", pa.int32()),
+        ("max_asymmetry", pa.float64()),
+        ("num_bad_correlations", pa.int64()),
+        ("max_abs_correlation", pa.float64()),
+        ("num_negative_eigenvalues", pa.int32()),
+        ("min_eigenvalue", pa.float64()),
+        ("negative_eigenvalue_ratio", pa.float64()),
+        ("repairs", pa.string()),
+        ("seconds", pa.float64()),
+    ]
+)
+
+# columns of the table of tapes returned by process_tapes
+TIMING_COLUMNS = [
+    "filename",
+    "num_materials",
+    "num_sections",
+    "num_failed_sections",
+    "seconds",
+    "error",
+]
+
+# number of tapes queued for each worker process, which bounds the number
+# of results that are held in memory before they are written
+TASKS_PER_WORKER = 2
+
+
+def find_tapes(patterns=(), manifest=None):
+    """Function to get the tape file names of a batch from glob patterns
+    and/or a manifest file
+
+    Parameters
+    ----------
+    patterns : list, optional, default is ()
+        file names or glob patterns, where "**" matches any number of
+        directories. A pattern that matches nothing is kept as it is, so that
+        it is reported as a failure instead of being silently skipped
+
+    manifest : str or Path, optional, default is None
+        a text file with one tape file name per line. Blank lines and lines
+        starting with "#" are skipped, and relative file names are relative
+        to the directory of the manifest
+
+    Returns
+    -------
+    list
+        the tape file names, in order and without duplicates. Side-car index
+        files of the tapes are left out
+
+    """
+    filenames = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(str(pattern), recursive=True))
+        filenames.extend(matches if len(matches) > 0 else [str(pattern)])
+
+    if manifest is not None:
+        directory = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if len(line) > 0 and not line.startswith("#"):
+                    filenames.append(os.path.join(directory, line))
+
+    filenames = [name for name in filenames if not name.endswith(INDEX_SUFFIX)]
+    return list(dict.fromkeys(filenames))
+
+
+def process_tape(filename, eigenvalues=False, index_file=True, **options):
+    """Function to parse every section of every material of a tape and
+    summarize each of them in a row of the table of sections
+
+    The sections are parsed one at a time and dropped once they are
+    summarized, so the memory only grows with the largest section. A
+    section whose covariance matrix fails validation with the "raise"
+    policy gets a row with its validation report, and the other sections
+    are still parsed.
+
+    Parameters
+    ----------
+    filename : str or Path
+        the tape file name
+
+    eigenvalues : bool, optional, default is False
+        if True, the eigenvalues of each covariance matrix are checked as
+        well, which is O(n^3)
+
+    index_file : str, Path or bool, optional, default is True
+        side-car index file of the tape, see TapeIndex.open
+
+    **options
+        other arguments of ErrorrOutput, such as lower_limit, upper_limit,
+        engine, storage, backend and validation
+
+    Returns
+    -------
+    list, dictionary
+        the rows of the sections, with the columns of SECTION_SCHEMA, and
+        the row of the tape, with the columns of TIMING_COLUMNS. If the tape
+        cannot be read, the error is in the row of the tape
+
+    """
+    start = time.perf_counter()
+    rows = []
+    timing = dict.fromkeys(TIMING_COLUMNS)
+    timing.update(filename=str(filename), num_materials=0)
+    try:
+        tape = ErrorrTape(filename, index_file, **options)
+        timing["num_materials"] = len(tape.material_numbers)
+        for mat in tape.material_numbers:
+            output = tape[mat]
+            for mt in output.sections:
+                rows.append(_section_row(output, mt, eigenvalues))
+    except Exception as error:
+        timing["error"] = f"{type(error).__name__}: {error}"
+
+    timing["num_sections"] = len(rows)
+    timing["num_failed_sections"] = sum(not row["ok"] for row in rows)
+    timing["seconds"] = time.perf_counter() - start
+    return rows, timing
+
+
+def process_tapes(
+    filenames, output, max_workers=None, eigenvalues=False, index_file=True, **options
+):
+    """Function to parse many tapes in parallel and write a row for every
+    section of every material of them to a Parquet file
+
+    The tapes are spread over a process pool, with at most TASKS_PER_WORKER
+    tapes queued for each worker. The rows of each tape are written as one
+    row group as soon as the tape is done, in the order the tapes finish,
+    so the table is never held in memory. A tape that cannot be read does
+    not stop the batch, and its error is reported in the returned table. If
+    a worker process dies, for example killed for running out of memory,
+    the tapes it was running are retried one at a time in a new process,
+    and the other tapes go on in a new pool.
+
+    Parameters
+    ----------
+    filenames : list
+        the tape file names, for example from find_tapes
+
+    output : str or Path
+        the Parquet file to write the table of sections to, with the
+        columns of SECTION_SCHEMA
+
+    max_workers : int, optional, default is None
+        the number of worker processes. If None, os.cpu_count() is used. If 1,
+        the tapes are parsed in this process
+
+    eigenvalues : bool, optional, default is False
+        if True, the eigenvalues of each covariance matrix are checked as
+        well, which is O(n^3)
+
+    index_file : str, Path or bool, optional, default is True
+        if True, a side-car index file is written next to each tape the
+        first time it is read, see TapeIndex.open
+
+    **options
+        other arguments of ErrorrOutput, such as lower_limit, upper_limit,
+        engine, storage, backend and validation, used for every material
+
+    Returns
+    -------
+    pandas DataFrame
+        one row per tape, in the order of filenames, with the number of
+        materials, sections and sections that failed validation, the time
+        it took in seconds, and the error if the tape could not be read
+
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    filenames = [str(filename) for filename in filenames]
+
+    timings = {}
+    with pq.ParquetWriter(str(output), SECTION_SCHEMA) as writer:
+        tasks = _run_tapes(filenames, max_workers, eigenvalues, index_file, options)
+        for rows, timing in tasks:
+            if len(rows) > 0:
+                writer.write_table(pa.Table.from_pylist(rows, schema=SECTION_SCHEMA))
+            timings[timing["filename"]] = timing
+
+    return pd.DataFrame([timings[filename] for filename in filenames], columns=TIMING_COLUMNS)
+
+
+def main(argv=None):
+    """Function to run process_tapes from the command line, as
+    python -m pyerr
+
+    Parameters
+    ----------
+    argv : list, optional, default is None
+        the command line arguments. If None, sys.argv[1:] is used
+
+    Returns
+    -------
+    int
+        the exit status, 1 if a tape could not be read and 0 otherwise
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m pyerr",
+        description="Parse many ERRORR output tapes in parallel and write a table of their "
+        "sections to a Parquet file",
+    )
+    parser.add_argument("tapes", nargs="*", help="tape file names or glob patterns")
+    parser.add_argument("-m", "--manifest", help="file with one tape file name per line")
+    parser.add_argument("-o", "--output", required=True, help="Parquet file of the sections")
+    parser.add_argument("-t", "--timings", help="CSV file of the time and errors of each tape")
+    parser.add_argument("-j", "--workers", type=int, help="number of worker processes")
+    parser.add_argument("--lower-limit", type=float, help="lower energy limit, in eV")
+    parser.add_argument("--upper-limit", type=float, help="upper energy limit, in eV")
+    parser.add_argument("--storage", choices=STORAGE_MODES, default="dense")
+    parser.add_argument("--validation", choices=VALIDATION_POLICIES, default="raise")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument(
+        "--eigenvalues", action="store_true", help="check the eigenvalues of each matrix"
+    )
+    parser.add_argument(
+        "--no-index-file", action="store_true", help="do not write side-car index files"
+    )
+    args = parser.parse_args(argv)
+
+    filenames = find_tapes(args.tapes, args.manifest)
+    if len(filenames) == 0:
+        parser.error("no tapes given")
+
+    timings = process_tapes(
+        filenames,
+        args.output,
+        max_workers=args.workers,
+        eigenvalues=args.eigenvalues,
+        index_file=not args.no_index_file,
+        lower_limit=args.lower_limit,
+        upper_limit=args.upper_limit,
+        storage=args.storage,
+        validation=args.validation,
+        backend=args.backend,
+    )
+    if args.timings is not None:
+        timings.to_csv(args.timings, index=False)
+
+    failed = timings[timings["error"].notna()]
+    print(
+        f"{len(timings)} tapes, {timings['num_sections'].sum()} sections "
+        f"({timings['num_failed_sections'].sum()} failed validation) "
+        f"in {timings['seconds'].sum():.1f} s"
+    )
+    for filename, error in zip(failed["filename"], failed["error"]):
+        print(f"{filename}: {error}", file=sys.stderr)
+    return 1 if len(failed) > 0 else 0
+
+
+def _section_row(output, mt, eigenvalues):
+    """Function to parse one section of an output and get its row"""
+    start = time.perf_counter()
+    row = {"filename": str(output.filename), "MAT": output.mat}
+    row.update(MF=output._section_files[mt], MT=mt)
+    try:
+        # the section is not kept in output.sections
+        section = output.build_section(mt)
+    except CovarianceError as error:
+        section = None
+        report = error.report
+        row.update(lower_energy=np.nan, upper_energy=np.nan, max_uncertainty=np.nan)
+    else:
+        report = section.validation_report
+        boundaries = section.group_boundaries
+        row.update(
+            lower_energy=boundaries[0],
+            upper_energy=boundaries[-1],
+            max_uncertainty=np.max(section.uncertainty, initial=0.0),
+        )
+
+    fields = report.as_dict()
+    del fields["label"]
+    row.update(fields)
+    if eigenvalues and section is not None:
+        # the eigenvalues of the matrix that is used, after any repairs
+        checked = section.validate(eigenvalues=True)
+        row["num_negative_eigenvalues"] = checked.num_negative_eigenvalues
+        row["min_eigenvalue"] = checked.min_eigenvalue
+        row["negative_eigenvalue_ratio"] = checked.negative_eigenvalue_ratio
+        row["ok"] = row["ok"] and checked.num_negative_eigenvalues == 0
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def _failed_tape(filename, error):
+    """Function to get the result of a tape whose worker process failed"""
+    timing = dict.fromkeys(TIMING_COLUMNS)
+    timing.update(
+        filename=str(filename),
+        num_materials=0,
+        num_sections=0,
+        num_failed_sections=0,
+        error=f"{type(error).__name__}: {error}",
+    )
+    return [], timing
+
+
+def _run_tapes(filenames, max_workers, eigenvalues, index_file, options):
+    """Function to yield the results of process_tape for each tape as they
+    finish, with a bounded number of tapes queued on the process pool. When
+    a worker dies, the pool is broken and every tape on it fails, so those
+    tapes are retried alone, and the pool is started again for the rest"""
+    if max_workers == 1:
+        for filename in filenames:
+            yield process_tape(filename, eigenvalues, index_file, **options)
+        return
+
+    queue = iter(filenames)
+    while True:
+        broken = []
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+
+            def submit(count):
+                futures = {}
+                for filename in itertools.islice(queue, count):
+                    future = pool.submit(
+                        process_tape, filename, eigenvalues, index_file, **options
+                    )
+                    futures[future] = filename
+                return futures
+
+            pending = submit(TASKS_PER_WORKER * max_workers)
+            while len(pending) > 0:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    filename = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        broken.append(filename)
+                        continue
+                    except Exception as error:
+                        result = _failed_tape(filename, error)
+                    yield result
+                if len(broken) == 0:
+                    pending.update(submit(len(done)))
+
+        if len(broken) == 0:
+            return
+        for filename in broken:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                future = pool.submit(process_tape, filename, eigenvalues, index_file, **options)
+                try:
+                    result = future.result()
+                except Exception as error:
+                    result = _failed_tape(filename, error)
+            yield result
@@ -0,0 +1,420 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from pyerr._atomic import write_json, write_array
+
+# bump when the layout of the cache changes, so that old entries are not read
+CACHE_VERSION = 1
+
+# default size limit of the cache directory, in bytes
+DEFAULT_MAX_BYTES = 4 * 1024**3
+
+# arrays stored for every section, and the optional eigenpairs
+SECTION_ARRAYS = ("group_boundaries", "mean_values", "covariance_matrix")
+EIGEN_ARRAYS = ("eig_vals", "eig_vects")
+
+# file hashes by (path, size, modification time), so that a file is only
+# hashed once per process
+_HASHES = {}
+
+
+def default_cache_dir():
+    """Function to get the default cache directory, which is $PYERR_CACHE_DIR
+    if set, and otherwise ~/.cache/pyerr
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    str
+        the cache directory
+
+    """
+    default = os.path.join(os.path.expanduser("~"), ".cache", "pyerr")
+    return os.environ.get("PYERR_CACHE_DIR", default)
+
+
+def file_hash(filename, block_size=1024**2):
+    """Function to get the SHA-256 hash of the content of a file
+
+    Parameters
+    ----------
+    filename : str or Path
+        the file to hash
+
+    block_size : int, optional, default is 1 MiB
+        number of bytes read at a time
+
+    Returns
+    -------
+    str
+        the hex digest
+
+    """
+    stat = os.stat(filename)
+    memo_key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _HASHES:
+        digest = hashlib.sha256()
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        _HASHES[memo_key] = digest.hexdigest()
+    return _HASHES[memo_key]
+
+
+class SectionCache:
+    """
+    Class to store parsed ERRORR sections on disk in numpy's binary format,
+    so that opening the same file again does not re-read the text
+
+    Each entry is a directory named by the hash of the file content, the
+    energy limits and the validation policy, with an index of the sections in the file and one
+    sub-directory of .npy files per section. Sections are added to an entry as
+    they are parsed. Files are written under a temporary name and then
+    renamed, so that processes sharing a cache never read partial files. When
+    the cache grows beyond max_bytes, the least recently used entries are
+    removed. The size is only checked when the index of a file is stored,
+    since it walks the whole cache directory, and not for every section.
+
+    Parameters
+    ----------
+    directory : str or Path, optional, default is None
+        the cache directory. If None, default_cache_dir() is used
+
+    max_bytes : int, optional, default is DEFAULT_MAX_BYTES
+        size limit of the cache directory, in bytes
+
+    mmap_mode : str, optional, default is "r"
+        memory map mode of the loaded arrays, see numpy.load. The default maps
+        the arrays read-only, so that loading does not copy them. If None,
+        the arrays are read into memory
+
+    Attributes
+    ----------
+    directory : str
+        the cache directory
+
+    max_bytes : int
+        size limit of the cache directory, in bytes
+
+    mmap_mode : str
+        memory map mode of the loaded arrays
+
+    Methods
+    -------
+    key
+        Function to get the cache key of a file and energy limits
+
+    load_index
+        Function to load the sections in a cached file
+
+    store_index
+        Function to store the sections in a file
+
+    load_section
+        Function to load a cached section
+
+    store_section
+        Function to store a parsed section
+
+    evict
+        Function to remove the least recently used entries
+
+    size
+        Function to get the size of the cache
+
+    clear
+        Function to remove every entry
+
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, mmap_mode="r"):
+        self.directory = str(directory) if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.mmap_mode = mmap_mode
+
+    def __repr__(self):
+        return f"SectionCache(directory={self.directory!r}, max_bytes={self.max_bytes})"
+
+    def key(self, filename, lower_limit=None, upper_limit=None, mat=None, validation="raise"):
+        """Function to get the cache key of a file, material, energy limits
+        and validation policy
+
+        Parameters
+        ----------
+        filename : str or Path
+            the ERRORR output file name
+
+        lower_limit : float, optional, default is None
+            the lower energy limit in eV
+
+        upper_limit : float, optional, default is None
+            the upper energy limit in eV
+
+        mat : int, optional, default is None
+            the MAT number, for tapes with more than one material. None is
+            the first material on the tape
+
+        validation : str, optional, default is "raise"
+            the validation policy the sections are parsed with, since the
+            "clip" and "nearest_psd" policies store repaired matrices
+
+        Returns
+        -------
+        str
+            the key, which is also the name of the entry directory
+
+        """
+        description = (
+            f"{CACHE_VERSION}:{file_hash(filename)}:{lower_limit!r}:{upper_limit!r}:{validation}"
+        )
+        if mat is not None:
+            description += f":{mat}"
+        return hashlib.sha256(description.encode()).hexdigest()[:32]
+
+    def load_index(self, key):
+        """Function to load the sections in a cached file
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+
+        Returns
+        -------
+        list or None
+            (MF, MT) pairs of the sections in the file, or None if the file
+            is not in the cache
+
+        """
+        path = os.path.join(self.directory, key, "index.json")
+        try:
+            with open(path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get("version") != CACHE_VERSION:
+            return None
+
+        # mark the entry as recently used
+        os.utime(path)
+        return [tuple(numbers) for numbers in index["sections"]]
+
+    def store_index(self, key, section_numbers, filename=None):
+        """Function to store the sections in a file
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+
+        section_numbers : list
+            (MF, MT) pairs of the sections in the file
+
+        filename : str or Path, optional, default is None
+            the ERRORR output file name, only kept for reference
+
+        Returns
+        -------
+        None
+
+        """
+        index = {
+            "version": CACHE_VERSION,
+            "filename": str(filename),
+            "sections": [[int(mf), int(mt)] for mf, mt in section_numbers],
+        }
+        entry = os.path.join(self.directory, key)
+        os.makedirs(entry, exist_ok=True)
+        write_json(os.path.join(entry, "index.json"), index)
+        self.evict(keep=(key,))
+
+    def load_section(self, key, mt, scratch_dir=None):
+        """Function to load a cached section
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+
+        mt : int
+            the MT number of the section
+
+        scratch_dir : str or Path, optional, default is None
+            scratch directory of the derived matrices of the section,
+            see Section
+
+        Returns
+        -------
+        Section or None
+            the section, with its eigenpairs if they were stored, or None if
+            the section is not in the cache
+
+        """
+        from pyerr._section import Section
+
+        section_dir = os.path.join(self.directory, key, f"MT{mt}")
+        try:
+            with open(os.path.join(section_dir, "meta.json")) as f:
+                meta = json.load(f)
+            arrays = {name: self._load_array(section_dir, name) for name in SECTION_ARRAYS}
+            if meta.get("eig_info") is not None:
+                arrays.update({name: self._load_array(section_dir, name) for name in EIGEN_ARRAYS})
+        except (OSError, ValueError):
+            return None
+
+        section = Section.from_arrays(
+            meta["MAT"],
+            meta["MF"],
+            meta["MT"],
+            incident_energy=meta["incident_energy"],
+            scratch_dir=scratch_dir,
+            **arrays,
+        )
+        if meta.get("eig_info") is not None:
+            section.__dict__["eig_info"] = meta["eig_info"]
+        return section
+
+    def store_section(self, key, section, eigenpairs=True):
+        """Function to store a parsed section
+
+        Parameters
+        ----------
+        key : str
+            the cache key
+
+        section : Section
+            the section to store
+
+        eigenpairs : bool, optional, default is True
+            if True and the eigenpairs of the section have been computed,
+            they are stored as well
+
+        Returns
+        -------
+        None
+
+        """
+        section_dir = os.path.join(self.directory, key, f"MT{section.MT}")
+        os.makedirs(section_dir, exist_ok=True)
+
+        for name in SECTION_ARRAYS:
+            write_array(os.path.join(section_dir, f"{name}.npy"), getattr(section, name))
+
+        meta = {
+            "MAT": int(section.MAT),
+            "MF": int(section.MF),
+            "MT": int(section.MT),
+            "incident_energy": float(section.incident_energy) if section.MF == 5 else None,
+            "eig_info": None,
+        }
+        if eigenpairs and "eig_info" in section.__dict__:
+            for name in EIGEN_ARRAYS:
+                write_array(os.path.join(section_dir, f"{name}.npy"), getattr(section, name))
+            meta["eig_info"] = {
+                name: value if not isinstance(value, np.generic) else value.item()
+                for name, value in section.eig_info.items()
+            }
+
+        # the metadata is written last, and marks the section as complete
+        write_json(os.path.join(section_dir, "meta.json"), meta)
+
+    def evict(self, keep=()):
+        """Function to remove the least recently used entries until the
+        cache is within max_bytes
+
+        Parameters
+        ----------
+        keep : iterable, optional, default is ()
+            keys of entries that are never removed
+
+        Returns
+        -------
+        list
+            the keys of the removed entries
+
+        """
+        entries = []
+        for key in self._keys():
+            entry = os.path.join(self.directory, key)
+            entries.append((_last_used(entry), key, _directory_size(entry)))
+
+        total = sum(size for _, _, size in entries)
+        removed = []
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key in keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            total -= size
+            removed.append(key)
+        return removed
+
+    def size(self):
+        """Function to get the size of the cache
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        int
+            the total size of the entries, in bytes
+
+        """
+        return sum(_directory_size(os.path.join(self.directory, key)) for key in self._keys())
+
+    def clear(self):
+        """Function to remove every entry
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+        for key in self._keys():
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+    def _keys(self):
+        """Function to list the keys of the entries in the cache directory"""
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            key
+            for key in os.listdir(self.directory)
+            if os.path.isfile(os.path.join(self.directory, key, "index.json"))
+        ]
+
+    def _load_array(self, section_dir, name):
+        """Function to load one stored array of a section"""
+        return np.load(os.path.join(section_dir, f"{name}.npy"), mmap_mode=self.mmap_mode)
+
+
+def _last_used(entry):
+    """Function to get the last time an entry was used"""
+    try:
+        return os.path.getmtime(os.path.join(entry, "index.json"))
+    except OSError:
+        return 0.0
+
+
+def _directory_size(directory):
+    """Function to get the total size of the files in a directory"""
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
@@ -1,7 +1,19 @@
 from pyerr.base import Control, Values
-import fortranformat as ff
+from pyerr.base._records import read_values, check_engine, fortran_reader
 import numpy as np
-import sys
+from pyerr._packed import PackedSymmetricMatrix, packed_size
+from pyerr._sparse import CSRMatrix
+from pyerr._validation import apply_policy
+
+# "dense" keeps the full matrix, "packed" only its upper triangle and
+# "sparse" only the nonzero values of the LIST records
+STORAGE_MODES = ("dense", "packed", "sparse")
+
+# one entry per LIST record: the (zero-based) row and first column it fills,
+# the number of values and the offset of its first value in the block
+RECORD_DTYPE = np.dtype(
+    [("row", np.int64), ("column", np.int64), ("length", np.int64), ("offset", np.int64)]
+)
 
 
 class CovarianceControl(Control):
@@ -13,6 +25,9 @@ class CovarianceControl(Control):
     lines : list
         list of control lines from the file
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" or "fortranformat"
+
     Attributes
     ----------
     lines : list
@@ -42,6 +57,9 @@ class CovarianceControl(Control):
     MT1 : int
         if cross-reaction covariance, the other MT value
 
+    num_subsections : int
+        number of subsections, one per other MT value (MT1)
+
 
     Methods
     -------
@@ -49,10 +67,11 @@ class CovarianceControl(Control):
         Parse the control lines by their format string
     """
 
-    def __init__(self, lines):
-        super().__init__(lines)
+    def __init__(self, lines, engine="numpy"):
+        super().__init__(lines, engine)
         self.num_sections = self.parsed_values[15]
         self.MT1 = self.parsed_values[13]
+        self.num_subsections = self.parsed_values[5]
 
 
 class Covariance:
@@ -70,35 +89,359 @@ class Covariance:
     indices : tuple
         indices for cutting at the upper and lower limits
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" or "fortranformat"
+
+    out : np.array, optional, default is None
+        zero-filled 2D array of shape (num_groups, num_groups) to fill, for
+        example a np.memmap, or a 1D array of length packed_size(num_groups)
+        with "packed" storage. If None, a new array is allocated. With
+        "dense" storage, matrix is a view of it. Not used with "sparse"
+        storage
+
+    storage : str, optional, default is "dense"
+        "dense" to store the full matrix as a 2D array, "packed" to only
+        store its upper triangle in a PackedSymmetricMatrix, or "sparse" to
+        only store the nonzero values of the LIST records in a CSRMatrix,
+        which is built from the records without a dense matrix. A packed
+        matrix keeps the value of the lower triangle for a pair that differs,
+        and the asymmetry is measured as the values are set
+
+    validation : str, optional, default is "raise"
+        what to do if the matrix fails validation, see
+        check_covariance_matrix: "raise" a CovarianceError, "warn" and keep
+        the matrix, or repair it with "clip" or "nearest_psd"
+
     Attributes
     ----------
     control : CovarianceControl object
         parsed control lines object
 
-    matrix : np.array
-        2D covariance matrix
+    storage : str
+        the storage mode of the matrix, "dense", "packed" or "sparse"
+
+    matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        2D covariance matrix, cut at the upper and lower limits
+
+    full_matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        2D covariance matrix of all of the groups in the file, with the
+        repairs of the validation policy within the limits. With "dense"
+        storage, matrix is a view of it
+
+    report : ValidationReport
+        the results of the checks of the matrix
+
+    records : np.array
+        structured array with the row, first column, length and value offset
+        of each LIST record, only with the "numpy" engine
 
     Methods
     -------
+    locate_records
+        function to find every LIST record in the block in one pass
+
+    record_positions
+        function to get the row, column and position in the block of
+        every value of a set of LIST records
+
+    read_blocks
+        function to read the covariance blocks with every other reaction
+        (MT1) in the section
+
+    fill_matrix
+        function to scatter the values of all of the LIST records into
+        the matrix at once
+
+    set_values
+        function to set elements of the matrix, with any storage
+
     parse_section
-        function to parse each individual set of values
+        function to parse each individual set of values, used as the
+        reference decoder by the "fortranformat" engine
+
+    check_covariance_matrix
+        function to validate the matrix and apply the validation policy
 
     """
 
-    def __init__(self, lines, num_groups, indices):
-        self.control = CovarianceControl(lines[:2])
-        self.matrix = np.zeros((num_groups, num_groups))
+    def __init__(
+        self,
+        lines,
+        num_groups,
+        indices,
+        engine="numpy",
+        out=None,
+        storage="dense",
+        validation="raise",
+    ):
+        if storage not in STORAGE_MODES:
+            raise ValueError(f"Unknown storage '{storage}', must be one of {STORAGE_MODES}")
+        self.engine = check_engine(engine)
+        self.storage = storage
+        self.control = CovarianceControl(lines[:2], engine)
+        if storage == "sparse":
+            if out is not None:
+                raise ValueError("Sparse storage cannot fill a given array")
+            # (rows, columns, values) of the records, assembled once parsed
+            self._triplets = []
+        elif storage == "packed":
+            data = np.zeros(packed_size(num_groups)) if out is None else out
+            self.matrix = PackedSymmetricMatrix(data, num_groups)
+            # how often each element is set, to compare the two triangles
+            self._num_set = np.zeros(len(data), dtype=np.uint8)
+        else:
+            self.matrix = np.zeros((num_groups, num_groups)) if out is None else out
+        self._indices = tuple(int(index) for index in indices)
+        self._asymmetry = 0.0 if storage == "packed" else None
 
         cov_lines = lines[2:-2]
 
-        for i in range(self.control.num_sections):
-            if len(cov_lines) > 0:
-                cov_lines = self.parse_section(cov_lines)
+        if self.engine == "numpy":
+            values = read_values(cov_lines)
+            self.records = self.locate_records(values, self.control.num_sections, num_groups)
+            self.fill_matrix(values)
+        else:
+            for i in range(self.control.num_sections):
+                if len(cov_lines) > 0:
+                    cov_lines = self.parse_section(cov_lines)
+
+        if storage == "sparse":
+            triplets = self._triplets or [(np.zeros(0, int), np.zeros(0, int), np.zeros(0))]
+            rows, columns, values = (np.concatenate(parts) for parts in zip(*triplets))
+            del self._triplets
+            self.matrix = CSRMatrix.from_triplets(rows, columns, values, (num_groups, num_groups))
+        elif storage == "packed":
+            self._asymmetry = max(self._asymmetry, self._unmatched_asymmetry())
+            del self._num_set
+
+        # apply energy mask, keeping the full matrix for other windows
+        self.full_matrix = self.matrix
+        if storage in ("packed", "sparse"):
+            if indices[1] - indices[0] < num_groups:
+                self.matrix = self.matrix.window(indices[0], indices[1])
+        else:
+            self.matrix = self.matrix[indices[0] : indices[1], indices[0] : indices[1]]
+
+        self.report = self.check_covariance_matrix(validation)
+
+        # the repaired groups replace the parsed ones in the full matrix, so
+        # that other windows are cut from repaired values
+        if self.report.repairs:
+            self.full_matrix = _put_window(self.full_matrix, self.matrix, indices[0])
+
+    @staticmethod
+    def locate_records(values, num_records, num_groups):
+        """
+        function to find every LIST record in the block in one pass
+
+        A cursor walks from one LIST control record to the next, so each
+        line is visited once. The walk stops after num_records records, at
+        the end of the block, or after the record for the last group.
+
+        Parameters
+        ----------
+        values : np.array
+            all of the (6G11.0) fields of the block, in order
+
+        num_records : int
+            maximum number of LIST records to read
 
-        # apply energy mask
-        self.matrix = self.matrix[indices[0] : indices[1], indices[0] : indices[1]]
+        num_groups : int
+            number of energy groups
 
-        self.check_covariance_matrix()
+        Returns
+        -------
+        np.array
+            structured array of RECORD_DTYPE, one entry per LIST record
+
+        """
+        num_lines = len(values) // 6
+        records = []
+        cursor = 0
+        while cursor < num_lines and len(records) < num_records:
+            mt1_group, num_values, mt_group = values[6 * cursor + 3 : 6 * cursor + 6].astype(int)
+            records.append((mt_group - 1, mt1_group - 1, num_values, 6 * (cursor + 1)))
+
+            # skip the control line and the ceil(num_values / 6) value lines
+            cursor += 1 + -(-num_values // 6)
+            if mt_group == num_groups:
+                break
+
+        return np.array(records, dtype=RECORD_DTYPE)
+
+    def fill_matrix(self, values):
+        """
+        function to scatter the values of all of the LIST records into
+        the matrix at once
+
+        Parameters
+        ----------
+        values : np.array
+            all of the (6G11.0) fields of the block, in order
+
+        Returns
+        -------
+        None, fills the attribute self.matrix
+
+        """
+        rows, columns, positions = self.record_positions(self.records)
+        self.set_values(rows, columns, values[positions])
+
+    @staticmethod
+    def record_positions(records):
+        """
+        function to get the row, column and position in the block of
+        every value of a set of LIST records
+
+        Parameters
+        ----------
+        records : np.array
+            structured array of RECORD_DTYPE, from locate_records
+
+        Returns
+        -------
+        rows : np.array
+            zero-based row of every value
+
+        columns : np.array
+            zero-based column of every value
+
+        positions : np.array
+            index of every value in the (6G11.0) fields of the block
+
+        """
+        lengths = records["length"]
+
+        # record number and position within the record of every value
+        record = np.repeat(np.arange(len(records)), lengths)
+        position = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        rows = records["row"][record]
+        columns = records["column"][record] + position
+        return rows, columns, records["offset"][record] + position
+
+    @staticmethod
+    def read_blocks(lines, num_groups, indices, mt1s=None):
+        """
+        function to read the covariance blocks with every other reaction
+        (MT1) in the section, which are skipped when parsing the matrix
+
+        Each subsection starts with a control record with MAT1 and MT1,
+        followed by the LIST records up to the last group. Only the blocks
+        with reactions of the same material (MAT1 = 0) are kept, and only
+        the groups within the indices are filled in. This always uses the
+        vectorized reader.
+
+        Parameters
+        ----------
+        lines : list
+            list of text lines in the section
+
+        num_groups : int
+            number of energy groups, which is size of each block
+
+        indices : tuple
+            indices for cutting at the upper and lower limits
+
+        mt1s : list, optional, default is None
+            the MT1 numbers of the blocks to keep. If None, every block of
+            the same material is kept
+
+        Returns
+        -------
+        dictionary
+            2D relative covariance block for each MT1, with the groups of
+            MT as rows and the groups of MT1 as columns
+
+        """
+        control = CovarianceControl(lines[:2])
+        values = read_values(lines[1:-2])
+        num_lines = len(values) // 6
+
+        first, last = indices
+        blocks = {}
+        cursor = 0
+        for _ in range(control.num_subsections):
+            if cursor >= num_lines:
+                break
+            mat1, mt1 = values[6 * cursor + 2 : 6 * cursor + 4].astype(int)
+            start = 6 * (cursor + 1)
+            records = Covariance.locate_records(values[start:], num_groups, num_groups)
+            if len(records) == 0:
+                break
+            records["offset"] += start
+
+            # the next subsection starts after the values of the last record
+            cursor = records["offset"][-1] // 6 + -(-records["length"][-1] // 6)
+
+            if mat1 == 0 and (mt1s is None or mt1 in mt1s):
+                rows, columns, positions = Covariance.record_positions(records)
+                inside = (rows >= first) & (rows < last) & (columns >= first) & (columns < last)
+                block = np.zeros((last - first, last - first))
+                block[rows[inside] - first, columns[inside] - first] = values[positions[inside]]
+                blocks[int(mt1)] = block
+
+        return blocks
+
+    def set_values(self, rows, columns, values):
+        """
+        function to set elements of the matrix, with any storage
+
+        Parameters
+        ----------
+        rows : np.array
+            zero-based row indices
+
+        columns : np.array
+            zero-based column indices
+
+        values : np.array
+            the values
+
+        Returns
+        -------
+        None, fills the attribute self.matrix
+
+        """
+        if self.storage == "sparse":
+            rows, columns, values = np.broadcast_arrays(rows, columns, values)
+            self._triplets.append((rows, columns, values))
+        elif self.storage == "packed":
+            # the upper triangle is set first, and the lower one is compared with it
+            rows, columns, values = np.broadcast_arrays(rows, columns, values)
+            upper = rows <= columns
+            self._put_packed(rows[upper], columns[upper], values[upper])
+            self._put_packed(rows[~upper], columns[~upper], values[~upper])
+        else:
+            self.matrix[rows, columns] = values
+
+    def _put_packed(self, rows, columns, values):
+        """function to set elements of a packed matrix, measuring the
+        asymmetry within the limits against the symmetric elements that are
+        already set"""
+        positions = self.matrix.index(rows, columns)
+        first, last = self._indices
+        mirrored = (
+            (self._num_set[positions] > 0)
+            & (rows != columns)
+            & (np.minimum(rows, columns) >= first)
+            & (np.maximum(rows, columns) < last)
+        )
+        difference = np.abs(self.matrix.data[positions[mirrored]] - values[mirrored])
+        self._asymmetry = max(self._asymmetry, float(np.max(difference, initial=0.0)))
+        self.matrix.data[positions] = values
+        self._num_set[positions] += 1
+
+    def _unmatched_asymmetry(self):
+        """function to get the largest element within the limits of a packed
+        matrix that was only set in one of the two triangles"""
+        positions = np.flatnonzero(self._num_set == 1)
+        offsets = self.matrix.offsets
+        rows = np.searchsorted(offsets, positions, side="right") - 1
+        columns = rows + positions - offsets[rows]
+        first, last = self._indices
+        unmatched = (rows != columns) & (rows >= first) & (columns < last)
+        return float(np.max(np.abs(self.matrix.data[positions[unmatched]]), initial=0.0))
 
     def parse_section(self, lines):
         """
@@ -115,8 +458,8 @@ class Covariance:
             the list of lines with the already-parsed lines popped off
 
         """
-        section_cont = ff.FortranRecordReader("(2G11.0,4I11)")
-        section_values = ff.FortranRecordReader("(6G11.0)")
+        section_cont = fortran_reader("(2G11.0,4I11)")
+        section_values = fortran_reader("(6G11.0)")
         _, _, _, mt1_group, num_values, mt_group = section_cont.read(lines.pop(0))
 
         # number of lines to read
@@ -132,26 +475,61 @@ class Covariance:
         values = values[:num_values]
 
         # fill in matrix
-        self.matrix[mt_group - 1, mt1_group - 1 : mt1_group - 1 + num_values] = values
+        columns = np.arange(mt1_group - 1, mt1_group - 1 + num_values)
+        self.set_values(mt_group - 1, columns, values)
 
         return lines
 
-    def check_covariance_matrix(self):
+    def check_covariance_matrix(self, policy="raise", eigenvalues=False):
         """function to check the covariance matrix for:
 
-        - zeros/neg values on the diagonal (gracefully crash)
+        - zeros/neg values on the diagonal
+        - asymmetry
+        - correlations above one in magnitude
+        - negative eigenvalues, only if eigenvalues is True
 
-        """
+        and apply the validation policy if any of the checks fail
+
+        Parameters
+        ----------
+        policy : str, optional, default is "raise"
+            "raise" to raise a CovarianceError with the report, "warn" to
+            issue a CovarianceWarning and keep the matrix, "clip" to repair
+            the matrix, or "nearest_psd" to repair it and clip its negative
+            eigenvalues
 
-        diagonal = np.diag(self.matrix)
-        if np.min(diagonal) <= 0:
-            print("Covariance matrix has zero and/or negative values along the diagonal.")
-            print(
-                "This may be caused by:\n\n  -BROADR producing zeros for the fission cross section."
-            )
-            print("\tRun BROADR with thnmax as low as reasonable for")
-            print("\tthis problem (at least below the energy of the")
-            print("\tgroup that is zero).")
-            print(f"\nThe {len(diagonal)} diagonal values are: ")
-            print(diagonal)
-            sys.exit("Bad diagonal values.\n")
+        eigenvalues : bool, optional, default is False
+            if True, the eigenvalues are checked as well, which is O(n^3)
+
+        Returns
+        -------
+        ValidationReport
+            the results of the checks, and the repairs that were made
+
+        """
+        label = f"MAT{self.control.MAT} MF{self.control.MF} MT{self.control.MT}"
+        self.matrix, report = apply_policy(
+            self.matrix, policy, label, eigenvalues, asymmetry=self._asymmetry
+        )
+        return report
+
+
+def _put_window(full, window, start):
+    """Function to write the matrix of a window back into the full matrix"""
+    stop = start + len(window)
+    if isinstance(full, PackedSymmetricMatrix):
+        # the packed data is the upper triangle, row by row
+        rows, columns = np.triu_indices(len(window))
+        full.put(rows + start, columns + start, window.data)
+        return full
+    if isinstance(full, CSRMatrix):
+        rows, columns = full.row_indices(), full.indices
+        outside = (np.minimum(rows, columns) < start) | (np.maximum(rows, columns) >= stop)
+        return CSRMatrix.from_triplets(
+            np.concatenate([rows[outside], window.row_indices() + start]),
+            np.concatenate([columns[outside], window.indices + start]),
+            np.concatenate([full.data[outside], window.data]),
+            full.shape,
+        )
+    full[start:stop, start:stop] = window
+    return full
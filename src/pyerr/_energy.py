@@ -1,6 +1,14 @@
 from pyerr.base import Control, Values
+import copy
 import numpy as np
 
+# number of parsed energy grids that are kept, oldest first out
+MAX_GRIDS = 32
+
+# parsed energy grids by their text and parsing engine, so that the grid
+# shared by the sections of a tape is only parsed once
+_GRIDS = {}
+
 
 class EnergyGroupControl(Control):
     """Class to parse energy group control lines from the ERRORR files.
@@ -10,6 +18,9 @@ class EnergyGroupControl(Control):
     lines : list
         list of control lines from the file
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" or "fortranformat"
+
     Attributes
     ----------
     lines : list
@@ -48,8 +59,8 @@ class EnergyGroupControl(Control):
         Parse the control lines by their format string
     """
 
-    def __init__(self, lines):
-        super().__init__(lines)
+    def __init__(self, lines, engine="numpy"):
+        super().__init__(lines, engine)
         self.temperature = self.parsed_values[10]
         self.num_groups = self.parsed_values[12]
         self.num_boundaries = np.array(self.parsed_values[14])
@@ -68,6 +79,9 @@ class EnergyGroupValues(Values):
         Number of values in the list, so that zeros at the
         end of the list can be removed
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" or "fortranformat"
+
     Attributes
     ----------
     lines : list
@@ -89,8 +103,8 @@ class EnergyGroupValues(Values):
 
     """
 
-    def __init__(self, lines, num_values):
-        super().__init__(lines)
+    def __init__(self, lines, num_values, engine="numpy"):
+        super().__init__(lines, engine)
         self.num_values = num_values
         self.parsed_values = np.array(self.parsed_values[: num_values + 1])
 
@@ -112,6 +126,9 @@ class EnergyGroups:
         upper limit, in eV, to cut the values at. If None or if the value is
         outside the range, no cut is made at the high end
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" or "fortranformat"
+
 
     Attributes
     ----------
@@ -151,21 +168,131 @@ class EnergyGroups:
     temperature : float
         temperature at which the evaluation was processed
 
+    Methods
+    -------
+    shared
+        Function to get the energy groups of a grid that is only parsed
+        once, however many sections use it
+
+    with_limits
+        Function to get the same energy groups cut at other limits
+
+    limit_indices
+        Function to get the indices for cutting group boundaries at the
+        lower and upper limits
+
     """
 
-    def __init__(self, lines, lower_limit, upper_limit):
-        self.control = EnergyGroupControl(lines[:2])
-        self.values = EnergyGroupValues(lines[2:-2], self.control.num_groups)
-        if upper_limit is None or upper_limit > np.max(self.values.parsed_values):
-            upper_limit = np.max(self.values.parsed_values)
-        if lower_limit is None or lower_limit < np.min(self.values.parsed_values):
-            lower_limit = np.min(self.values.parsed_values)
+    def __init__(self, lines, lower_limit, upper_limit, engine="numpy"):
+        self.control = EnergyGroupControl(lines[:2], engine)
+        self.values = EnergyGroupValues(lines[2:-2], self.control.num_groups, engine)
+        self.indices = self.limit_indices(self.values.parsed_values, lower_limit, upper_limit)
+
+        # the energy groups of this grid by limits, shared with all of them
+        self._limits = {(lower_limit, upper_limit): self}
+
+    @classmethod
+    def shared(cls, lines, lower_limit=None, upper_limit=None, engine="numpy"):
+        """Function to get the energy groups of a grid that is only parsed
+        once, however many sections use it
+
+        The parsed grid is interned by its text, and the energy groups for
+        each pair of limits are memoized, so every section of a tape with
+        the same limits gets the same EnergyGroups object.
+
+        Parameters
+        ----------
+        lines : list
+            list of lines in MF1MT451
+
+        lower_limit : float or None, optional, default is None
+            lower limit, in eV, to cut the values at
+
+        upper_limit : float or None, optional, default is None
+            upper limit, in eV, to cut the values at
+
+        engine : str, optional, default is "numpy"
+            parsing engine, either "numpy" or "fortranformat"
+
+        Returns
+        -------
+        EnergyGroups
+            the shared energy groups
+
+        """
+        key = (tuple(lines), engine)
+        if key not in _GRIDS:
+            if len(_GRIDS) >= MAX_GRIDS:
+                _GRIDS.pop(next(iter(_GRIDS)))
+            grid = cls(lines, None, None, engine)
+            # the boundaries are shared by every section of the tape
+            grid.values.parsed_values.flags.writeable = False
+            _GRIDS[key] = grid
+        return _GRIDS[key].with_limits(lower_limit, upper_limit)
+
+    def with_limits(self, lower_limit=None, upper_limit=None):
+        """Function to get the same energy groups cut at other limits,
+        without parsing the lines again. The result for each pair of limits
+        is memoized
+
+        Parameters
+        ----------
+        lower_limit : float or None, optional, default is None
+            lower limit, in eV, to cut the values at
+
+        upper_limit : float or None, optional, default is None
+            upper limit, in eV, to cut the values at
+
+        Returns
+        -------
+        EnergyGroups
+            energy groups that share the parsed values with these
+
+        """
+        key = (lower_limit, upper_limit)
+        if key not in self._limits:
+            groups = copy.copy(self)
+            groups.indices = self.limit_indices(
+                self.values.parsed_values, lower_limit, upper_limit
+            )
+            self._limits[key] = groups
+        return self._limits[key]
+
+    @staticmethod
+    def limit_indices(boundaries, lower_limit, upper_limit):
+        """Function to get the indices for cutting group boundaries at the
+        lower and upper limits
+
+        Parameters
+        ----------
+        boundaries : np.array
+            the ascending group boundaries, in eV
+
+        lower_limit : float or None
+            lower limit, in eV. If None or if the value is outside the
+            range, no cut is made at the low end
+
+        upper_limit : float or None
+            upper limit, in eV. If None or if the value is outside the
+            range, no cut is made at the high end
+
+        Returns
+        -------
+        tuple
+            the index of the first boundary and of the last boundary that are
+            kept, which are also the first group and the group after the last
+
+        """
+        if upper_limit is None or upper_limit > np.max(boundaries):
+            upper_limit = np.max(boundaries)
+        if lower_limit is None or lower_limit < np.min(boundaries):
+            lower_limit = np.min(boundaries)
 
         # get the upper and lower indices
         #    if limit falls within a group, keep that group
-        lower_ind = np.where(self.values.parsed_values <= lower_limit)[0][-1]
-        upper_ind = np.where(self.values.parsed_values >= upper_limit)[0][0]
-        self.indices = (lower_ind, upper_ind)
+        lower_ind = np.where(boundaries <= lower_limit)[0][-1]
+        upper_ind = np.where(boundaries >= upper_limit)[0][0]
+        return (lower_ind, upper_ind)
 
     @property
     def group_boundaries(self):
@@ -0,0 +1,228 @@
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyerr._packed import PackedSymmetricMatrix, ROW_BLOCK
+from pyerr._sparse import CSRMatrix
+
+# layouts of the covariance table, "sparse" for one row per nonzero value of
+# the upper triangle and "packed" for one row per matrix row, with the values
+# from the diagonal to the last column in a list
+EXPORT_LAYOUTS = ("sparse", "packed")
+
+# largest number of rows in a row group of the exported tables
+ROW_GROUP_ROWS = 1024**2
+
+# columns that identify the section of each row
+_KEY_FIELDS = [("MAT", pa.int32()), ("MF", pa.int32()), ("MT", pa.int32())]
+
+# long table of the group-wise values, one row per group of every section
+GROUP_SCHEMA = pa.schema(
+    _KEY_FIELDS
+    + [
+        ("group", pa.int32()),
+        ("lower_energy", pa.float64()),
+        ("upper_energy", pa.float64()),
+        ("mean_value", pa.float64()),
+        ("uncertainty", pa.float64()),
+        ("incident_energy", pa.float64()),
+    ]
+)
+
+# tables of the relative covariance matrices, by layout
+COVARIANCE_SCHEMAS = {
+    "sparse": pa.schema(
+        _KEY_FIELDS + [("row", pa.int32()), ("column", pa.int32()), ("value", pa.float64())]
+    ),
+    "packed": pa.schema(_KEY_FIELDS + [("row", pa.int32()), ("values", pa.list_(pa.float64()))]),
+}
+
+
+def export_parquet(outputs, directory, mts=None, layout="sparse"):
+    """Function to write the sections of ERRORR outputs to Parquet files,
+    one section at a time
+
+    Two files are written in directory. "groups.parquet" is a long table
+    with the group boundaries, mean values and relative uncertainties of
+    every section, keyed by (MAT, MF, MT, group). "covariance.parquet" holds
+    the upper triangles of the relative covariance matrices, keyed by
+    (MAT, MF, MT, row), in the given layout. The groups are numbered from
+    zero within each section.
+
+    The rows are buffered into row groups of at most ROW_GROUP_ROWS rows,
+    and a row group never holds more than one material, so readers can
+    skip materials by the row group statistics. Sections that are not
+    loaded yet are parsed for the export and dropped after it, so the
+    memory does not grow with the number of sections.
+
+    Parameters
+    ----------
+    outputs : iterable
+        the ErrorrOutput objects to export, for example the materials of
+        an ErrorrTape
+
+    directory : str or Path
+        the directory to write the files to, which is created if needed
+
+    mts : list, optional, default is None
+        the MT numbers of the sections to export. If None, all of the
+        sections are exported
+
+    layout : str, optional, default is "sparse"
+        layout of the covariance table. "sparse" has one row per nonzero
+        value of the upper triangle and the diagonal, with (row, column,
+        value). "packed" has one row per matrix row, with the values from
+        the diagonal to the last column in the list "values"
+
+    Returns
+    -------
+    dictionary
+        the file names of the "groups" and "covariance" tables
+
+    """
+    if layout not in EXPORT_LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}', must be one of {EXPORT_LAYOUTS}")
+    os.makedirs(directory, exist_ok=True)
+    filenames = {
+        "groups": os.path.join(directory, "groups.parquet"),
+        "covariance": os.path.join(directory, "covariance.parquet"),
+    }
+    metadata = {"pyerr_covariance": "relative", "pyerr_layout": layout}
+    groups = _RowGroups(filenames["groups"], GROUP_SCHEMA.with_metadata(metadata))
+    covariance = _RowGroups(
+        filenames["covariance"], COVARIANCE_SCHEMAS[layout].with_metadata(metadata)
+    )
+
+    with groups, covariance:
+        for output in outputs:
+            for mt in output.sections:
+                if mts is not None and mt not in mts:
+                    continue
+                if mt in output.sections.loaded:
+                    section = output.sections[mt]
+                else:
+                    # the section is not kept in output.sections
+                    section = output.build_section(mt)
+                groups.add(section.MAT, _group_columns(section))
+                for columns in _covariance_columns(section, layout):
+                    covariance.add(section.MAT, columns)
+    return filenames
+
+
+def upper_rows(matrix, start, stop):
+    """Function to get the upper triangle of a block of rows of a
+    symmetric matrix, row by row from the diagonal to the last column
+
+    Parameters
+    ----------
+    matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        the symmetric matrix
+
+    start : int
+        first row
+
+    stop : int
+        row after the last one
+
+    Returns
+    -------
+    np.array
+        1D array with C[i, i:] for each row i, one after the other. This is
+        the same as the data of a PackedSymmetricMatrix
+
+    """
+    if isinstance(matrix, PackedSymmetricMatrix):
+        return matrix.data[matrix.offsets[start] : matrix.offsets[stop]]
+    if isinstance(matrix, CSRMatrix):
+        block = np.zeros((stop - start, matrix.shape[1]))
+        first, last = matrix.indptr[start], matrix.indptr[stop]
+        rows = matrix.row_indices()[first:last] - start
+        block[rows, matrix.indices[first:last]] = matrix.data[first:last]
+    else:
+        block = np.asarray(matrix[start:stop])
+    upper = np.arange(block.shape[1])[np.newaxis, :] >= np.arange(start, stop)[:, np.newaxis]
+    return block[upper]
+
+
+def _group_columns(section):
+    """Function to get the columns of the group table of a section"""
+    num_groups = section.num_groups
+    boundaries = np.asarray(section.group_boundaries, dtype=float)
+    incident_energy = section.incident_energy if section.MF == 5 else None
+    return {
+        "MAT": np.full(num_groups, section.MAT, dtype=np.int32),
+        "MF": np.full(num_groups, section.MF, dtype=np.int32),
+        "MT": np.full(num_groups, section.MT, dtype=np.int32),
+        "group": np.arange(num_groups, dtype=np.int32),
+        "lower_energy": boundaries[:-1],
+        "upper_energy": boundaries[1:],
+        "mean_value": np.asarray(section.mean_values, dtype=float),
+        "uncertainty": np.asarray(section.uncertainty, dtype=float),
+        "incident_energy": pa.array([incident_energy] * num_groups, type=pa.float64()),
+    }
+
+
+def _covariance_columns(section, layout):
+    """Function to yield the columns of the covariance table of a section,
+    ROW_BLOCK matrix rows at a time"""
+    matrix = section.covariance_matrix
+    num_groups = len(matrix)
+    for start in range(0, num_groups, ROW_BLOCK):
+        stop = min(start + ROW_BLOCK, num_groups)
+        values = upper_rows(matrix, start, stop)
+        lengths = num_groups - np.arange(start, stop)
+        if layout == "packed":
+            rows = np.arange(start, stop, dtype=np.int32)
+            offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+            columns = {"row": rows, "values": pa.ListArray.from_arrays(offsets, values)}
+        else:
+            rows = np.repeat(np.arange(start, stop, dtype=np.int32), lengths)
+            first = np.repeat(np.cumsum(lengths) - lengths, lengths)
+            column = (rows + np.arange(len(values)) - first).astype(np.int32)
+            keep = (values != 0) | (rows == column)
+            rows, values = rows[keep], values[keep]
+            columns = {"row": rows, "column": column[keep], "value": values}
+
+        keys = {
+            name: np.full(len(rows), value, dtype=np.int32)
+            for name, value in (("MAT", section.MAT), ("MF", section.MF), ("MT", section.MT))
+        }
+        yield {**keys, **columns}
+
+
+class _RowGroups:
+    """Class to buffer the rows of a Parquet file into row groups of at most
+    ROW_GROUP_ROWS rows that never hold more than one material"""
+
+    def __init__(self, filename, schema):
+        self.schema = schema
+        self.writer = pq.ParquetWriter(filename, schema)
+        self.batches = []
+        self.num_rows = 0
+        self.mat = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+        self.writer.close()
+
+    def add(self, mat, columns):
+        """Function to add the rows of one material"""
+        if mat != self.mat:
+            self.flush()
+            self.mat = mat
+        batch = pa.RecordBatch.from_pydict(columns, schema=self.schema)
+        self.batches.append(batch)
+        self.num_rows += batch.num_rows
+        if self.num_rows >= ROW_GROUP_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Function to write the buffered rows as one row group"""
+        if self.num_rows > 0:
+            table = pa.Table.from_batches(self.batches, self.schema)
+            self.writer.write_table(table, row_group_size=self.num_rows)
+        self.batches = []
+        self.num_rows = 0
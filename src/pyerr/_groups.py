@@ -0,0 +1,176 @@
+import numpy as np
+from pyerr._sparse import CSRMatrix
+from pyerr._linalg import safe_reciprocal, scale_outer
+
+# number of collapse operators that are kept, oldest first out
+MAX_OPERATORS = 64
+
+# collapse operators by (source, target, flux, average), so that the
+# operator between two grids is only built once per process
+_OPERATORS = {}
+
+
+def group_overlap(source_boundaries, target_boundaries, lethargy=True):
+    """Function to get the fraction of each source group that lies in each
+    target group
+
+    Parameters
+    ----------
+    source_boundaries : np.array
+        ascending boundaries of the source groups, in eV
+
+    target_boundaries : np.array
+        ascending boundaries of the target groups, in eV
+
+    lethargy : bool, optional, default is True
+        if True, the fractions are taken in lethargy (ln E), otherwise in
+        energy. Energy is always used if a boundary is not positive
+
+    Returns
+    -------
+    np.array
+        2D array of shape (num_target, num_source). Columns of source
+        groups that are inside the target groups sum to one
+
+    """
+    source = np.asarray(source_boundaries, dtype=float)
+    target = np.asarray(target_boundaries, dtype=float)
+    for boundaries in (source, target):
+        if np.any(np.diff(boundaries) <= 0):
+            raise ValueError("Group boundaries must be strictly ascending")
+
+    if lethargy and source[0] > 0 and target[0] > 0:
+        source = np.log(source)
+        target = np.log(target)
+
+    lower = np.maximum(target[:-1, np.newaxis], source[np.newaxis, :-1])
+    upper = np.minimum(target[1:, np.newaxis], source[np.newaxis, 1:])
+    return np.clip(upper - lower, 0.0, None) / np.diff(source)[np.newaxis, :]
+
+
+def lethargy_widths(boundaries):
+    """Function to get the width of each group in lethargy, ln(E_high / E_low),
+    or in energy if a boundary is not positive
+
+    Parameters
+    ----------
+    boundaries : np.array
+        ascending group boundaries, in eV
+
+    Returns
+    -------
+    np.array
+        1D array with the width of each group
+
+    """
+    boundaries = np.asarray(boundaries, dtype=float)
+    if boundaries[0] > 0:
+        return np.diff(np.log(boundaries))
+    return np.diff(boundaries)
+
+
+def collapse_operator(source_boundaries, target_boundaries, flux=None, average=True):
+    """Function to get the sparse operator W that maps group values from
+    the source groups onto the target groups, values_target = W @ values
+
+    Operators are cached by the grids, the flux and the kind of operator,
+    so applying the same collapse to many sections only builds it once.
+
+    Parameters
+    ----------
+    source_boundaries : np.array
+        ascending boundaries of the source groups, in eV
+
+    target_boundaries : np.array
+        ascending boundaries of the target groups, in eV
+
+    flux : np.array, optional, default is None
+        weighting flux integrated over each source group. If None, a flux
+        that is flat in lethargy is used
+
+    average : bool, optional, default is True
+        if True, each target value is the flux-weighted average of the
+        source values in it, as for cross sections and nu-bar. If False,
+        the source values are summed by their overlap, as for group
+        probabilities such as a PFNS
+
+    Returns
+    -------
+    CSRMatrix
+        operator of shape (num_target, num_source). Target groups that no
+        source group overlaps are zero
+
+    """
+    source = np.asarray(source_boundaries, dtype=float)
+    target = np.asarray(target_boundaries, dtype=float)
+    flux = None if flux is None else np.asarray(flux, dtype=float)
+    key = (
+        source.tobytes(),
+        target.tobytes(),
+        None if flux is None or not average else flux.tobytes(),
+        average,
+    )
+    if key in _OPERATORS:
+        return _OPERATORS[key]
+
+    weights = group_overlap(source, target)
+    if average:
+        if flux is None:
+            flux = lethargy_widths(source)
+        if len(flux) != len(source) - 1:
+            raise ValueError(f"Flux has {len(flux)} groups, expected {len(source) - 1}")
+        weights = weights * flux[np.newaxis, :]
+        weights *= safe_reciprocal(np.sum(weights, axis=1))[:, np.newaxis]
+
+    rows, columns = np.nonzero(weights)
+    operator = CSRMatrix.from_triplets(rows, columns, weights[rows, columns], weights.shape)
+    if len(_OPERATORS) >= MAX_OPERATORS:
+        _OPERATORS.pop(next(iter(_OPERATORS)))
+    _OPERATORS[key] = operator
+    return operator
+
+
+def clear_operators():
+    """Function to drop the cached collapse operators
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+    _OPERATORS.clear()
+
+
+def collapse_values(operator, mean_values, abs_covariance_matrix):
+    """Function to apply a collapse operator W to mean values and their
+    absolute covariance matrix, W @ mean and W C W^T
+
+    Parameters
+    ----------
+    operator : CSRMatrix
+        the collapse operator, of shape (num_target, num_source)
+
+    mean_values : np.array
+        the mean values on the source groups
+
+    abs_covariance_matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        the absolute covariance matrix on the source groups, which is only
+        multiplied with and never expanded
+
+    Returns
+    -------
+    np.array, np.array
+        the mean values and the relative covariance matrix on the
+        target groups
+
+    """
+    mean = operator @ np.asarray(mean_values, dtype=float)
+    transpose = operator.transpose().todense()
+    abs_covariance = operator @ (abs_covariance_matrix @ transpose)
+    # symmetric up to round-off from the order of the products
+    abs_covariance = (abs_covariance + abs_covariance.T) / 2
+    return mean, scale_outer(abs_covariance, safe_reciprocal(mean))
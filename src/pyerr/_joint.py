@@ -0,0 +1,202 @@
+import numpy as np
+from functools import cached_property
+from pyerr._linalg import covariance_to_correlation, scale_outer
+from pyerr._sampling import EIGEN_QUANTITIES, PCAMixin
+
+# derived quantities that are computed on first access and then cached
+CACHED_QUANTITIES = (
+    "uncertainty",
+    "abs_uncertainty",
+    "correlation_matrix",
+    "abs_covariance_matrix",
+    *EIGEN_QUANTITIES,
+)
+
+
+class JointCovariance(PCAMixin):
+    """
+    Class to hold the joint covariance of several reactions (MT values) on
+    the same energy grid, including the covariance between reactions
+
+    The joint vector is the mean values of each reaction, one after the
+    other in the order of mts, and the joint covariance matrix has one block
+    for each pair of reactions. Eigenpairs and PCA realizations of the joint
+    matrix sample the reactions together, with their correlations.
+
+    Parameters
+    ----------
+    sections : dictionary
+        Section objects by MT number, which have to have the same group
+        boundaries. The diagonal blocks are their covariance matrices
+
+    blocks : dictionary, optional, default is None
+        relative covariance block for (MT, MT1) pairs, with the groups of MT
+        as rows and the groups of MT1 as columns. The block for (MT1, MT) is
+        the transpose of the block for (MT, MT1), and blocks that are not
+        given in either order are zero
+
+    Attributes
+    ----------
+    The uncertainties, correlation and absolute covariance matrices,
+    eigenvalues and eigenvectors are only computed the first time they
+    are accessed, and are then cached.
+
+    mts : list
+        the MT numbers, in the order of the joint vector
+
+    group_boundaries : np.array
+        Boundaries of the energy groups, shared with the sections
+
+    num_groups : int
+        Number of energy groups of each reaction
+
+    slices : dictionary
+        slice of the joint vector of each MT number
+
+    mean_values : np.array
+        Mean values of all of the reactions
+
+    covariance_matrix : np.array
+        Joint relative covariance matrix
+
+    abs_covariance_matrix : np.array
+        Joint absolute covariance matrix
+
+    uncertainty : np.array
+        The relative uncertainty values
+
+    abs_uncertainty : np.array
+        The absolute uncertainty values
+
+    correlation_matrix : np.array
+        Joint correlation matrix
+
+    eig_vals : np.array
+        Sorted (largest to smallest) eigen values of the
+        joint absolute covariance matrix
+
+    eig_vects : np.array
+        Sorted (largest to smallest) eigen vectors of the
+        joint absolute covariance matrix
+
+    eig_info : dictionary
+        The eigensolver that was used, the number of eigenpairs,
+        the fraction of the variance they explain, and their
+        largest relative residual
+
+    Methods
+    -------
+    block
+        Function to get the covariance block of two reactions
+
+    split
+        Function to split joint vectors into the values of each reaction
+
+    get_eigenvalues
+        Function to get sorted eigenvalues and eigenvectors
+        of the joint absolute covariance matrix
+
+    get_pca_realizations
+        Function to sample correlated realizations of all of the
+        reactions by PCA
+
+    iter_pca_realizations
+        Function to sample correlated realizations of all of the
+        reactions by PCA, and yield them in chunks
+
+    clear_cache
+        Function to drop the cached derived quantities
+
+    """
+
+    _cached_quantities = CACHED_QUANTITIES
+
+    def __init__(self, sections, blocks=None):
+        blocks = blocks or {}
+        self.mts = list(sections)
+        if len(self.mts) == 0:
+            raise ValueError("A joint covariance needs at least one section")
+
+        first = sections[self.mts[0]]
+        self.group_boundaries = first.group_boundaries
+        self.num_groups = first.num_groups
+        for mt in self.mts[1:]:
+            if not np.array_equal(sections[mt].group_boundaries, self.group_boundaries):
+                raise ValueError(f"MT{mt} does not have the same energy groups as MT{self.mts[0]}")
+
+        self.slices = {
+            mt: slice(i * self.num_groups, (i + 1) * self.num_groups)
+            for i, mt in enumerate(self.mts)
+        }
+        self.mean_values = np.concatenate([sections[mt].mean_values for mt in self.mts])
+
+        size = len(self.mts) * self.num_groups
+        self.covariance_matrix = np.zeros((size, size))
+        for mt in self.mts:
+            rows = self.slices[mt]
+            self.covariance_matrix[rows, rows] = np.asarray(sections[mt].covariance_matrix)
+        for (mt, mt1), block in blocks.items():
+            if mt == mt1 or mt not in self.slices or mt1 not in self.slices:
+                continue
+            self.covariance_matrix[self.slices[mt], self.slices[mt1]] = block
+            self.covariance_matrix[self.slices[mt1], self.slices[mt]] = np.transpose(block)
+
+    def __repr__(self):
+        return f"JointCovariance(mts={self.mts}, num_groups={self.num_groups})"
+
+    @cached_property
+    def uncertainty(self):
+        return np.sqrt(np.diag(self.covariance_matrix))
+
+    @cached_property
+    def abs_uncertainty(self):
+        return self.uncertainty * self.mean_values
+
+    @cached_property
+    def correlation_matrix(self):
+        return covariance_to_correlation(self.covariance_matrix, self.uncertainty)
+
+    @cached_property
+    def abs_covariance_matrix(self):
+        return scale_outer(self.covariance_matrix, self.mean_values)
+
+    def block(self, mt, mt1, absolute=False):
+        """Function to get the covariance block of two reactions
+
+        Parameters
+        ----------
+        mt : int
+            MT number of the rows
+
+        mt1 : int
+            MT number of the columns
+
+        absolute : bool, optional, default is False
+            if True, the block of the absolute covariance matrix is returned,
+            otherwise the block of the relative covariance matrix
+
+        Returns
+        -------
+        np.array
+            2D view of the block of the joint matrix
+
+        """
+        matrix = self.abs_covariance_matrix if absolute else self.covariance_matrix
+        return matrix[self.slices[mt], self.slices[mt1]]
+
+    def split(self, values):
+        """Function to split joint vectors into the values of each reaction
+
+        Parameters
+        ----------
+        values : np.array
+            array with the joint vector along its last axis, for example
+            the mean values or realizations
+
+        Returns
+        -------
+        dictionary
+            view of the values of each MT number
+
+        """
+        return {mt: values[..., self.slices[mt]] for mt in self.mts}
@@ -0,0 +1,337 @@
+import numpy as np
+from pyerr._packed import PackedSymmetricMatrix
+from pyerr._sparse import CSRMatrix
+
+EIGEN_METHODS = ("auto", "full", "subset", "randomized")
+
+# initial subspace size of the randomized range finder when k is not given
+RANDOMIZED_START = 32
+
+
+def safe_reciprocal(values):
+    """Function to take the reciprocal of a vector, with zeros mapped to zero
+
+    Parameters
+    ----------
+    values : np.array
+        1D array of values
+
+    Returns
+    -------
+    np.array
+        1D array of 1 / values, with 0 wherever values is 0
+
+    """
+    values = np.asarray(values, dtype=float)
+    reciprocal = np.zeros_like(values)
+    np.divide(1.0, values, out=reciprocal, where=values != 0)
+    return reciprocal
+
+
+def scale_outer(matrix, left, right=None, out=None):
+    """Function to scale a matrix by the outer product of two vectors,
+    out[i, j] = matrix[i, j] * left[i] * right[j]
+
+    This is the same as diag(left) @ matrix @ diag(right), but is done with
+    broadcasting in O(n^2) and without any n x n temporaries.
+
+    Parameters
+    ----------
+    matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        2D array to scale. A packed matrix can only be scaled symmetrically,
+        with right None. out has to have the same storage as matrix
+
+    left : np.array
+        1D array of row scales
+
+    right : np.array, optional, default is None
+        1D array of column scales. If None, left is used
+
+    out : np.array, optional, default is None
+        2D array to write the result to, which can be matrix itself to scale
+        in place. If None, a new array is allocated
+
+    Returns
+    -------
+    np.array
+        the scaled matrix
+
+    """
+    if isinstance(matrix, PackedSymmetricMatrix):
+        if right is not None:
+            raise ValueError("A packed symmetric matrix can only be scaled by one vector")
+        return matrix.scale(left, out)
+    if isinstance(matrix, CSRMatrix):
+        return matrix.scale(left, right, out)
+
+    left = np.asarray(left, dtype=float)
+    right = left if right is None else np.asarray(right, dtype=float)
+    out = np.multiply(matrix, left[:, None], out=out)
+    return np.multiply(out, right[None, :], out=out)
+
+
+def covariance_to_correlation(covariance, std=None, out=None):
+    """Function to convert a covariance matrix into a correlation matrix
+
+    Groups with zero standard deviation have no defined correlation. Their
+    rows and columns are set to zero and their diagonal to one, so that the
+    result stays a valid correlation matrix instead of containing inf/NaN.
+
+    Parameters
+    ----------
+    covariance : np.array, PackedSymmetricMatrix or CSRMatrix
+        2D covariance matrix
+
+    std : np.array, optional, default is None
+        1D array of standard deviations. If None, the square root of the
+        diagonal of the covariance matrix is used
+
+    out : np.array, optional, default is None
+        2D array to write the result to, which can be covariance itself to
+        convert in place. If None, a new array is allocated
+
+    Returns
+    -------
+    np.array
+        the correlation matrix
+
+    """
+    if std is None:
+        std = np.sqrt(covariance.diagonal())
+    correlation = scale_outer(covariance, safe_reciprocal(std), out=out)
+    if isinstance(correlation, np.ndarray):
+        np.fill_diagonal(correlation, 1.0)
+    else:
+        correlation.fill_diagonal(1.0)
+    return correlation
+
+
+def correlation_to_covariance(correlation, std, out=None):
+    """Function to convert a correlation matrix into a covariance matrix
+
+    Parameters
+    ----------
+    correlation : np.array
+        2D correlation matrix
+
+    std : np.array
+        1D array of standard deviations
+
+    out : np.array, optional, default is None
+        2D array to write the result to, which can be correlation itself to
+        convert in place. If None, a new array is allocated
+
+    Returns
+    -------
+    np.array
+        the covariance matrix
+
+    """
+    return scale_outer(correlation, std, out=out)
+
+
+def leading_eigenpairs(
+    matrix,
+    k=None,
+    variance_fraction=None,
+    method="auto",
+    oversampling=10,
+    power_iterations=4,
+    seed=None,
+):
+    """Function to get the leading eigenvalues and eigenvectors of a
+    symmetric matrix, sorted from largest to smallest
+
+    Parameters
+    ----------
+    matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        2D symmetric matrix. Packed and sparse matrices are only expanded
+        for the "full" and "subset" solvers, the "randomized" solver only
+        multiplies with them
+
+    k : int, optional, default is None
+        the number of eigenpairs to compute. If None and variance_fraction
+        is None, all of them are computed
+
+    variance_fraction : float, optional, default is None
+        if given, the smallest number of eigenpairs whose eigenvalues sum to
+        at least this fraction of the trace are computed
+
+    method : str, optional, default is "auto"
+        the eigensolver, one of EIGEN_METHODS. "full" uses numpy.linalg.eigh
+        and keeps the leading pairs, "subset" uses scipy.linalg.eigh to only
+        compute the leading pairs, and "randomized" uses a randomized range
+        finder with power iterations. "auto" uses "full" when all pairs, or
+        more than half of them, are requested and "randomized" otherwise,
+        since "subset" still reduces the whole matrix to tridiagonal form.
+        The truncated solvers switch to "full" when a variance fraction
+        turns out to need too many of the pairs
+
+    oversampling : int, optional, default is 10
+        number of extra vectors in the randomized range finder
+
+    power_iterations : int, optional, default is 4
+        number of power iterations in the randomized range finder
+
+    seed : int or np.random.Generator, optional, default is None
+        seed for the randomized range finder
+
+    Returns
+    -------
+    eig_vals : np.array
+        the leading eigenvalues, from largest to smallest
+
+    eig_vects : np.array
+        the corresponding eigenvectors, one per column
+
+    info : dictionary
+        the "method" that was used, the "num_eigenpairs", the fraction of the
+        trace in the eigenvalues ("explained_variance") and the largest
+        relative residual |matrix v - lambda v| / |lambda_max| of the pairs
+        ("residual"), which is None when all of the pairs were computed
+        with "full"
+
+    """
+    if method not in EIGEN_METHODS:
+        raise ValueError(f"Unknown eigensolver '{method}', must be one of {EIGEN_METHODS}")
+    if variance_fraction is not None and not 0 < variance_fraction <= 1:
+        raise ValueError("variance_fraction must be in (0, 1]")
+
+    num_rows = len(matrix)
+    truncated = k is not None or variance_fraction is not None
+    if k is not None:
+        k = max(1, min(k, num_rows))
+
+    if method == "auto":
+        method = "randomized" if truncated and (k or 0) <= num_rows // 2 else "full"
+
+    trace = matrix.trace()
+    if method == "subset" and not isinstance(matrix, np.ndarray):
+        matrix = np.asarray(matrix)
+
+    # the truncated solvers give up, with None, when a variance fraction
+    # needs too many pairs for them to be faster than the full solve
+    eigenpairs = None
+    if method == "randomized":
+        eigenpairs = _randomized_eigenpairs(
+            matrix, k, variance_fraction, trace, oversampling, power_iterations, seed
+        )
+    elif method == "subset":
+        eigenpairs = _subset_eigenpairs(matrix, k, variance_fraction, trace)
+
+    if eigenpairs is not None:
+        eig_vals, eig_vects = eigenpairs
+    else:
+        method = "full"
+        if not isinstance(matrix, np.ndarray):
+            matrix = np.asarray(matrix)
+        eig_vals, eig_vects = np.linalg.eigh(matrix)
+
+        # indices for sorting
+        idx = eig_vals.argsort()[::-1]
+        eig_vals = eig_vals[idx]
+        eig_vects = eig_vects[:, idx]
+
+    if variance_fraction is not None:
+        num_needed = _num_for_fraction(eig_vals, variance_fraction, trace)
+        k = num_needed if k is None else min(k, num_needed)
+    if k is not None:
+        eig_vals = eig_vals[:k]
+        eig_vects = eig_vects[:, :k]
+
+    info = {
+        "method": method,
+        "num_eigenpairs": len(eig_vals),
+        "explained_variance": np.sum(eig_vals) / trace if trace != 0 else 1.0,
+        "residual": None,
+    }
+    if truncated or method != "full":
+        residual = matrix @ eig_vects - eig_vects * eig_vals
+        scale = np.max(np.abs(eig_vals)) if len(eig_vals) > 0 else 1.0
+        info["residual"] = np.max(np.linalg.norm(residual, axis=0)) / (scale or 1.0)
+
+    return eig_vals, eig_vects, info
+
+
+def _scipy_eigh():
+    """Function to get scipy.linalg.eigh, or None if scipy is not installed"""
+    try:
+        from scipy.linalg import eigh
+    except ImportError:
+        return None
+    return eigh
+
+
+def _num_for_fraction(eig_vals, variance_fraction, trace):
+    """Function to get the number of leading eigenvalues needed to reach a
+    fraction of the trace"""
+    cumulative = np.cumsum(eig_vals)
+    return min(int(np.searchsorted(cumulative, variance_fraction * trace)) + 1, len(eig_vals))
+
+
+def _next_size(eig_vals, target, limit):
+    """Function to get the next number of eigenpairs to compute when the
+    leading eig_vals do not reach the target variance. The other eigenvalues
+    are at most the smallest one so far, which bounds how many are needed"""
+    missing = target - np.sum(eig_vals)
+    smallest = max(eig_vals[-1], np.finfo(float).tiny)
+    needed = len(eig_vals) + int(min(np.ceil(missing / smallest), limit))
+    return min(limit, max(2 * len(eig_vals), needed))
+
+
+def _subset_eigenpairs(matrix, k, variance_fraction, trace):
+    """Function to compute only the leading eigenpairs with scipy. When a
+    variance fraction is requested, the leading RANDOMIZED_START pairs are
+    computed first instead of all of the eigenvalues. Each solve reduces the
+    whole matrix again, so if they are not enough, the leading k pairs are
+    computed if k is given and None is returned otherwise"""
+    eigh = _scipy_eigh()
+    if eigh is None:
+        raise ImportError("The 'subset' eigensolver requires scipy")
+
+    num_rows = len(matrix)
+    limit = num_rows if k is None else k
+    size = limit if variance_fraction is None else min(limit, RANDOMIZED_START)
+
+    while True:
+        eig_vals, eig_vects = eigh(matrix, subset_by_index=[num_rows - size, num_rows - 1])
+        eig_vals, eig_vects = eig_vals[::-1], eig_vects[:, ::-1]
+
+        enough = variance_fraction is None or np.sum(eig_vals) >= variance_fraction * trace
+        if enough or size == limit:
+            return eig_vals, eig_vects
+        if k is None:
+            return None
+        size = limit
+
+
+def _randomized_eigenpairs(
+    matrix, k, variance_fraction, trace, oversampling, power_iterations, seed
+):
+    """Function to approximate the leading eigenpairs with a randomized range
+    finder. When a variance fraction is requested, the size of the subspace
+    is grown until the Ritz values reach that fraction of the trace, or
+    None is returned once it would be more than half of the matrix"""
+    rng = np.random.default_rng(seed)
+    num_rows = len(matrix)
+    if k is None and variance_fraction is None:
+        k = num_rows
+    size = min(num_rows, (k or RANDOMIZED_START) + oversampling)
+
+    while True:
+        basis, _ = np.linalg.qr(matrix @ rng.standard_normal((num_rows, size)))
+        for _ in range(power_iterations):
+            basis, _ = np.linalg.qr(matrix @ basis)
+
+        # Rayleigh-Ritz on the subspace
+        eig_vals, ritz_vects = np.linalg.eigh(basis.T @ (matrix @ basis))
+        idx = eig_vals.argsort()[::-1]
+        eig_vals = eig_vals[idx]
+        eig_vects = basis @ ritz_vects[:, idx]
+
+        enough = k is not None or np.sum(eig_vals) >= variance_fraction * trace
+        if enough or size == num_rows:
+            return eig_vals, eig_vects
+        size = _next_size(eig_vals, variance_fraction * trace, num_rows) + oversampling
+        if size > num_rows // 2:
+            return None
@@ -1,5 +1,5 @@
 from pyerr.base import Values
-import fortranformat as ff
+from pyerr.base._records import read_cont, check_engine, fortran_reader
 import numpy as np
 
 
@@ -15,6 +15,9 @@ class MeanControl:
     lines : list
         list of control lines from the file
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" or "fortranformat"
+
     Attributes
     ----------
     lines : list
@@ -45,8 +48,9 @@ class MeanControl:
         Parse the control lines by their format string
     """
 
-    def __init__(self, line):
+    def __init__(self, line, engine="numpy"):
         self.line = line
+        self.engine = check_engine(engine)
         self.parse_line()
 
         self.num_groups = self.parsed_values[4]
@@ -70,7 +74,12 @@ class MeanControl:
         None, sets the attribute self.parsed_values
 
         """
-        control_line = ff.FortranRecordReader("(2G11.0,4I11,I4,I2,I3,I5)")
+        if self.engine == "numpy":
+            floats, integers = read_cont([self.line])
+            self.parsed_values = floats[0].tolist() + integers[0].tolist()
+            return
+
+        control_line = fortran_reader("(2G11.0,4I11,I4,I2,I3,I5)")
         self.parsed_values = control_line.read(self.line)
 
 
@@ -87,6 +96,9 @@ class MeanValues(Values):
         Number of values in the list, so that zeros at the
         end of the list can be removed
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" or "fortranformat"
+
     Attributes
     ----------
     lines : list
@@ -108,8 +120,8 @@ class MeanValues(Values):
 
     """
 
-    def __init__(self, lines, num_values):
-        super().__init__(lines)
+    def __init__(self, lines, num_values, engine="numpy"):
+        super().__init__(lines, engine)
         self.num_values = num_values
         self.parsed_values = np.array(self.parsed_values[:num_values])
 
@@ -126,6 +138,9 @@ class Mean:
     indices : tuple
         indices for cutting at the upper and lower limits
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" or "fortranformat"
+
     Attributes
     ----------
     control : MeanControl object
@@ -154,9 +169,9 @@ class Mean:
 
     """
 
-    def __init__(self, lines, indices):
-        self._control = MeanControl(lines[0])
-        self._values = MeanValues(lines[1:-2], self._control.num_groups)
+    def __init__(self, lines, indices, engine="numpy"):
+        self._control = MeanControl(lines[0], engine)
+        self._values = MeanValues(lines[1:-2], self._control.num_groups, engine)
         self.values = self._values.parsed_values[indices[0] : indices[1]]
 
     # @property
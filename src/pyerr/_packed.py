@@ -0,0 +1,389 @@
+import numpy as np
+
+# number of rows expanded at a time, to bound the size of the temporaries
+ROW_BLOCK = 256
+
+
+def packed_size(size):
+    """Function to get the number of stored values of a packed symmetric
+    matrix, size * (size + 1) / 2
+
+    Parameters
+    ----------
+    size : int
+        number of rows of the matrix
+
+    Returns
+    -------
+    int
+        the length of the packed data
+
+    """
+    return size * (size + 1) // 2
+
+
+class PackedSymmetricMatrix:
+    """
+    Class to hold a symmetric matrix by only its upper triangle, packed row
+    by row into a flat array, which is about half the memory of the full
+    matrix
+
+    Row i of the upper triangle, columns i to size - 1, is stored at
+    data[offsets[i] : offsets[i + 1]]. Rows are expanded on demand, and
+    products with vectors, the diagonal, scaling and energy windows work
+    on the packed data directly. numpy functions that need the full matrix,
+    such as np.asarray or np.linalg.eigh, get it from __array__.
+
+    Parameters
+    ----------
+    data : np.array
+        1D array of length packed_size(size), for example a np.memmap
+
+    size : int
+        number of rows of the matrix
+
+    Attributes
+    ----------
+    data : np.array
+        the packed upper triangle
+
+    size : int
+        number of rows of the matrix
+
+    shape : tuple
+        (size, size)
+
+    offsets : np.array
+        start of each packed row in data, with size + 1 values
+
+    Methods
+    -------
+    from_dense
+        Function to pack the upper triangle of a full matrix
+
+    index
+        Function to get the position of elements in the packed data
+
+    put
+        Function to set elements of the matrix
+
+    rows
+        Function to expand a block of full rows
+
+    diagonal
+        Function to get the diagonal
+
+    trace
+        Function to get the sum of the diagonal
+
+    fill_diagonal
+        Function to set every diagonal element
+
+    todense
+        Function to expand the full matrix
+
+    matvec
+        Function to multiply the matrix with a vector or matrix
+
+    scale
+        Function to scale the matrix by the outer product of a vector
+        with itself
+
+    window
+        Function to get the packed sub-matrix of a range of rows and columns
+
+    """
+
+    # numpy defers "array @ packed" to __rmatmul__ instead of expanding it
+    __array_ufunc__ = None
+
+    def __init__(self, data, size):
+        if len(data) != packed_size(size):
+            raise ValueError(
+                f"Packed data has {len(data)} values, expected {packed_size(size)} for size {size}"
+            )
+        self.data = data
+        self.size = size
+        rows = np.arange(size + 1)
+        self.offsets = rows * size - rows * (rows - 1) // 2
+
+    def __repr__(self):
+        return f"PackedSymmetricMatrix(size={self.size})"
+
+    def __len__(self):
+        return self.size
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.todense()
+        return dense if dtype is None else dense.astype(dtype)
+
+    def __matmul__(self, other):
+        return self.matvec(other)
+
+    def __rmatmul__(self, other):
+        # other @ A = (A @ other.T).T, since A is symmetric
+        other = np.asarray(other)
+        if other.ndim == 1:
+            return self.matvec(other)
+        return self.matvec(other.T).T
+
+    @property
+    def shape(self):
+        return (self.size, self.size)
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    @classmethod
+    def from_dense(cls, matrix, out=None):
+        """Function to pack the upper triangle of a full matrix
+
+        Parameters
+        ----------
+        matrix : np.array
+            2D symmetric matrix
+
+        out : np.array, optional, default is None
+            1D array to write the packed data to. If None, a new array
+            is allocated
+
+        Returns
+        -------
+        PackedSymmetricMatrix
+            the packed matrix
+
+        """
+        size = len(matrix)
+        packed = cls(np.empty(packed_size(size)) if out is None else out, size)
+        for i in range(size):
+            packed.data[packed.offsets[i] : packed.offsets[i + 1]] = matrix[i, i:]
+        return packed
+
+    def index(self, rows, columns):
+        """Function to get the position of elements in the packed data
+
+        Parameters
+        ----------
+        rows : np.array
+            row indices
+
+        columns : np.array
+            column indices, broadcast with rows
+
+        Returns
+        -------
+        np.array
+            positions in data of the elements (rows, columns), which are the
+            same as the positions of the elements (columns, rows)
+
+        """
+        rows = np.asarray(rows)
+        columns = np.asarray(columns)
+        lower = np.minimum(rows, columns)
+        return self.offsets[lower] + np.maximum(rows, columns) - lower
+
+    def put(self, rows, columns, values):
+        """Function to set elements of the matrix, which also sets the
+        symmetric elements
+
+        Parameters
+        ----------
+        rows : np.array
+            row indices
+
+        columns : np.array
+            column indices, broadcast with rows
+
+        values : np.array
+            the values, broadcast with rows and columns
+
+        Returns
+        -------
+        None
+
+        """
+        self.data[self.index(rows, columns)] = values
+
+    def rows(self, start, stop):
+        """Function to expand a block of full rows
+
+        Parameters
+        ----------
+        start : int
+            first row
+
+        stop : int
+            row after the last one
+
+        Returns
+        -------
+        np.array
+            2D array of shape (stop - start, size)
+
+        """
+        rows = np.arange(start, stop)[:, np.newaxis]
+        return self.data[self.index(rows, np.arange(self.size)[np.newaxis, :])]
+
+    def diagonal(self):
+        """Function to get the diagonal
+
+        Returns
+        -------
+        np.array
+            1D array of the diagonal elements
+
+        """
+        return self.data[self.offsets[:-1]]
+
+    def trace(self):
+        """Function to get the sum of the diagonal
+
+        Returns
+        -------
+        float
+            the trace
+
+        """
+        return np.sum(self.diagonal())
+
+    def fill_diagonal(self, value):
+        """Function to set every diagonal element
+
+        Parameters
+        ----------
+        value : float
+            the diagonal value
+
+        Returns
+        -------
+        None
+
+        """
+        self.data[self.offsets[:-1]] = value
+
+    def todense(self, out=None):
+        """Function to expand the full matrix
+
+        Parameters
+        ----------
+        out : np.array, optional, default is None
+            2D array of shape (size, size) to write to. If None, a new
+            array is allocated
+
+        Returns
+        -------
+        np.array
+            the full symmetric matrix
+
+        """
+        if out is None:
+            out = np.empty(self.shape, dtype=self.dtype)
+        for start in range(0, self.size, ROW_BLOCK):
+            stop = min(start + ROW_BLOCK, self.size)
+            out[start:stop] = self.rows(start, stop)
+        return out
+
+    def matvec(self, vector):
+        """Function to multiply the matrix with a vector or matrix
+
+        The product is built from blocks of the upper triangle U, as
+        U @ vector + U.T @ vector - diagonal * vector, so every value is only
+        read once and the products are done by BLAS.
+
+        Parameters
+        ----------
+        vector : np.array
+            1D array of length size, or 2D array with size rows
+
+        Returns
+        -------
+        np.array
+            the product, with the same shape as vector
+
+        """
+        vector = np.asarray(vector)
+        product = np.zeros(vector.shape, dtype=np.result_type(self.dtype, vector.dtype))
+        for start in range(0, self.size, ROW_BLOCK):
+            stop = min(start + ROW_BLOCK, self.size)
+            upper = self._upper_rows(start, stop)
+            product[start:stop] += upper @ vector[start:]
+            product[start:] += upper.T @ vector[start:stop]
+
+        # the diagonal is in both U and U.T
+        product -= (self.diagonal() * vector.T).T
+        return product
+
+    def _upper_rows(self, start, stop):
+        """Function to expand the upper triangle of a block of rows, from
+        column start on, with zeros left of the diagonal"""
+        upper = np.zeros((stop - start, self.size - start), dtype=self.dtype)
+        for i in range(start, stop):
+            upper[i - start, i - start :] = self.data[self.offsets[i] : self.offsets[i + 1]]
+        return upper
+
+    def scale(self, scales, out=None):
+        """Function to scale the matrix by the outer product of a vector
+        with itself, out[i, j] = A[i, j] * scales[i] * scales[j]
+
+        Parameters
+        ----------
+        scales : np.array
+            1D array of scales
+
+        out : PackedSymmetricMatrix, optional, default is None
+            packed matrix of the same size to write to, which can be self to
+            scale in place. If None, a new one is allocated
+
+        Returns
+        -------
+        PackedSymmetricMatrix
+            the scaled matrix
+
+        """
+        scales = np.asarray(scales, dtype=float)
+        if out is None:
+            out = PackedSymmetricMatrix(np.empty(len(self.data)), self.size)
+        for i in range(self.size):
+            row = slice(self.offsets[i], self.offsets[i + 1])
+            np.multiply(self.data[row], scales[i] * scales[i:], out=out.data[row])
+        return out
+
+    def window(self, start, stop, out=None):
+        """Function to get the packed sub-matrix of the rows and columns
+        start to stop - 1, for example the groups within energy limits
+
+        Parameters
+        ----------
+        start : int
+            first row and column
+
+        stop : int
+            row and column after the last one
+
+        out : np.array, optional, default is None
+            1D array of length packed_size(stop - start) to write the packed
+            data to. If None, a new array is allocated
+
+        Returns
+        -------
+        PackedSymmetricMatrix
+            the sub-matrix
+
+        """
+        size = stop - start
+        window = PackedSymmetricMatrix(np.empty(packed_size(size)) if out is None else out, size)
+        for i in range(size):
+            first = self.offsets[start + i]
+            window.data[window.offsets[i] : window.offsets[i + 1]] = self.data[
+                first : first + size - i
+            ]
+        return window
@@ -0,0 +1,216 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+from pyerr._sampling import SAMPLE_BLOCK, DEFAULT_CHUNK_SIZE, pca_factor, transform_samples
+
+# (factor, mean values, output) arrays of each section in a worker process,
+# set when the worker starts
+_WORKER_ARRAYS = {}
+
+
+def sample_sections(
+    sections,
+    num_samples,
+    k=None,
+    seed=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    max_workers=None,
+    output_dir=None,
+):
+    """Function to sample PCA realizations of many sections in parallel
+
+    The samples of each section are split into chunks, and the (section, chunk)
+    work items are spread over a process pool. Each block of SAMPLE_BLOCK
+    samples draws from its own random stream, seeded from the root seed and
+    the (section, block) indices, so the results only depend on the seed, and
+    not on the chunk size or the number of workers. The PCA factors and mean
+    values are put in shared memory once instead of being pickled for every
+    work item, and the workers write their realizations directly into the
+    returned arrays, which are in shared memory as well.
+
+    Parameters
+    ----------
+    sections : dictionary
+        Section objects by MT number, for example ErrorrOutput.sections
+
+    num_samples : int
+        the number of samples of each section
+
+    k : int, optional, default is None
+        the number of eigenvalues to use. If None, will use
+        all of the eigenvalues of each covariance matrix
+
+    seed : int, np.random.SeedSequence or np.random.Generator, optional
+        root seed of the random streams, default is None for fresh entropy. A
+        Generator gives the root seed from its next random integer
+
+    chunk_size : int, optional, default is DEFAULT_CHUNK_SIZE
+        the number of samples in each work item. Multiples of SAMPLE_BLOCK
+        avoid drawing the random numbers of a block twice
+
+    max_workers : int, optional, default is None
+        the number of worker processes. If None, os.cpu_count() is used. If 1,
+        the samples are drawn in this process
+
+    output_dir : str or Path, optional, default is None
+        if given, the realizations of each section are written to a
+        "MT<mt>.npy" file in this directory and returned as memory maps,
+        instead of being held in memory
+
+    Returns
+    -------
+    dictionary
+        2D array of shape (num_samples, num_groups) of realizations for
+        each MT number
+
+    """
+    if isinstance(seed, np.random.Generator):
+        root = np.random.SeedSequence(int(seed.integers(2**63)))
+    elif isinstance(seed, np.random.SeedSequence):
+        root = seed
+    else:
+        root = np.random.SeedSequence(seed)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    mts = list(sections)
+    factors = {mt: pca_factor(sections[mt].eig_vals, sections[mt].eig_vects, k) for mt in mts}
+    means = {mt: np.asarray(sections[mt].mean_values, dtype=float) for mt in mts}
+
+    outputs = {}
+    for mt in mts:
+        shape = (num_samples, len(means[mt]))
+        if output_dir is None and max_workers == 1:
+            outputs[mt] = np.empty(shape)
+        elif output_dir is None:
+            outputs[mt] = _shared_array(shape)
+        else:
+            path = os.path.join(output_dir, f"MT{mt}.npy")
+            outputs[mt] = np.lib.format.open_memmap(path, mode="w+", shape=shape)
+
+    tasks = []
+    for i, mt in enumerate(mts):
+        for start in range(0, num_samples, chunk_size):
+            stop = min(start + chunk_size, num_samples)
+            tasks.append((mt, start, stop, root, i))
+
+    if max_workers == 1:
+        for mt, start, stop, root, i in tasks:
+            _sample_chunk(factors[mt], means[mt], outputs[mt], start, stop, root, i)
+    else:
+        _sample_in_pool(tasks, factors, means, outputs, max_workers)
+
+    for out in outputs.values():
+        if isinstance(out, np.memmap):
+            out.flush()
+    return outputs
+
+
+def block_seed(root, section_index, block_index):
+    """Function to get the seed of the random stream of one block of
+    SAMPLE_BLOCK samples of a section
+
+    Parameters
+    ----------
+    root : np.random.SeedSequence
+        the root seed
+
+    section_index : int
+        index of the section
+
+    block_index : int
+        index of the block within the section, sample // SAMPLE_BLOCK
+
+    Returns
+    -------
+    np.random.SeedSequence
+        an independent seed for the block
+
+    """
+    return np.random.SeedSequence(
+        root.entropy, spawn_key=tuple(root.spawn_key) + (section_index, block_index)
+    )
+
+
+def _sample_chunk(factor, mean_values, out, start, stop, root, section_index):
+    """Function to draw the realizations of one work item into out[start:stop]
+
+    A chunk that starts within a block draws the numbers of the block up to
+    its last sample and keeps its own, so the samples do not depend on how
+    the blocks are split into chunks."""
+    gaussian_samples = np.empty((stop - start, factor.shape[1]))
+    position = start
+    while position < stop:
+        block_start = position - position % SAMPLE_BLOCK
+        block_stop = min(block_start + SAMPLE_BLOCK, stop)
+        rng = np.random.default_rng(block_seed(root, section_index, block_start // SAMPLE_BLOCK))
+        draws = rng.standard_normal((block_stop - block_start, factor.shape[1]))
+        gaussian_samples[position - start : block_stop - start] = draws[position - block_start :]
+        position = block_stop
+    transform_samples(gaussian_samples, factor, mean_values, out[start:stop], start)
+
+
+def _sample_in_pool(tasks, factors, means, outputs, max_workers):
+    """Function to run the work items on a process pool. The inputs are
+    copied to shared memory, and the workers get them, and the outputs, when
+    they start, so only the sample ranges and seeds of the work items are
+    pickled"""
+    arrays = {
+        mt: (
+            _shared_spec(_shared_array(factors[mt].shape, factors[mt])),
+            _shared_spec(_shared_array(means[mt].shape, means[mt])),
+            _shared_spec(outputs[mt]),
+        )
+        for mt in factors
+    }
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_start_worker, initargs=(arrays,)
+    ) as pool:
+        for _ in pool.map(_sample_worker_chunk, tasks):
+            pass
+
+
+def _shared_array(shape, values=None):
+    """Function to allocate an array in shared memory, which is freed once
+    the array and its views are no longer used"""
+    size = int(np.prod(shape))
+    array = np.frombuffer(RawArray("d", max(size, 1)), dtype=np.float64, count=size)
+    array = array.reshape(shape)
+    if values is not None:
+        array[...] = values
+    return array
+
+
+def _shared_spec(array):
+    """Function to get what a worker needs to use an output array, the file
+    name of a memory map or the shared memory of an array from _shared_array"""
+    if isinstance(array, np.memmap):
+        return ("file", array.filename, array.shape)
+    shape = array.shape
+    while isinstance(array, np.ndarray):
+        array = array.base
+    return ("shared", array, shape)
+
+
+def _start_worker(arrays):
+    """Function run by each worker process when it starts, to get the arrays"""
+    _WORKER_ARRAYS.clear()
+    for mt, specs in arrays.items():
+        _WORKER_ARRAYS[mt] = tuple(_from_spec(spec) for spec in specs)
+
+
+def _from_spec(spec):
+    """Function to get an array in a worker process from its spec"""
+    kind, source, shape = spec
+    if kind == "file":
+        return np.load(source, mmap_mode="r+")
+    size = int(np.prod(shape))
+    return np.frombuffer(source, dtype=np.float64, count=size).reshape(shape)
+
+
+def _sample_worker_chunk(task):
+    """Function run by the worker processes for one work item"""
+    mt, start, stop, root, section_index = task
+    factor, mean_values, out = _WORKER_ARRAYS[mt]
+    _sample_chunk(factor, mean_values, out, start, stop, root, section_index)
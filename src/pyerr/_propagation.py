@@ -0,0 +1,46 @@
+import numpy as np
+
+PROPAGATION_METHODS = ("auto", "direct", "eig", "cholesky")
+
+
+def sandwich(sensitivities, matrix=None, factor=None, full=False):
+    """Function to apply the sandwich rule, S C S^T, to many sensitivity
+    vectors at once
+
+    The covariance is either given as a matrix C, or as a factor F with
+    C = F F^T, for example from the eigenpairs or a Cholesky decomposition.
+    With a factor of k columns, the cost is O(m n k) instead of O(m n^2).
+
+    Parameters
+    ----------
+    sensitivities : np.array
+        2D array of shape (m, n), one sensitivity vector per row
+
+    matrix : np.array, PackedSymmetricMatrix or CSRMatrix, optional
+        the (n, n) covariance matrix C
+
+    factor : np.array, optional
+        a (n, k) factor F of the covariance matrix, used instead of matrix
+
+    full : bool, optional, default is False
+        if True, the (m, m) covariance of the responses is returned,
+        otherwise only its diagonal, the variances
+
+    Returns
+    -------
+    np.array
+        the (m,) variances or the (m, m) covariance of the responses
+
+    """
+    if factor is not None:
+        projected = sensitivities @ factor
+        if full:
+            return projected @ projected.T
+        return np.einsum("ij,ij->i", projected, projected)
+
+    if matrix is None:
+        raise ValueError("Either a covariance matrix or a factor has to be given")
+    product = matrix @ sensitivities.T
+    if full:
+        return sensitivities @ product
+    return np.einsum("ij,ji->i", sensitivities, product)
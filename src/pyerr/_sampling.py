@@ -0,0 +1,375 @@
+import numpy as np
+from functools import cached_property
+from pyerr._linalg import leading_eigenpairs
+
+# number of samples per matrix product. Products are always done on blocks of
+# this many rows, aligned to the sample index, so that the BLAS kernel used for
+# each sample does not depend on how the samples are split into chunks
+SAMPLE_BLOCK = 256
+
+# default number of samples per chunk
+DEFAULT_CHUNK_SIZE = 16 * SAMPLE_BLOCK
+
+# the cached eigenpairs and the information on how they were computed
+EIGEN_QUANTITIES = ("eig_vals", "eig_vects", "eig_info")
+
+
+def pca_factor(eig_vals, eig_vects, k=None):
+    """Function to get the PCA sampling factor, sqrt(eig_vals) * eig_vects,
+    of the largest k components
+
+    Eigenvalues that are negative from round-off, which happens for nearly
+    singular matrices such as joint covariances of reactions that add up,
+    are treated as zero.
+
+    Parameters
+    ----------
+    eig_vals : np.array
+        sorted (largest to smallest) eigenvalues
+
+    eig_vects : np.array
+        the corresponding eigenvectors, one per column
+
+    k : int, optional, default is None
+        the number of components to use. If None or larger than the number
+        of eigenvalues, all of them are used
+
+    Returns
+    -------
+    np.array
+        2D array of shape (num_groups, k)
+
+    """
+    # set k to all of the eigen values if not given or greater
+    # than the total number
+    if k is None or k > len(eig_vals):
+        k = len(eig_vals)
+
+    return np.sqrt(np.maximum(eig_vals[:k], 0.0)) * eig_vects[:, :k]
+
+
+def transform_samples(gaussian_samples, factor, mean_values, out, start=0):
+    """Function to turn standard normal samples into realizations,
+    out = mean_values + gaussian_samples @ factor.T
+
+    Parameters
+    ----------
+    gaussian_samples : np.array
+        2D array of shape (num_samples, k) of standard normal samples
+
+    factor : np.array
+        2D array of shape (num_groups, k), from pca_factor
+
+    mean_values : np.array
+        1D array of the mean values, which is broadcast over the samples
+
+    out : np.array
+        2D array of shape (num_samples, num_groups) to write the realizations to
+
+    start : int, optional, default is 0
+        index of the first sample in the full set of samples, which sets how
+        the samples line up with the blocks of SAMPLE_BLOCK rows
+
+    Returns
+    -------
+    np.array
+        out
+
+    """
+    num_samples, k = gaussian_samples.shape
+    block = np.zeros((SAMPLE_BLOCK, k))
+    product = np.empty((SAMPLE_BLOCK, len(mean_values)))
+
+    position = start
+    while position < start + num_samples:
+        block_start = position - position % SAMPLE_BLOCK
+        block_stop = min(block_start + SAMPLE_BLOCK, start + num_samples)
+        rows = slice(position - block_start, block_stop - block_start)
+        samples = slice(position - start, block_stop - start)
+
+        block[:] = 0
+        block[rows] = gaussian_samples[samples]
+        np.matmul(block, factor.T, out=product)
+
+        # Rising 2013 equation (7)
+        np.add(product[rows], mean_values, out=out[samples])
+
+        position = block_stop
+
+    return out
+
+
+def iter_realizations(mean_values, factor, num_samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=None):
+    """Function to generate PCA realizations in chunks
+
+    The standard normal samples are drawn from a single random stream in
+    sample order, so the realizations are bit-identical for any chunk size.
+
+    Parameters
+    ----------
+    mean_values : np.array
+        1D array of the mean values
+
+    factor : np.array
+        2D array of shape (num_groups, k), from pca_factor
+
+    num_samples : int
+        the total number of samples
+
+    chunk_size : int, optional, default is DEFAULT_CHUNK_SIZE
+        the number of samples in each chunk. Multiples of SAMPLE_BLOCK
+        avoid wasted work
+
+    seed : int, np.random.SeedSequence or np.random.Generator, optional
+        seed for the random numbers, default is None for fresh entropy
+
+    Yields
+    ------
+    np.array
+        2D array of shape (chunk_size, num_groups), with fewer rows in the
+        last chunk
+
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, num_samples, chunk_size):
+        rows = min(chunk_size, num_samples - start)
+        gaussian_samples = rng.standard_normal((rows, factor.shape[1]))
+        chunk = np.empty((rows, len(mean_values)))
+        yield transform_samples(gaussian_samples, factor, mean_values, chunk, start)
+
+
+def fill_realizations(
+    mean_values, factor, num_samples, out=None, chunk_size=DEFAULT_CHUNK_SIZE, seed=None
+):
+    """Function to write PCA realizations into an array, one chunk at a time
+
+    Parameters
+    ----------
+    mean_values : np.array
+        1D array of the mean values
+
+    factor : np.array
+        2D array of shape (num_groups, k), from pca_factor
+
+    num_samples : int
+        the total number of samples
+
+    out : np.array, optional, default is None
+        2D array of shape (num_samples, num_groups) to write to, for example
+        a np.memmap. If None, a new array is allocated
+
+    chunk_size : int, optional, default is DEFAULT_CHUNK_SIZE
+        the number of samples drawn at a time
+
+    seed : int, np.random.SeedSequence or np.random.Generator, optional
+        seed for the random numbers, default is None for fresh entropy
+
+    Returns
+    -------
+    np.array
+        out, with one realization per row
+
+    """
+    if out is None:
+        out = np.empty((num_samples, len(mean_values)))
+    if out.shape != (num_samples, len(mean_values)):
+        raise ValueError(f"out has shape {out.shape}, expected {(num_samples, len(mean_values))}")
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, num_samples, chunk_size):
+        stop = min(start + chunk_size, num_samples)
+        gaussian_samples = rng.standard_normal((stop - start, factor.shape[1]))
+        transform_samples(gaussian_samples, factor, mean_values, out[start:stop], start)
+
+    return out
+
+
+class PCAMixin:
+    """
+    Mixin for the eigenpairs of an absolute covariance matrix and the PCA
+    realizations sampled from them, shared by Section and JointCovariance
+
+    Classes using it provide mean_values and abs_covariance_matrix. The
+    eigenpairs are computed on first access and then cached, like the
+    other derived quantities of the class, whose names are in
+    _cached_quantities.
+
+    Methods
+    -------
+    get_eigenvalues
+        Function to get sorted eigenvalues and eigenvectors
+        of the absolute covariance matrix
+
+    get_pca_realizations
+        Function to sample realizations by PCA
+
+    iter_pca_realizations
+        Function to sample realizations by PCA, and yield them in chunks
+
+    clear_cache
+        Function to drop the cached derived quantities
+
+    """
+
+    # names of the cached quantities dropped by clear_cache
+    _cached_quantities = EIGEN_QUANTITIES
+
+    # names of cached quantities that are computed from the eigenpairs
+    _eigen_dependent = ()
+
+    @cached_property
+    def eig_vals(self):
+        self.get_eigenvalues()
+        return self.__dict__["eig_vals"]
+
+    @cached_property
+    def eig_vects(self):
+        self.get_eigenvalues()
+        return self.__dict__["eig_vects"]
+
+    @cached_property
+    def eig_info(self):
+        self.get_eigenvalues()
+        return self.__dict__["eig_info"]
+
+    def _store_eig_vects(self, eig_vects):
+        """Function to keep the eigenvectors, for example in a scratch space"""
+        return eig_vects
+
+    def _truncated_eigenpairs(self):
+        """Function to check if only the leading eigenpairs are computed,
+        which leave out the variance of the other components"""
+        return "eig_vals" in self.__dict__ and len(self.eig_vals) < len(self.mean_values)
+
+    def get_eigenvalues(self, k=None, variance_fraction=None, method="auto", seed=None):
+        """Function to get and sort eigenvalues and eigenvectors
+        of the absolute covariance matrix
+
+        By default all of the eigenpairs are computed. Only the leading ones
+        can be computed instead, which is much faster for large matrices where
+        a few components explain nearly all of the variance.
+
+        Parameters
+        ----------
+        k : int, optional, default is None
+            the number of leading eigenpairs to compute. If None and
+            variance_fraction is None, all of them are computed
+
+        variance_fraction : float, optional, default is None
+            if given, compute the fewest leading eigenpairs whose eigenvalues
+            sum to at least this fraction of the total variance
+
+        method : str, optional, default is "auto"
+            the eigensolver, "full", "subset" (requires scipy), "randomized",
+            or "auto" to use "randomized" for truncated decompositions and
+            "full" otherwise
+
+        seed : int or np.random.Generator, optional, default is None
+            seed for the "randomized" eigensolver
+
+        Returns
+        -------
+        None, sets the attributes eig_vals, eig_vects, and eig_info, a
+        dictionary with the method used, the number of eigenpairs, the
+        fraction of the variance they explain, and the largest relative
+        residual of the eigenpairs
+
+        """
+        self.eig_vals, eig_vects, self.eig_info = leading_eigenpairs(
+            self.abs_covariance_matrix, k, variance_fraction, method, seed=seed
+        )
+        self.eig_vects = self._store_eig_vects(eig_vects)
+
+        for name in self._eigen_dependent:
+            self.__dict__.pop(name, None)
+
+    def get_pca_realizations(self, num_samples, k=None, seed=None, chunk_size=None, out=None):
+        """Function to sample realizations by PCA, using the largest
+        k components.
+
+        Parameters
+        ----------
+        num_samples : int
+            The number of samples
+
+        k : int, optional, default is None
+            the number of eigenvalues to use. If None, will use
+            all of the eigenvalues of the covariane matrix
+
+        seed : int, np.random.SeedSequence or np.random.Generator, optional
+            seed for the random numbers, default is None for fresh entropy
+
+        chunk_size : int, optional, default is None
+            the number of samples drawn at a time, which bounds the size of
+            the temporaries. The realizations are the same for any chunk size.
+            If None, a default chunk size is used
+
+        out : numpy array, optional, default is None
+            array of shape (num_samples, len(mean_values)) to write the
+            realizations to, for example a np.memmap. If None, a new array is
+            allocated
+
+        Returns
+        -------
+        numpy array
+            the sampled realizations, one per row
+
+        """
+        return fill_realizations(
+            self.mean_values,
+            pca_factor(self.eig_vals, self.eig_vects, k),
+            num_samples,
+            out,
+            chunk_size or DEFAULT_CHUNK_SIZE,
+            seed,
+        )
+
+    def iter_pca_realizations(self, num_samples, k=None, seed=None, chunk_size=None):
+        """Function to sample realizations by PCA, using the largest
+        k components, and yield them in chunks
+
+        Parameters
+        ----------
+        num_samples : int
+            The number of samples
+
+        k : int, optional, default is None
+            the number of eigenvalues to use. If None, will use
+            all of the eigenvalues of the covariane matrix
+
+        seed : int, np.random.SeedSequence or np.random.Generator, optional
+            seed for the random numbers, default is None for fresh entropy
+
+        chunk_size : int, optional, default is None
+            the number of samples in each chunk. The realizations are the same
+            for any chunk size. If None, a default chunk size is used
+
+        Yields
+        ------
+        numpy array
+            the next chunk of sampled realizations, one per row
+
+        """
+        yield from iter_realizations(
+            self.mean_values,
+            pca_factor(self.eig_vals, self.eig_vects, k),
+            num_samples,
+            chunk_size or DEFAULT_CHUNK_SIZE,
+            seed,
+        )
+
+    def clear_cache(self):
+        """Function to drop the cached derived quantities, so that they
+        are recomputed the next time they are accessed
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+        for name in self._cached_quantities:
+            self.__dict__.pop(name, None)
@@ -0,0 +1,145 @@
+import os
+import shutil
+import weakref
+import tempfile
+import numpy as np
+
+
+class ScratchSpace:
+    """
+    Class to allocate arrays as memory-mapped .npy files in a scratch
+    directory, so that large matrices are paged from disk instead of
+    being held in memory
+
+    Parameters
+    ----------
+    directory : str or Path
+        the scratch directory. A new sub-directory is made in it for the
+        arrays of this ScratchSpace
+
+    prefix : str, optional, default is "pyerr-"
+        prefix of the name of the sub-directory
+
+    keep : bool, optional, default is False
+        if False, the sub-directory is removed when the ScratchSpace is
+        garbage collected or the interpreter exits
+
+    Attributes
+    ----------
+    path : str
+        the sub-directory that holds the arrays
+
+    keep : bool
+        whether the sub-directory is kept
+
+    Methods
+    -------
+    allocate
+        Function to allocate a new zero-filled memory-mapped array
+
+    store
+        Function to copy an array into a new memory-mapped array
+
+    open
+        Function to open an array that was allocated before
+
+    cleanup
+        Function to remove the sub-directory and its arrays
+
+    """
+
+    def __init__(self, directory, prefix="pyerr-", keep=False):
+        os.makedirs(directory, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=prefix, dir=directory)
+        self.keep = keep
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+        if keep:
+            self._finalizer.detach()
+
+    def __repr__(self):
+        return f"ScratchSpace(path={self.path!r})"
+
+    def allocate(self, name, shape):
+        """Function to allocate a new zero-filled memory-mapped array
+
+        Parameters
+        ----------
+        name : str
+            name of the array, which is stored in "<name>.npy". An existing
+            array of the same name is replaced, but stays valid for anything
+            that still maps it
+
+        shape : tuple
+            shape of the array
+
+        Returns
+        -------
+        np.memmap
+            the float64 array
+
+        """
+        path = self._filename(name)
+        # unlink instead of truncating, which would invalidate existing maps
+        if os.path.exists(path):
+            os.remove(path)
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+
+    def store(self, name, array):
+        """Function to copy an array into a new memory-mapped array
+
+        Parameters
+        ----------
+        name : str
+            name of the array
+
+        array : np.array
+            the values to copy
+
+        Returns
+        -------
+        np.memmap
+            the copy
+
+        """
+        out = self.allocate(name, np.shape(array))
+        out[...] = array
+        return out
+
+    def open(self, name, mode="r"):
+        """Function to open an array that was allocated before, without
+        copying it
+
+        Parameters
+        ----------
+        name : str
+            name of the array
+
+        mode : str, optional, default is "r"
+            memory map mode, see numpy.load
+
+        Returns
+        -------
+        np.memmap
+            the array
+
+        """
+        return np.load(self._filename(name), mmap_mode=mode)
+
+    def cleanup(self):
+        """Function to remove the sub-directory and its arrays
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+        self._finalizer.detach()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _filename(self, name):
+        """Function to get the file name of an array"""
+        return os.path.join(self.path, f"{name}.npy")
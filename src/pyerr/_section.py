@@ -1,17 +1,61 @@
+import os
+import warnings
 import numpy as np
-import pandas as pd
-from pyerr import EnergyGroups, Mean, Covariance
-
-
-class Section:
+from types import SimpleNamespace
+from functools import cached_property
+from pyerr._energy import EnergyGroups
+from pyerr._mean import Mean
+from pyerr._covariance import Covariance
+from pyerr._scratch import ScratchSpace
+from pyerr._packed import PackedSymmetricMatrix, packed_size
+from pyerr._sparse import CSRMatrix
+from pyerr._linalg import covariance_to_correlation, scale_outer, safe_reciprocal
+from pyerr._groups import group_overlap, collapse_operator, collapse_values
+from pyerr._propagation import PROPAGATION_METHODS, sandwich
+from pyerr._validation import validate_covariance, apply_policy
+from pyerr._sampling import EIGEN_QUANTITIES, PCAMixin, pca_factor
+
+# derived quantities that are computed on first access and then cached
+CACHED_QUANTITIES = (
+    "uncertainty",
+    "abs_uncertainty",
+    "correlation_matrix",
+    "abs_covariance_matrix",
+    *EIGEN_QUANTITIES,
+    "cholesky_factor",
+    "average_energy",
+    "average_energy_uncertainty",
+    "unc_convergence_table",
+)
+
+# columns of the uncertainty convergence table
+CONVERGENCE_COLUMNS = ["k", "abs_diff", "abs_ind", "rel_diff", "rel_ind"]
+
+# number of eigenvalues added to the running diagonal at a time
+CONVERGENCE_BLOCK = 256
+
+
+def _cut(values, start, stop):
+    """Function to cut a vector or matrix to the groups start to stop - 1,
+    as a view where the storage allows it"""
+    if values.ndim == 1:
+        return values[start:stop]
+    if isinstance(values, (PackedSymmetricMatrix, CSRMatrix)):
+        return values if (start, stop) == (0, len(values)) else values.window(start, stop)
+    return values[start:stop, start:stop]
+
+
+class Section(PCAMixin):
     """
     Class to hold a single section (MT value) from an ERRORR file, which includes
     the energy grid, the mean value, and the covariance matrix
 
     Parameters
     ----------
-    energy_lines : list
-        list of the lines from the file corresponding to the energy grid
+    energy_lines : list or EnergyGroups
+        list of the lines from the file corresponding to the energy grid, or
+        the already parsed EnergyGroups. Lines that were parsed before, for
+        another section, are not parsed again
 
     mean_lines : list
         list of the lines from the file corresponding to the mean values
@@ -30,8 +74,37 @@ class Section:
         limit of the matrix in the file. If given, will cut out groups below the upper
         limit. If the upper limit falls within a group, that group is kept
 
+    engine : str, optional, default is "numpy"
+        parsing engine for the text, either "numpy" for the vectorized
+        fixed-width reader or "fortranformat" for the line-by-line
+        reference reader
+
+    scratch_dir : str or Path, optional, default is None
+        if given, the covariance matrix, the derived matrices and the
+        eigenvectors are allocated as memory-mapped files in a new
+        sub-directory of scratch_dir instead of in memory. They are still
+        numpy arrays (np.memmap), and the sub-directory is removed when the
+        Section is garbage collected
+
+    storage : str, optional, default is "dense"
+        "dense" to store the covariance matrix and the derived matrices as
+        full 2D arrays, "packed" to only store their upper triangles in
+        PackedSymmetricMatrix objects, which is about half the memory, or
+        "sparse" to only store their nonzero values in CSRMatrix objects.
+        Sparse matrices are never expanded unless asked for, and truncated
+        eigenpairs are computed with the "randomized" solver
+
+    validation : str, optional, default is "raise"
+        what to do if the covariance matrix fails validation: "raise" a
+        CovarianceError, "warn" with a CovarianceWarning and keep the matrix,
+        or repair it with "clip" or "nearest_psd", see apply_policy
+
     Attributes
     ----------
+    The uncertainties, correlation and absolute covariance matrices, eigenvalues
+    and eigenvectors, and PFNS average energy are only computed the first time
+    they are accessed, and are then cached.
+
     MAT : int
         Material number
 
@@ -53,10 +126,10 @@ class Section:
     mean_values : list
         Mean values of the quantity
 
-    covariance_matrix : np.array
+    covariance_matrix : np.array, PackedSymmetricMatrix or CSRMatrix
         Relative covariance matrix
 
-    abs_covariance_matrix : np.array
+    abs_covariance_matrix : np.array, PackedSymmetricMatrix or CSRMatrix
         Absolute covariance matrix
 
     uncertainty : np.array
@@ -65,7 +138,7 @@ class Section:
     abs_uncertainty : np.array
         The absolute uncertainty values
 
-    correlation_matrix : np.array
+    correlation_matrix : np.array, PackedSymmetricMatrix or CSRMatrix
         Correlation matrix
 
     average_energy : float, only if PFNS
@@ -82,13 +155,32 @@ class Section:
         Sorted (largest to smallest) eigen vectors of the
         absolute covariance matrix
 
+    eig_info : dictionary
+        The eigensolver that was used, the number of eigenpairs,
+        the fraction of the variance they explain, and their
+        largest relative residual
+
+    cholesky_factor : np.array
+        Lower triangular Cholesky factor L of the absolute covariance
+        matrix, with L @ L.T equal to the matrix
+
     unc_convergence_table : pandas DataFrame
         pandas DataFrame with the absolute and relative difference
         between the overall uncertainty and the uncertainty of
         the covariance matrix reconstructed with k eigenvalues
 
+    scratch : ScratchSpace
+        Where the large arrays are allocated, or None if they are in memory
+
+    validation_report : ValidationReport or None
+        the results of the checks of the covariance matrix when it was
+        parsed, or None if the section was created from arrays
+
     Methods
     -------
+    from_arrays
+        Function to create a Section from already parsed arrays
+
     get_correlation_matrix
         Function to get the uncertainty vector and correlation matrix
 
@@ -104,6 +196,26 @@ class Section:
         Function to sample realizations by PCA, using the largest
         k components.
 
+    iter_pca_realizations
+        Function to sample realizations by PCA, using the largest
+        k components, and yield them in chunks
+
+    propagate
+        Function to propagate the covariance to responses with
+        the sandwich rule, for many sensitivity vectors at once
+
+    collapse
+        Function to collapse the mean values and covariance onto
+        another group structure
+
+    window
+        Function to get a section with other energy limits, without
+        parsing the text again
+
+    validate
+        Function to check the covariance matrix, including its
+        eigenvalues, and optionally repair it
+
     quantify_uncertainty_convergence
         Function to quantify the convergence of the uncertainty vector
         as more PCA eigenvalues are added, optionally between certain
@@ -112,27 +224,149 @@ class Section:
     calculate_average_energy
         Function to calculate the PFNS average energy
 
+    clear_cache
+        Function to drop the cached derived quantities, so that they
+        are recomputed the next time they are accessed
+
     """
 
+    _cached_quantities = CACHED_QUANTITIES
+
+    # the convergence table is computed from the eigenpairs
+    _eigen_dependent = ("unc_convergence_table",)
+
     def __init__(
-        self, energy_lines, mean_lines, covariance_lines, lower_limit=None, upper_limit=None
+        self,
+        energy_lines,
+        mean_lines,
+        covariance_lines,
+        lower_limit=None,
+        upper_limit=None,
+        engine="numpy",
+        scratch_dir=None,
+        storage="dense",
+        validation="raise",
     ):
-        self._energy = EnergyGroups(energy_lines, lower_limit, upper_limit)
-        self._mean = Mean(mean_lines, self._energy.indices)
+        if isinstance(energy_lines, EnergyGroups):
+            self._energy = energy_lines.with_limits(lower_limit, upper_limit)
+        else:
+            self._energy = EnergyGroups.shared(energy_lines, lower_limit, upper_limit, engine)
+        self._mean = Mean(mean_lines, self._energy.indices, engine)
+        self.scratch = None
+        if scratch_dir is not None:
+            self.scratch = ScratchSpace(scratch_dir, prefix=f"MAT{self.MAT}-MT{self.MT}-")
+
+        # the full matrix is allocated before the energy limits are applied
+        num_groups = self._energy.control.num_groups
+        out = None
+        if self.scratch is not None and storage != "sparse":
+            shape = (packed_size(num_groups),) if storage == "packed" else (num_groups, num_groups)
+            out = self.scratch.allocate("covariance_matrix", shape)
         self._covariance = Covariance(
-            covariance_lines, self._energy.control.num_groups, self._energy.indices
+            covariance_lines, num_groups, self._energy.indices, engine, out, storage, validation
         )
 
+        # the parsed arrays of all of the groups, which windows are cut from
+        self._full = SimpleNamespace(
+            group_boundaries=self._energy.values.parsed_values,
+            mean_values=self._mean._values.parsed_values,
+            covariance_matrix=self._covariance.full_matrix,
+            scratch=self.scratch,
+        )
+        self._window = tuple(int(index) for index in self._energy.indices)
+        self._validation = validation
+
         # check lengths
         assert len(self.mean_values) == len(self.group_boundaries) - 1
         assert len(self.mean_values) == len(self.covariance_matrix)
 
-        self.get_correlation_matrix()
-        self.get_eigenvalues()
+    @classmethod
+    def from_arrays(
+        cls,
+        MAT,
+        MF,
+        MT,
+        group_boundaries,
+        mean_values,
+        covariance_matrix,
+        incident_energy=None,
+        eig_vals=None,
+        eig_vects=None,
+        scratch_dir=None,
+    ):
+        """Function to create a Section from already parsed arrays,
+        for example ones loaded from a SectionCache
+
+        Parameters
+        ----------
+        MAT : int
+            Material number
 
-        # calculate average energy if PFNS
-        if self.MF == 5:
-            self.calculate_average_energy()
+        MF : int
+            File number
+
+        MT : int
+            Section/reaction number
+
+        group_boundaries : np.array
+            Boundaries of the energy groups
+
+        mean_values : np.array
+            Mean values of the quantity
+
+        covariance_matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+            Relative covariance matrix
+
+        incident_energy : float, optional, default is None
+            Incident energy in eV, only used for PFNS (MF=5)
+
+        eig_vals : np.array, optional, default is None
+            Sorted eigenvalues of the absolute covariance matrix. If
+            given, eig_vects has to be given as well
+
+        eig_vects : np.array, optional, default is None
+            The corresponding eigenvectors
+
+        scratch_dir : str or Path, optional, default is None
+            if given, the derived matrices and eigenvectors are allocated as
+            memory-mapped files in a new sub-directory of scratch_dir. The
+            given arrays are used as they are
+
+        Returns
+        -------
+        Section
+            the section
+
+        """
+        section = cls.__new__(cls)
+        section.scratch = None
+        if scratch_dir is not None:
+            section.scratch = ScratchSpace(scratch_dir, prefix=f"MAT{MAT}-MT{MT}-")
+        section._energy = SimpleNamespace(
+            group_boundaries=group_boundaries, num_groups=len(group_boundaries) - 1
+        )
+        section._mean = SimpleNamespace(
+            MAT=MAT, MF=MF, MT=MT, values=mean_values, incident_energy=incident_energy
+        )
+        section._covariance = SimpleNamespace(matrix=covariance_matrix, report=None)
+
+        section._full = SimpleNamespace(
+            group_boundaries=group_boundaries,
+            mean_values=mean_values,
+            covariance_matrix=covariance_matrix,
+            scratch=section.scratch,
+        )
+        section._window = (0, len(mean_values))
+        section._validation = None
+
+        if eig_vals is not None:
+            section.__dict__["eig_vals"] = eig_vals
+            section.__dict__["eig_vects"] = eig_vects
+
+        # check lengths
+        assert len(section.mean_values) == len(section.group_boundaries) - 1
+        assert len(section.mean_values) == len(section.covariance_matrix)
+        return section
 
     @property
     def MAT(self):
@@ -169,33 +403,81 @@ class Section:
     def covariance_matrix(self):
         return self._covariance.matrix
 
-    def get_correlation_matrix(self):
-        """Function to get the uncertainty vector and correlation matrix"""
-        self.uncertainty = np.sqrt(np.diag(self.covariance_matrix))
-        self.abs_uncertainty = self.uncertainty * self.mean_values
-
-        unc_mat = self.uncertainty * np.identity(len(self.uncertainty))
-
-        self.correlation_matrix = (
-            np.linalg.inv(unc_mat) @ self.covariance_matrix @ np.linalg.inv(unc_mat).T
-        )
-
-        # create the absolute covariance matrix from the absolute uncertainty
-        abs_unc_mat = self.abs_uncertainty * np.identity(len(self.uncertainty))
-        self.abs_covariance_matrix = abs_unc_mat @ self.correlation_matrix @ abs_unc_mat
-
-    def get_eigenvalues(self):
-        """Function to get and sort eigenvalues and eigenvectors
-        of the absolute covariance matrix"""
-
-        eig_vals, eig_vects = np.linalg.eigh(self.abs_covariance_matrix)
+    @property
+    def validation_report(self):
+        return self._covariance.report
+
+    @cached_property
+    def uncertainty(self):
+        return np.sqrt(self.covariance_matrix.diagonal())
+
+    @cached_property
+    def abs_uncertainty(self):
+        return self.uncertainty * self.mean_values
+
+    @cached_property
+    def correlation_matrix(self):
+        out = self._allocate_like("correlation_matrix", self.covariance_matrix)
+        return covariance_to_correlation(self.covariance_matrix, self.uncertainty, out)
+
+    @cached_property
+    def abs_covariance_matrix(self):
+        # diag(mean) @ relative covariance @ diag(mean), which is also
+        # well defined for groups with zero uncertainty
+        out = self._allocate_like("abs_covariance_matrix", self.covariance_matrix)
+        return scale_outer(self.covariance_matrix, self.mean_values, out=out)
+
+    @cached_property
+    def cholesky_factor(self):
+        try:
+            return np.linalg.cholesky(np.asarray(self.abs_covariance_matrix))
+        except np.linalg.LinAlgError:
+            raise ValueError(
+                f"The covariance matrix of MT{self.MT} is not positive definite, "
+                "use the eigenpairs instead of the Cholesky factor"
+            )
+
+    @cached_property
+    def average_energy(self):
+        if self.MF != 5:
+            raise AttributeError("Can only calculate average energy for PFNS.")
+        mid_group_energies = (self.group_boundaries[:-1] + self.group_boundaries[1:]) / 2
+        return np.sum(mid_group_energies * self.mean_values)
 
-        # indices for sorting
-        idx = eig_vals.argsort()[::-1]
+    @cached_property
+    def average_energy_uncertainty(self):
+        if self.MF != 5:
+            raise AttributeError("Can only calculate average energy for PFNS.")
+        mid_group_energies = (self.group_boundaries[:-1] + self.group_boundaries[1:]) / 2
+        return np.sqrt(self.propagate(mid_group_energies, relative=False, method="direct"))
+
+    def _allocate(self, name, shape):
+        """Function to allocate a derived array, in the scratch space if
+        there is one and in memory otherwise"""
+        if self.scratch is None:
+            return np.empty(shape)
+        return self.scratch.allocate(name, shape)
+
+    def _store_eig_vects(self, eig_vects):
+        """Function to keep the eigenvectors in the scratch space if there
+        is one"""
+        return eig_vects if self.scratch is None else self.scratch.store("eig_vects", eig_vects)
+
+    def _allocate_like(self, name, matrix):
+        """Function to allocate a derived matrix with the same shape and
+        storage as matrix"""
+        if isinstance(matrix, PackedSymmetricMatrix):
+            return PackedSymmetricMatrix(self._allocate(name, matrix.data.shape), matrix.size)
+        if isinstance(matrix, CSRMatrix):
+            data = self._allocate(name, matrix.data.shape)
+            return CSRMatrix(data, matrix.indices, matrix.indptr, matrix.shape)
+        return self._allocate(name, matrix.shape)
 
-        # sorted
-        self.eig_vals = eig_vals[idx]
-        self.eig_vects = eig_vects[:, idx]
+    def get_correlation_matrix(self):
+        """Function to get the uncertainty vector and correlation matrix"""
+        # accessing the cached properties computes them
+        for name in CACHED_QUANTITIES[:4]:
+            getattr(self, name)
 
     def reconstruct_covariance(self, k=None):
         """Function to reconstruct the covariance matrix from the
@@ -227,54 +509,258 @@ class Section:
         # in Rising 2013, Equaton (10)
         return principle_eig_vals * principle_eig_vects @ principle_eig_vects.T
 
-    def get_pca_realizations(self, num_samples, k=None):
-        """Function to sample realizations by PCA, using the largest
-        k components.
+    def propagate(
+        self, sensitivities, relative=True, energy_grid=None, method="auto", full_covariance=False
+    ):
+        """Function to propagate the covariance to responses with the
+        sandwich rule, S C S^T, for many sensitivity vectors at once
 
         Parameters
         ----------
-        num_samples : int
-            The number of samples
+        sensitivities : np.array
+            1D array of one sensitivity vector, or 2D array of shape
+            (num_responses, num_groups) with one sensitivity vector per row
+
+        relative : bool, optional, default is True
+            if True, the sensitivities are relative, (dR / R) / (dx / x), and
+            the relative variances of the responses are returned. If False,
+            the sensitivities are absolute, dR / dx, and the absolute
+            variances are returned
+
+        energy_grid : np.array, optional, default is None
+            ascending group boundaries of the sensitivities, in eV, if they
+            are not on the groups of this section. The sensitivities are
+            split onto these groups by lethargy, and the parts outside of
+            these groups are dropped
+
+        method : str, optional, default is "auto"
+            "direct" to multiply with the covariance matrix, "eig" to use the
+            eigenpairs, "cholesky" to use the Cholesky factor of the absolute
+            covariance matrix, or "auto" to use the eigenpairs if all of them
+            have already been computed and the covariance matrix otherwise.
+            With truncated eigenpairs, for example from get_eigenvalues(k=3),
+            "eig" only includes the variance of the leading components and
+            warns that it does
+
+        full_covariance : bool, optional, default is False
+            if True, the covariance matrix of the responses is returned
+            instead of only their variances
 
-        k : int, optional, default is None
-            the number of eigenvalues to use. If None, will use
-            all of the eigenvalues of the covariane matrix
+        Returns
+        -------
+        float or np.array
+            the variance of the response for a 1D sensitivity vector, the
+            variances of the responses for a 2D array, or the covariance
+            matrix of the responses if full_covariance is True
+
+        """
+        if method not in PROPAGATION_METHODS:
+            raise ValueError(
+                f"Unknown propagation method {method}, expected one of {PROPAGATION_METHODS}"
+            )
+        # truncated eigenpairs leave out the variance of the other components
+        truncated = self._truncated_eigenpairs()
+        if method == "auto":
+            method = "eig" if "eig_vals" in self.__dict__ and not truncated else "direct"
+        elif method == "eig" and truncated:
+            warnings.warn(
+                f"Only {len(self.eig_vals)} of the {self.num_groups} eigenpairs of MT{self.MT} "
+                "are computed, so the propagated variance is truncated",
+                stacklevel=2,
+            )
+
+        sensitivities = np.asarray(sensitivities, dtype=float)
+        single = sensitivities.ndim == 1
+        sensitivities = np.atleast_2d(sensitivities)
+        if energy_grid is not None:
+            sensitivities = sensitivities @ group_overlap(energy_grid, self.group_boundaries).T
+        if sensitivities.shape[1] != self.num_groups:
+            raise ValueError(
+                f"Sensitivities have {sensitivities.shape[1]} groups, expected {self.num_groups}"
+            )
+
+        if method == "direct":
+            matrix = self.covariance_matrix if relative else self.abs_covariance_matrix
+            result = sandwich(sensitivities, matrix=matrix, full=full_covariance)
+        else:
+            # the factors are of the absolute covariance matrix, so relative
+            # sensitivities are divided by the mean values
+            if relative:
+                sensitivities = sensitivities * safe_reciprocal(self.mean_values)
+            if method == "eig":
+                factor = pca_factor(self.eig_vals, self.eig_vects)
+            else:
+                factor = self.cholesky_factor
+            result = sandwich(sensitivities, factor=factor, full=full_covariance)
+
+        if single:
+            return result[0, 0] if full_covariance else result[0]
+        return result
+
+    def collapse(self, group_boundaries, flux=None):
+        """Function to collapse the mean values and covariance onto another
+        group structure, for example a coarser library structure
+
+        Cross sections and nu-bar are averaged over the groups with the
+        weighting flux, and PFNS group probabilities are summed. The
+        absolute covariance matrix is collapsed with the same operator W,
+        W C W^T, which is cached for the pair of grids.
+
+        Parameters
+        ----------
+        group_boundaries : np.array
+            ascending boundaries of the new groups, in eV. Parts of the
+            groups of this section outside of them are dropped
+
+        flux : np.array, optional, default is None
+            weighting flux integrated over each group of this section. If
+            None, a flux that is flat in lethargy is used
 
         Returns
         -------
-        numpy array
-            the sampled realizations
+        Section
+            a new section on the new groups, with a dense covariance matrix
 
         """
+        group_boundaries = np.asarray(group_boundaries, dtype=float)
+        operator = collapse_operator(
+            self.group_boundaries, group_boundaries, flux, average=self.MF != 5
+        )
+        mean_values, covariance_matrix = collapse_values(
+            operator, self.mean_values, self.abs_covariance_matrix
+        )
+        return Section.from_arrays(
+            self.MAT,
+            self.MF,
+            self.MT,
+            group_boundaries,
+            mean_values,
+            covariance_matrix,
+            incident_energy=self.incident_energy if self.MF == 5 else None,
+        )
 
-        # set k to all of the eigen values if not given or greater
-        # than the total number
-        if k is None or k > len(self.eig_vals):
-            k = len(self.eig_vals)
+    def window(self, lower_limit=None, upper_limit=None):
+        """Function to get a section with other energy limits, without
+        parsing the text again
 
-        # cut the top k
-        principle_eig_vals = self.eig_vals[:k]
-        principle_eig_vects = self.eig_vects[:, :k]
+        The limits are applied to all of the groups that were parsed from
+        the file, so the window can be wider than the limits this section
+        was created with. Sections that are loaded from a cache or created
+        from arrays only have their own groups. The mean values, and a dense
+        covariance matrix, are views of the parsed arrays. Uncertainties and
+        correlation and absolute covariance matrices that are already
+        computed are cut from this section if the window is inside of it,
+        and everything else is only computed for the window when accessed.
+
+        A window inside of this section gets the covariance matrix of this
+        section, as it was checked and repaired. A window that reaches past
+        it is cut from the parsed matrix, which has the repairs of this
+        section, and the validation policy of this section is applied to it.
 
-        # get samples
-        gaussian_samples = np.random.normal(0, 1, (k, num_samples))
-        k_sum = np.sqrt(principle_eig_vals) * principle_eig_vects @ gaussian_samples
+        Parameters
+        ----------
+        lower_limit : float, optional, default is None
+            the lower limit in energy (eV). If the lower limit falls within a
+            group, that group is kept. If None, there is no lower limit
 
-        # reshape the mean vector
-        mean_vect = np.array(self.mean_values).reshape((len(self.mean_values), 1))
-        mean_vect = np.repeat(mean_vect, num_samples, axis=1)
+        upper_limit : float, optional, default is None
+            the upper limit in energy (eV). If the upper limit falls within a
+            group, that group is kept. If None, there is no upper limit
 
-        # Rising 2013 equation (7)
-        realizations = mean_vect + k_sum
+        Returns
+        -------
+        Section
+            a new section with the groups within the limits
 
-        # reshape realization
-        return realizations.T
+        """
+        full = self._full
+        start, stop = (
+            int(index)
+            for index in EnergyGroups.limit_indices(
+                full.group_boundaries, lower_limit, upper_limit
+            )
+        )
+        first, last = self._window
+        inside = first <= start and stop <= last
+        if inside:
+            covariance_matrix = _cut(self.covariance_matrix, start - first, stop - first)
+        else:
+            covariance_matrix = _cut(full.covariance_matrix, start, stop)
+        section = Section.from_arrays(
+            self.MAT,
+            self.MF,
+            self.MT,
+            full.group_boundaries[start : stop + 1],
+            full.mean_values[start:stop],
+            covariance_matrix,
+            incident_energy=self.incident_energy if self.MF == 5 else None,
+            scratch_dir=None if self.scratch is None else os.path.dirname(self.scratch.path),
+        )
+        section._full = full
+        section._window = (start, stop)
+        section._validation = self._validation
+
+        if not inside:
+            # the groups outside of this section have not been checked yet
+            if self._validation is not None:
+                section.validate(eigenvalues=False, policy=self._validation)
+            return section
+
+        # the group-wise quantities of a window are the same as of the groups
+        # of this section, but the eigenpairs are not
+        section._covariance.report = self.validation_report
+        for name in CACHED_QUANTITIES[:4]:
+            if name in self.__dict__:
+                section.__dict__[name] = _cut(self.__dict__[name], start - first, stop - first)
+        return section
+
+    def validate(self, eigenvalues=True, policy=None):
+        """Function to check the covariance matrix for non-positive
+        variances, asymmetry, correlations above one and negative
+        eigenvalues, and optionally repair it
+
+        Parameters
+        ----------
+        eigenvalues : bool, optional, default is True
+            if True, the eigenvalues are checked as well, which is O(n^3)
+
+        policy : str, optional, default is None
+            if None, the matrix is only checked. Otherwise the validation
+            policy to apply, "raise", "warn", "clip" or "nearest_psd", see
+            apply_policy. The report becomes the validation report of the
+            section and the policy is applied to its windows as well. A
+            repaired matrix replaces the covariance matrix, and the cached
+            derived quantities are dropped
+
+        Returns
+        -------
+        ValidationReport
+            the results of the checks, and the repairs that were made
 
-    def quantify_uncertainty_convergence(self, e_min=0, e_max=30e6):
+        """
+        label = f"MAT{self.MAT} MF{self.MF} MT{self.MT}"
+        if policy is None:
+            return validate_covariance(self.covariance_matrix, label, eigenvalues)
+
+        matrix, report = apply_policy(self.covariance_matrix, policy, label, eigenvalues)
+        if len(report.repairs) > 0:
+            self._covariance.matrix = matrix
+            self.clear_cache()
+        self._covariance.report = report
+        self._validation = policy
+        return report
+
+    def quantify_uncertainty_convergence(
+        self, e_min=0, e_max=30e6, k_values=None, tol=None, as_frame=True
+    ):
         """Function to quantify the convergence of the uncertainty vector
         as more PCA eigenvalues are added, optionally between certain
         energies.
 
+        The diagonal of the covariance matrix reconstructed with k eigenvalues
+        is kept as a running sum of eig_vals[k] * eig_vects[:, k]**2, so the
+        whole table costs O(n^2) instead of reconstructing each matrix.
+
         Parameters
         ----------
         e_min : float, optional, default is 0 eV
@@ -283,37 +769,84 @@ class Section:
         e_max : float, optional, default is 30 MeV
             maximum energy to check for convergence at
 
+        k_values : list, optional, default is None
+            the numbers of eigenvalues to evaluate the convergence at. If
+            None, every k from 1 to the number of eigenvalues is used
+
+        tol : float, optional, default is None
+            if given, stop at the first evaluated k where the maximum relative
+            difference is at or below tol
+
+        as_frame : bool, optional, default is True
+            if True, the table is a pandas DataFrame, otherwise it is a
+            dictionary of numpy arrays with the same columns
+
         Returns
         -------
-        None, creates the attribute unc_convergence_table
+        pandas DataFrame or dictionary
+            the convergence table, which is also set as the attribute
+            unc_convergence_table
 
         """
 
         # get cutoff indices
         lower_cutoff = np.where(self.group_boundaries >= e_min)[0][0]
         upper_cutoff = np.where(self.group_boundaries <= e_max)[0][-1] + 1
+        window = slice(lower_cutoff, upper_cutoff)
+
+        num_eig_vals = len(self.eig_vals)
+        if k_values is None:
+            k_values = np.arange(1, num_eig_vals + 1)
+        k_values = np.unique(np.minimum(k_values, num_eig_vals))
+        if k_values[0] < 1:
+            raise ValueError("The number of eigenvalues k must be at least 1")
+
+        uncertainty = self.uncertainty[window, np.newaxis]
+        mean_values = self.mean_values[window, np.newaxis]
+        diagonal = np.zeros(len(mean_values))
+
+        columns = {name: [] for name in CONVERGENCE_COLUMNS}
+        for start in range(0, k_values[-1], CONVERGENCE_BLOCK):
+            stop = min(start + CONVERGENCE_BLOCK, k_values[-1])
+
+            # running diagonal for k = start + 1, ..., stop
+            terms = self.eig_vects[window, start:stop] ** 2 * self.eig_vals[start:stop]
+            diagonals = np.cumsum(np.column_stack([diagonal, terms]), axis=1)[:, 1:]
+            diagonal = diagonals[:, -1].copy()
+
+            ks = k_values[(k_values > start) & (k_values <= stop)]
+            if len(ks) == 0:
+                continue
+
+            unc = np.sqrt(diagonals[:, ks - start - 1]) / mean_values
+            abs_diff = uncertainty - unc
+            rel_diff = abs_diff / uncertainty
+
+            max_rel = np.max(rel_diff, axis=0)
+            converged = tol is not None and np.any(max_rel <= tol)
+            if converged:
+                last = np.argmax(max_rel <= tol) + 1
+            else:
+                last = len(ks)
 
-        data = []
-        for k in range(1, len(self.eig_vals) + 1):
-            cov = self.reconstruct_covariance(k)
-            unc = np.sqrt(np.diag(cov)) / self.mean_values
-
-            abs_diff = self.uncertainty - unc
-            rel_diff = abs_diff / self.uncertainty
+            # add both the indices and the diff values to the table
+            columns["k"].append(ks[:last])
+            columns["abs_diff"].append(np.max(abs_diff, axis=0)[:last])
+            columns["abs_ind"].append(np.argmax(abs_diff, axis=0)[:last])
+            columns["rel_diff"].append(max_rel[:last])
+            columns["rel_ind"].append(np.argmax(rel_diff, axis=0)[:last])
 
-            max_abs = np.max(abs_diff[lower_cutoff:upper_cutoff])
-            abs_ind = np.argmax(abs_diff[lower_cutoff:upper_cutoff])
+            if converged:
+                break
 
-            max_rel = np.max(rel_diff[lower_cutoff:upper_cutoff])
-            rel_ind = np.argmax(rel_diff[lower_cutoff:upper_cutoff])
+        table = {name: np.concatenate(values) for name, values in columns.items()}
+        if as_frame:
+            import pandas as pd
 
-            # add both the indices and the diff values to the table
-            data.append([k, max_abs, int(abs_ind), max_rel, int(rel_ind)])
+            table = pd.DataFrame(table, columns=CONVERGENCE_COLUMNS)
 
-        self.unc_convergence_table = pd.DataFrame(
-            data,
-            columns=["k", "abs_diff", "abs_ind", "rel_diff", "rel_ind"],
-        )
+        self.unc_convergence_table = table
+        return table
 
     def calculate_average_energy(self):
         """Function to calculate the PFNS average energy
@@ -332,11 +865,6 @@ class Section:
             print("Can only calculate average energy for PFNS.\n")
             return None
 
-        mid_group_energies = (self.group_boundaries[:-1] + self.group_boundaries[1:]) / 2
-
-        self.average_energy = np.sum(mid_group_energies * self.mean_values)
-
-        sens = np.array(mid_group_energies).reshape((1, len(mid_group_energies)))
-        variance = sens @ self.abs_covariance_matrix @ sens.T
-
-        self.average_energy_uncertainty = np.sqrt(variance[0, 0])
+        # accessing the cached properties computes them
+        for name in ("average_energy", "average_energy_uncertainty"):
+            getattr(self, name)
@@ -0,0 +1,80 @@
+from collections.abc import Mapping
+
+
+class LazySections(Mapping):
+    """
+    Read-only mapping of MT number to Section that only builds each
+    Section the first time it is accessed
+
+    Parameters
+    ----------
+    factory : callable
+        function that takes an MT number and returns its Section
+
+    keys : iterable
+        the MT numbers available in the mapping
+
+    preload : iterable or bool, optional, default is None
+        MT numbers to build right away. If True, every section is built
+        right away
+
+    Attributes
+    ----------
+    loaded : tuple
+        MT numbers of the sections that have already been built
+
+    Methods
+    -------
+    load
+        Function to build sections ahead of their first access
+
+    """
+
+    def __init__(self, factory, keys, preload=None):
+        self._factory = factory
+        # an ordered dictionary, for constant time membership checks
+        self._keys = dict.fromkeys(keys)
+        self._sections = {}
+
+        if preload is True:
+            preload = self._keys
+        self.load(preload or [])
+
+    def __getitem__(self, mt):
+        if mt not in self._sections:
+            if mt not in self._keys:
+                raise KeyError(mt)
+            self._sections[mt] = self._factory(mt)
+        return self._sections[mt]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, mt):
+        return mt in self._keys
+
+    def __repr__(self):
+        return f"LazySections(keys={list(self._keys)}, loaded={list(self.loaded)})"
+
+    @property
+    def loaded(self):
+        return tuple(mt for mt in self._keys if mt in self._sections)
+
+    def load(self, mts):
+        """Function to build sections ahead of their first access
+
+        Parameters
+        ----------
+        mts : iterable
+            MT numbers of the sections to build
+
+        Returns
+        -------
+        None
+
+        """
+        for mt in mts:
+            self[mt]
@@ -0,0 +1,380 @@
+import numpy as np
+
+# number of rows multiplied at a time, to bound the size of the temporaries
+ROW_BLOCK = 256
+
+
+class CSRMatrix:
+    """
+    Class to hold a sparse matrix in compressed sparse row (CSR) format,
+    with only numpy arrays
+
+    The values of row i are data[indptr[i] : indptr[i + 1]], in the columns
+    indices[indptr[i] : indptr[i + 1]], sorted by column. The diagonal is
+    always stored, so that it can be set even where it is zero. The full
+    matrix is only built when it is asked for, with todense or np.asarray.
+
+    Parameters
+    ----------
+    data : np.array
+        1D array of the stored values
+
+    indices : np.array
+        1D array of the column of each stored value
+
+    indptr : np.array
+        1D array of the start of each row in data, with num_rows + 1 values
+
+    shape : tuple
+        (num_rows, num_columns)
+
+    Attributes
+    ----------
+    data : np.array
+        the stored values
+
+    indices : np.array
+        the column of each stored value
+
+    indptr : np.array
+        the start of each row in data
+
+    shape : tuple
+        (num_rows, num_columns)
+
+    nnz : int
+        the number of stored values
+
+    Methods
+    -------
+    from_triplets
+        Function to build a matrix from (row, column, value) triplets
+
+    row_indices
+        Function to get the row of each stored value
+
+    diagonal
+        Function to get the diagonal
+
+    trace
+        Function to get the sum of the diagonal
+
+    fill_diagonal
+        Function to set every diagonal element
+
+    todense
+        Function to expand the full matrix
+
+    to_scipy
+        Function to convert to a scipy.sparse.csr_matrix
+
+    matvec
+        Function to multiply the matrix with a vector or matrix
+
+    transpose
+        Function to get the transposed matrix
+
+    scale
+        Function to scale the matrix by the outer product of two vectors
+
+    window
+        Function to get the sub-matrix of a range of rows and columns
+
+    """
+
+    # numpy defers "array @ sparse" to __rmatmul__ instead of expanding it
+    __array_ufunc__ = None
+
+    def __init__(self, data, indices, indptr, shape):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = tuple(shape)
+
+    def __repr__(self):
+        return f"CSRMatrix(shape={self.shape}, nnz={self.nnz})"
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.todense()
+        return dense if dtype is None else dense.astype(dtype)
+
+    def __matmul__(self, other):
+        return self.matvec(other)
+
+    def __rmatmul__(self, other):
+        # other @ A = (A.T @ other.T).T
+        other = np.asarray(other)
+        if other.ndim == 1:
+            return self.transpose().matvec(other)
+        return self.transpose().matvec(other.T).T
+
+    @property
+    def ndim(self):
+        return 2
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes
+
+    @classmethod
+    def from_triplets(cls, rows, columns, values, shape):
+        """Function to build a matrix from (row, column, value) triplets
+
+        Zero values off the diagonal are not stored. If an element is given
+        more than once, the last value is kept, the same as assigning the
+        values to a dense matrix in order.
+
+        Parameters
+        ----------
+        rows : np.array
+            row of each value
+
+        columns : np.array
+            column of each value
+
+        values : np.array
+            the values
+
+        shape : tuple
+            (num_rows, num_columns)
+
+        Returns
+        -------
+        CSRMatrix
+            the matrix
+
+        """
+        num_rows, num_columns = shape
+        num_diagonal = min(shape)
+        keys = np.asarray(rows, dtype=np.int64) * num_columns + np.asarray(columns)
+        values = np.asarray(values, dtype=float)
+        diagonal_keys = np.arange(num_diagonal, dtype=np.int64) * (num_columns + 1)
+
+        # records in row order with increasing columns are already sorted
+        # and unique, and only need the missing diagonal elements
+        if len(keys) > 0 and np.all(np.diff(keys) > 0):
+            missing = diagonal_keys[~np.isin(diagonal_keys, keys, assume_unique=True)]
+            if len(missing) > 0:
+                position = np.searchsorted(keys, missing)
+                keys = np.insert(keys, position, missing)
+                values = np.insert(values, position, 0.0)
+        else:
+            # the diagonal zeros go first, so that any given value replaces them
+            keys = np.concatenate([diagonal_keys, keys])
+            values = np.concatenate([np.zeros(num_diagonal), values])
+            keys, last = np.unique(keys[::-1], return_index=True)
+            values = values[::-1][last]
+
+        rows, columns = np.divmod(keys, num_columns)
+        keep = (values != 0) | (rows == columns)
+        rows, columns, values = rows[keep], columns[keep], values[keep]
+
+        indptr = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+        return cls(values, columns, indptr, shape)
+
+    def row_indices(self):
+        """Function to get the row of each stored value
+
+        Returns
+        -------
+        np.array
+            1D array with the row of each value in data
+
+        """
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def diagonal(self):
+        """Function to get the diagonal
+
+        Returns
+        -------
+        np.array
+            1D array of the diagonal elements
+
+        """
+        rows = self.row_indices()
+        on_diagonal = rows == self.indices
+        diagonal = np.zeros(min(self.shape), dtype=self.dtype)
+        diagonal[rows[on_diagonal]] = self.data[on_diagonal]
+        return diagonal
+
+    def trace(self):
+        """Function to get the sum of the diagonal
+
+        Returns
+        -------
+        float
+            the trace
+
+        """
+        return np.sum(self.diagonal())
+
+    def fill_diagonal(self, value):
+        """Function to set every diagonal element
+
+        Parameters
+        ----------
+        value : float
+            the diagonal value
+
+        Returns
+        -------
+        None
+
+        """
+        self.data[self.row_indices() == self.indices] = value
+
+    def todense(self, out=None):
+        """Function to expand the full matrix
+
+        Parameters
+        ----------
+        out : np.array, optional, default is None
+            2D array of shape self.shape to write to. If None, a new array
+            is allocated
+
+        Returns
+        -------
+        np.array
+            the full matrix
+
+        """
+        if out is None:
+            out = np.empty(self.shape, dtype=self.dtype)
+        out[...] = 0
+        out[self.row_indices(), self.indices] = self.data
+        return out
+
+    def to_scipy(self):
+        """Function to convert to a scipy.sparse.csr_matrix, which shares
+        the arrays of this matrix. Requires scipy
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            the matrix
+
+        """
+        try:
+            from scipy.sparse import csr_matrix
+        except ImportError:
+            raise ImportError("Converting to a scipy sparse matrix requires scipy")
+        return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+    def matvec(self, vector):
+        """Function to multiply the matrix with a vector or matrix, one
+        block of rows at a time
+
+        Parameters
+        ----------
+        vector : np.array
+            1D array with num_columns values, or 2D array with num_columns rows
+
+        Returns
+        -------
+        np.array
+            the product, with num_rows rows
+
+        """
+        vector = np.asarray(vector)
+        num_rows = self.shape[0]
+        product = np.zeros(
+            (num_rows,) + vector.shape[1:], dtype=np.result_type(self.dtype, vector.dtype)
+        )
+        for start in range(0, num_rows, ROW_BLOCK):
+            stop = min(start + ROW_BLOCK, num_rows)
+            stored = slice(self.indptr[start], self.indptr[stop])
+            terms = (self.data[stored] * vector[self.indices[stored]].T).T
+
+            # sum the terms of each non-empty row, which are contiguous
+            starts = self.indptr[start:stop] - self.indptr[start]
+            filled = np.diff(self.indptr[start : stop + 1]) > 0
+            if np.any(filled):
+                product[start:stop][filled] = np.add.reduceat(terms, starts[filled], axis=0)
+        return product
+
+    def transpose(self):
+        """Function to get the transposed matrix
+
+        Returns
+        -------
+        CSRMatrix
+            the transpose, in CSR format
+
+        """
+        rows = self.row_indices()
+        order = np.lexsort((rows, self.indices))
+        indptr = np.zeros(self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=self.shape[1]), out=indptr[1:])
+        return CSRMatrix(self.data[order], rows[order], indptr, self.shape[::-1])
+
+    def scale(self, left, right=None, out=None):
+        """Function to scale the matrix by the outer product of two vectors,
+        out[i, j] = A[i, j] * left[i] * right[j]
+
+        Parameters
+        ----------
+        left : np.array
+            1D array of row scales
+
+        right : np.array, optional, default is None
+            1D array of column scales. If None, left is used
+
+        out : CSRMatrix, optional, default is None
+            matrix with the same structure to write to, which can be self to
+            scale in place. If None, a new one is allocated that shares the
+            indices of this one
+
+        Returns
+        -------
+        CSRMatrix
+            the scaled matrix
+
+        """
+        left = np.asarray(left, dtype=float)
+        right = left if right is None else np.asarray(right, dtype=float)
+        if out is None:
+            out = CSRMatrix(np.empty(self.nnz), self.indices, self.indptr, self.shape)
+        np.multiply(self.data, left[self.row_indices()], out=out.data)
+        np.multiply(out.data, right[self.indices], out=out.data)
+        return out
+
+    def window(self, start, stop):
+        """Function to get the sub-matrix of the rows and columns start to
+        stop - 1, for example the groups within energy limits
+
+        Parameters
+        ----------
+        start : int
+            first row and column
+
+        stop : int
+            row and column after the last one
+
+        Returns
+        -------
+        CSRMatrix
+            the sub-matrix
+
+        """
+        stored = slice(self.indptr[start], self.indptr[stop])
+        rows = self.row_indices()[stored] - start
+        columns = self.indices[stored]
+        keep = (columns >= start) & (columns < stop)
+
+        size = stop - start
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[keep], minlength=size), out=indptr[1:])
+        return CSRMatrix(self.data[stored][keep], columns[keep] - start, indptr, (size, size))
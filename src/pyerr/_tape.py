@@ -0,0 +1,352 @@
+import os
+import json
+import mmap
+import numpy as np
+from pyerr._atomic import write_json
+
+# columns 67-75 of each line, with the MAT (67-70), MF (71-72) and MT (73-75)
+CONTROL_COLUMNS = np.arange(66, 75)
+
+# number of bytes searched for line ends at a time
+SCAN_BLOCK = 64 * 1024**2
+
+# bump when the layout of the index file changes, so that old ones are not read
+INDEX_VERSION = 1
+
+# the side-car index file of a tape is the tape file name with this suffix
+INDEX_SUFFIX = ".pyerr-index.json"
+
+
+class TapeIndex:
+    """
+    Class to index the sections of an ENDF-formatted tape, such as an ERRORR
+    output, by (MAT, MF, MT), without parsing the tape
+
+    The tape is memory mapped, and the MAT, MF and MT of every line are read
+    from columns 67-75 to find the byte offsets where each section starts
+    and ends. The text of a section is only read from the memory map when it
+    is asked for, and is the same as the content of the section in ENDFtk,
+    with the SEND line at the end.
+
+    Parameters
+    ----------
+    filename : str or Path
+        the tape file name
+
+    sections : dictionary, optional, default is None
+        already known (start, stop) byte offsets of each (MAT, MF, MT)
+        section, for example ones that were stored. If None, the tape
+        is scanned
+
+    Attributes
+    ----------
+    filename : str
+        the tape file name
+
+    sections : dictionary
+        (start, stop) byte offsets of each (MAT, MF, MT) section, including
+        its SEND line
+
+    material_numbers : list
+        the MAT numbers on the tape, in order
+
+    Methods
+    -------
+    open
+        Function to index a tape with a side-car index file, which is only
+        written the first time the tape is scanned
+
+    scan
+        Function to find the byte offsets of every section of the tape
+
+    save
+        Function to write the section offsets to an index file
+
+    file_numbers
+        Function to get the MF numbers of a material
+
+    section_numbers
+        Function to get the MT numbers of a file of a material
+
+    content
+        Function to get the text of a section
+
+    lines
+        Function to get the lines of a section
+
+    close
+        Function to close the memory map of the tape
+
+    """
+
+    def __init__(self, filename, sections=None):
+        self.filename = str(filename)
+        stat = self._map()
+        # identifies the version of the tape that the offsets are for
+        self._stamp = [stat.st_size, stat.st_mtime_ns]
+        self.sections = self.scan() if sections is None else sections
+        if len(self.sections) == 0:
+            raise ValueError(f"No ENDF sections found in {self.filename}")
+
+    def __repr__(self):
+        return f"TapeIndex({self.filename!r}, sections={len(self.sections)})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getstate__(self):
+        # the memory map is opened again when the index is unpickled, for
+        # example in a worker process
+        state = self.__dict__.copy()
+        del state["_mmap"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._map()
+
+    def _map(self):
+        """Function to open the memory map of the tape and get its stat"""
+        with open(self.filename, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == 0:
+                raise ValueError(f"{self.filename} is empty")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return stat
+
+    @classmethod
+    def open(cls, filename, index_file=True):
+        """Function to index a tape with a side-car index file
+
+        If the index file is there and was written for the current version
+        of the tape (the same size and modification time), the offsets are
+        read from it without scanning the tape. Otherwise the tape is
+        scanned and the index file is written, if its directory is writable.
+
+        Parameters
+        ----------
+        filename : str or Path
+            the tape file name
+
+        index_file : str, Path or bool, optional, default is True
+            the index file. If True, the tape file name with INDEX_SUFFIX
+            is used, and if None or False, no index file is used
+
+        Returns
+        -------
+        TapeIndex
+            the index
+
+        """
+        if index_file is None or index_file is False:
+            return cls(filename)
+        if index_file is True:
+            index_file = str(filename) + INDEX_SUFFIX
+
+        try:
+            with open(index_file) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = {}
+        if stored.get("version") == INDEX_VERSION and len(stored.get("sections", [])) > 0:
+            sections = {
+                (mat, mf, mt): (start, stop) for mat, mf, mt, start, stop in stored["sections"]
+            }
+            index = cls(filename, sections)
+            if index._stamp == stored["stamp"]:
+                return index
+            index.close()
+
+        index = cls(filename)
+        try:
+            index.save(index_file)
+        except OSError:
+            # the index file only saves time, the tape can still be read
+            pass
+        return index
+
+    @property
+    def material_numbers(self):
+        return list(dict.fromkeys(mat for mat, mf, mt in self.sections))
+
+    def scan(self):
+        """Function to find the byte offsets of every section of the tape
+
+        Runs of lines with the same MAT, MF and MT are found by comparing the
+        control columns of neighbouring lines with numpy, so only the first
+        line of each run is converted to numbers.
+
+        Returns
+        -------
+        dictionary
+            (start, stop) byte offsets of each (MAT, MF, MT) section
+
+        """
+        data = np.frombuffer(self._mmap, dtype=np.uint8)
+        ends = [
+            np.flatnonzero(data[start : start + SCAN_BLOCK] == ord("\n")) + start
+            for start in range(0, len(data), SCAN_BLOCK)
+        ]
+        ends = np.concatenate(ends)
+        if len(ends) == 0 or ends[-1] != len(data) - 1:
+            # the last line has no line end
+            ends = np.append(ends, len(data))
+        starts = np.concatenate([[0], ends[:-1] + 1])
+
+        # lines that are too short for the control columns are skipped
+        full = np.flatnonzero(ends - starts >= CONTROL_COLUMNS[-1] + 1)
+        starts, ends = starts[full], ends[full]
+        if len(full) == 0:
+            return {}
+        controls = data[starts[:, np.newaxis] + CONTROL_COLUMNS]
+        first = np.flatnonzero(
+            np.concatenate([[True], np.any(controls[1:] != controls[:-1], axis=1)])
+        )
+        last = np.append(first[1:], len(starts)) - 1
+
+        sections = {}
+        previous = None
+        for i, j in zip(first, last):
+            try:
+                control = bytes(controls[i])
+                mat, mf, mt = int(control[:4]), int(control[4:6]), int(control[6:])
+            except ValueError:
+                previous = None
+                continue
+
+            if mt == 0:
+                # the SEND line closes the section before it
+                if previous is not None and previous[:2] == (mat, mf):
+                    sections[previous] = (sections[previous][0], int(ends[j]) + 1)
+                previous = None
+            elif mat > 0 and mf > 0:
+                previous = (mat, mf, mt)
+                sections[previous] = (int(starts[i]), int(ends[j]) + 1)
+            else:
+                previous = None
+        return sections
+
+    def save(self, index_file):
+        """Function to write the section offsets to an index file, which
+        TapeIndex.open reads instead of scanning the tape again
+
+        Parameters
+        ----------
+        index_file : str or Path
+            the index file
+
+        Returns
+        -------
+        None
+
+        """
+        index = {
+            "version": INDEX_VERSION,
+            "filename": self.filename,
+            "stamp": self._stamp,
+            "sections": [
+                [mat, mf, mt, start, stop]
+                for (mat, mf, mt), (start, stop) in self.sections.items()
+            ],
+        }
+        write_json(str(index_file), index)
+
+    def file_numbers(self, mat):
+        """Function to get the MF numbers of a material
+
+        Parameters
+        ----------
+        mat : int
+            the MAT number
+
+        Returns
+        -------
+        list
+            the MF numbers, in order
+
+        """
+        return list(dict.fromkeys(mf for m, mf, mt in self.sections if m == mat))
+
+    def section_numbers(self, mat, mf):
+        """Function to get the MT numbers of a file of a material
+
+        Parameters
+        ----------
+        mat : int
+            the MAT number
+
+        mf : int
+            the MF number
+
+        Returns
+        -------
+        list
+            the MT numbers, in order
+
+        """
+        return [mt for m, f, mt in self.sections if (m, f) == (mat, mf)]
+
+    def content(self, mat, mf, mt):
+        """Function to get the text of a section, read from the memory map
+
+        Parameters
+        ----------
+        mat : int
+            the MAT number
+
+        mf : int
+            the MF number
+
+        mt : int
+            the MT number
+
+        Returns
+        -------
+        str
+            the lines of the section, including the SEND line
+
+        """
+        if (mat, mf, mt) not in self.sections:
+            raise KeyError(f"MAT{mat} MF{mf} MT{mt} is not on {self.filename}")
+        start, stop = self.sections[(mat, mf, mt)]
+        return self._mmap[start:stop].decode("ascii")
+
+    def lines(self, mat, mf, mt):
+        """Function to get the lines of a section, the same as splitting
+        its content at the line ends
+
+        Parameters
+        ----------
+        mat : int
+            the MAT number
+
+        mf : int
+            the MF number
+
+        mt : int
+            the MT number
+
+        Returns
+        -------
+        list
+            the lines of the section
+
+        """
+        return self.content(mat, mf, mt).split("\n")
+
+    def close(self):
+        """Function to close the memory map of the tape
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+        self._mmap.close()
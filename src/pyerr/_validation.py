@@ -0,0 +1,392 @@
+import warnings
+import numpy as np
+from pyerr._packed import PackedSymmetricMatrix, ROW_BLOCK
+from pyerr._sparse import CSRMatrix
+from pyerr._linalg import covariance_to_correlation
+
+# what to do with a covariance matrix that fails validation
+VALIDATION_POLICIES = ("raise", "warn", "clip", "nearest_psd")
+
+# largest asymmetry, relative to the largest variance, that is accepted
+SYMMETRY_TOLERANCE = 1e-10
+
+# largest amount that |correlation| can be above one, which is more than
+# the rounding of the 7 significant digits of the values in the file
+CORRELATION_TOLERANCE = 1e-4
+
+# largest negative eigenvalue, relative to the largest eigenvalue, that is
+# treated as round-off instead of as a negative eigenvalue
+EIGENVALUE_TOLERANCE = 1e-5
+
+
+class CovarianceError(ValueError):
+    """
+    Exception for a covariance matrix that failed validation
+
+    Attributes
+    ----------
+    report : ValidationReport
+        the report of the checks
+
+    """
+
+    def __init__(self, report):
+        super().__init__(report.summary())
+        self.report = report
+
+
+class CovarianceWarning(UserWarning):
+    """Warning for a covariance matrix that failed validation"""
+
+
+class ValidationReport:
+    """
+    Class to hold the results of the checks of a covariance matrix
+
+    Parameters
+    ----------
+    label : str
+        what the matrix is, for example "MAT9228 MF35 MT18"
+
+    num_groups : int
+        the number of energy groups
+
+    Attributes
+    ----------
+    label : str
+        what the matrix is
+
+    num_groups : int
+        the number of energy groups
+
+    bad_diagonal : np.array
+        indices of the groups with a zero, negative or NaN variance
+
+    max_asymmetry : float
+        largest |C[i, j] - C[j, i]|, relative to the largest variance
+
+    num_bad_correlations : int
+        number of elements with a |correlation| above one
+
+    max_abs_correlation : float
+        largest |correlation|
+
+    num_negative_eigenvalues : int or None
+        number of negative eigenvalues, or None if they were not checked
+
+    min_eigenvalue : float or None
+        the smallest eigenvalue, or None if they were not checked
+
+    negative_eigenvalue_ratio : float or None
+        |smallest eigenvalue| / largest eigenvalue if the smallest one is
+        negative and 0 otherwise, or None if they were not checked
+
+    repairs : list
+        what was changed in the matrix to repair it
+
+    ok : bool
+        whether the matrix passed all of the checks
+
+    Methods
+    -------
+    issues
+        Function to describe each check that failed
+
+    summary
+        Function to describe the report in a few lines
+
+    as_dict
+        Function to get the report as a flat dictionary, for a table of
+        the reports of many matrices
+
+    """
+
+    def __init__(self, label, num_groups):
+        self.label = label
+        self.num_groups = num_groups
+        self.bad_diagonal = np.zeros(0, dtype=int)
+        self.max_asymmetry = 0.0
+        self.num_bad_correlations = 0
+        self.max_abs_correlation = 0.0
+        self.num_negative_eigenvalues = None
+        self.min_eigenvalue = None
+        self.negative_eigenvalue_ratio = None
+        self.repairs = []
+
+    def __repr__(self):
+        return f"ValidationReport({self.label!r}, ok={self.ok})"
+
+    @property
+    def ok(self):
+        return len(self.issues()) == 0
+
+    def issues(self):
+        """Function to describe each check that failed
+
+        Returns
+        -------
+        list
+            one string for each failed check
+
+        """
+        issues = []
+        if len(self.bad_diagonal) > 0:
+            issues.append(
+                f"{len(self.bad_diagonal)} zero and/or negative values along the diagonal, "
+                f"in groups {self.bad_diagonal.tolist()}"
+            )
+        if self.max_asymmetry > SYMMETRY_TOLERANCE:
+            issues.append(f"asymmetric, by up to {self.max_asymmetry:.3e} of the largest variance")
+        if self.num_bad_correlations > 0:
+            issues.append(
+                f"{self.num_bad_correlations} correlations above one in magnitude, "
+                f"up to {self.max_abs_correlation:.6f}"
+            )
+        if self.num_negative_eigenvalues:
+            issues.append(
+                f"{self.num_negative_eigenvalues} negative eigenvalues, the smallest is "
+                f"{self.min_eigenvalue:.3e} ({self.negative_eigenvalue_ratio:.3e} of the largest)"
+            )
+        return issues
+
+    def summary(self):
+        """Function to describe the report in a few lines
+
+        Returns
+        -------
+        str
+            the description
+
+        """
+        issues = self.issues()
+        if len(issues) == 0:
+            text = f"Covariance matrix of {self.label} passed validation"
+        else:
+            text = f"Covariance matrix of {self.label} has " + "; ".join(issues)
+        if len(self.bad_diagonal) > 0:
+            text += (
+                ". This may be caused by BROADR producing zeros for the fission cross "
+                "section. Run BROADR with thnmax as low as reasonable for this problem "
+                "(at least below the energy of the group that is zero)"
+            )
+        if len(self.repairs) > 0:
+            text += ". Repaired: " + "; ".join(self.repairs)
+        return text
+
+    def as_dict(self):
+        """Function to get the report as a flat dictionary, for a table of
+        the reports of many matrices
+
+        Returns
+        -------
+        dictionary
+            the attributes of the report, with the number of bad diagonal
+            values instead of their indices
+
+        """
+        return {
+            "label": self.label,
+            "num_groups": self.num_groups,
+            "ok": self.ok,
+            "num_bad_diagonal": len(self.bad_diagonal),
+            "max_asymmetry": self.max_asymmetry,
+            "num_bad_correlations": self.num_bad_correlations,
+            "max_abs_correlation": self.max_abs_correlation,
+            "num_negative_eigenvalues": self.num_negative_eigenvalues,
+            "min_eigenvalue": self.min_eigenvalue,
+            "negative_eigenvalue_ratio": self.negative_eigenvalue_ratio,
+            "repairs": "; ".join(self.repairs),
+        }
+
+
+def validate_covariance(matrix, label="", eigenvalues=False, asymmetry=None):
+    """Function to check a covariance matrix for non-positive variances,
+    asymmetry, correlations above one and, optionally, negative eigenvalues
+
+    Each check is one vectorized pass over the matrix, and none of them
+    expand packed or sparse matrices, except for the eigenvalues.
+
+    Parameters
+    ----------
+    matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        the covariance matrix
+
+    label : str, optional, default is ""
+        what the matrix is, for the report
+
+    eigenvalues : bool, optional, default is False
+        if True, the eigenvalues are checked as well, which is O(n^3)
+
+    asymmetry : float, optional, default is None
+        the largest |C[i, j] - C[j, i]| of the values the matrix was built
+        from, for a PackedSymmetricMatrix, which only keeps one of them. If
+        None, it is measured on the matrix
+
+    Returns
+    -------
+    ValidationReport
+        the results of the checks
+
+    """
+    report = ValidationReport(label, len(matrix))
+    diagonal = np.asarray(matrix.diagonal(), dtype=float)
+    report.bad_diagonal = np.flatnonzero(~(diagonal > 0))
+    scale = np.max(diagonal, initial=0.0)
+    if not scale > 0:
+        scale = 1.0
+
+    if asymmetry is None:
+        asymmetry = _max_asymmetry(matrix)
+    report.max_asymmetry = asymmetry / scale
+
+    correlation = covariance_to_correlation(matrix, np.sqrt(np.clip(diagonal, 0.0, None)))
+    if isinstance(correlation, (PackedSymmetricMatrix, CSRMatrix)):
+        correlation = correlation.data
+    if len(diagonal) > 0:
+        magnitude = np.abs(correlation)
+        report.num_bad_correlations = int(np.count_nonzero(magnitude > 1 + CORRELATION_TOLERANCE))
+        report.max_abs_correlation = float(np.max(magnitude))
+
+    if eigenvalues and len(diagonal) > 0:
+        values = np.linalg.eigvalsh(np.asarray(matrix))
+        largest = max(np.max(np.abs(values)), np.finfo(float).tiny)
+        report.num_negative_eigenvalues = int(
+            np.count_nonzero(values < -EIGENVALUE_TOLERANCE * largest)
+        )
+        report.min_eigenvalue = float(values[0])
+        report.negative_eigenvalue_ratio = float(max(-values[0], 0.0) / largest)
+    return report
+
+
+def repair_covariance(matrix, report, nearest_psd=False):
+    """Function to repair a covariance matrix that failed validation
+
+    The matrix is made symmetric, the rows and columns of groups with a
+    non-positive variance are set to zero, and the covariances are clipped
+    to |C[i, j]| <= sqrt(C[i, i] C[j, j]), so that no correlation is above
+    one. With nearest_psd, negative eigenvalues are then set to zero, which
+    gives the nearest positive semi-definite matrix.
+
+    Parameters
+    ----------
+    matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        the covariance matrix. A dense matrix is repaired in place, unless
+        it is read-only, for example memory-mapped from a SectionCache
+
+    report : ValidationReport
+        the report of the matrix, whose repairs are added to
+
+    nearest_psd : bool, optional, default is False
+        if True, the negative eigenvalues are clipped as well
+
+    Returns
+    -------
+    np.array, PackedSymmetricMatrix or CSRMatrix
+        the repaired matrix, with the same storage
+
+    """
+    dense = matrix if isinstance(matrix, np.ndarray) else np.asarray(matrix)
+    if not dense.flags.writeable:
+        dense = np.array(dense)
+    if report.max_asymmetry > SYMMETRY_TOLERANCE:
+        np.add(dense, dense.T, out=dense)
+        dense *= 0.5
+        report.repairs.append("symmetrized")
+
+    if len(report.bad_diagonal) > 0:
+        dense[report.bad_diagonal, :] = 0.0
+        dense[:, report.bad_diagonal] = 0.0
+        report.repairs.append(f"zeroed {len(report.bad_diagonal)} groups")
+
+    std = np.sqrt(np.clip(np.diagonal(dense), 0.0, None))
+    for start in range(0, len(dense), ROW_BLOCK):
+        bound = np.outer(std[start : start + ROW_BLOCK], std)
+        np.clip(
+            dense[start : start + ROW_BLOCK], -bound, bound, out=dense[start : start + ROW_BLOCK]
+        )
+    if report.num_bad_correlations > 0:
+        report.repairs.append(f"clipped {report.num_bad_correlations} correlations")
+
+    if nearest_psd:
+        values, vectors = np.linalg.eigh(dense)
+        num_negative = int(np.count_nonzero(values < 0))
+        if num_negative > 0:
+            dense[...] = (vectors * np.clip(values, 0.0, None)) @ vectors.T
+            report.repairs.append(f"clipped {num_negative} negative eigenvalues")
+
+    if isinstance(matrix, PackedSymmetricMatrix):
+        out = matrix.data if matrix.data.flags.writeable else None
+        return PackedSymmetricMatrix.from_dense(dense, out=out)
+    if isinstance(matrix, CSRMatrix):
+        rows, columns = np.nonzero(dense)
+        return CSRMatrix.from_triplets(rows, columns, dense[rows, columns], dense.shape)
+    return dense
+
+
+def apply_policy(matrix, policy="raise", label="", eigenvalues=False, asymmetry=None):
+    """Function to validate a covariance matrix and apply a policy if it
+    fails
+
+    Parameters
+    ----------
+    matrix : np.array, PackedSymmetricMatrix or CSRMatrix
+        the covariance matrix
+
+    policy : str, optional, default is "raise"
+        "raise" to raise a CovarianceError, "warn" to issue a
+        CovarianceWarning and keep the matrix as it is, "clip" to repair the
+        matrix, or "nearest_psd" to repair it and clip its negative
+        eigenvalues, see repair_covariance
+
+    label : str, optional, default is ""
+        what the matrix is, for the report
+
+    eigenvalues : bool, optional, default is False
+        if True, the eigenvalues are checked as well, which is O(n^3)
+
+    asymmetry : float, optional, default is None
+        the asymmetry of the values the matrix was built from, see
+        validate_covariance
+
+    Returns
+    -------
+    np.array, PackedSymmetricMatrix or CSRMatrix, ValidationReport
+        the matrix, which is repaired with the "clip" and "nearest_psd"
+        policies, and the report of the checks
+
+    """
+    if policy not in VALIDATION_POLICIES:
+        raise ValueError(
+            f"Unknown validation policy '{policy}', must be one of {VALIDATION_POLICIES}"
+        )
+    report = validate_covariance(matrix, label, eigenvalues, asymmetry)
+    if report.ok:
+        return matrix, report
+
+    if policy == "raise":
+        raise CovarianceError(report)
+    if policy == "warn":
+        warnings.warn(report.summary(), CovarianceWarning, stacklevel=3)
+        return matrix, report
+    return repair_covariance(matrix, report, nearest_psd=policy == "nearest_psd"), report
+
+
+def _max_asymmetry(matrix):
+    """Function to get the largest |C[i, j] - C[j, i]|, which is zero for a
+    packed matrix since it only stores one of the two"""
+    if isinstance(matrix, PackedSymmetricMatrix) or len(matrix) == 0:
+        return 0.0
+    if isinstance(matrix, CSRMatrix):
+        transpose = matrix.transpose()
+        if np.array_equal(matrix.indptr, transpose.indptr) and np.array_equal(
+            matrix.indices, transpose.indices
+        ):
+            return float(np.max(np.abs(matrix.data - transpose.data), initial=0.0))
+        matrix = np.asarray(matrix)
+
+    asymmetry = 0.0
+    for start in range(0, len(matrix), ROW_BLOCK):
+        stop = min(start + ROW_BLOCK, len(matrix))
+        difference = np.abs(matrix[start:stop] - matrix[:, start:stop].T)
+        asymmetry = max(asymmetry, float(np.max(difference)))
+    return asymmetry
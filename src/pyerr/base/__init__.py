@@ -1,2 +1,3 @@
 from pyerr.base._control import Control
 from pyerr.base._values import Values
+from pyerr.base._records import ENGINES, read_cont, read_values
@@ -1,5 +1,5 @@
-import fortranformat as ff
 from abc import ABC
+from pyerr.base._records import read_cont, check_engine, fortran_reader
 
 
 class Control(ABC):
@@ -11,6 +11,10 @@ class Control(ABC):
     lines : list
         list of control lines from the file
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" for the vectorized fixed-width
+        reader or "fortranformat" for the line-by-line reference reader
+
     Attributes
     ----------
     lines : list
@@ -42,8 +46,9 @@ class Control(ABC):
 
     """
 
-    def __init__(self, lines):
+    def __init__(self, lines, engine="numpy"):
         self.lines = lines
+        self.engine = check_engine(engine)
         self.parse_lines()
         self.ZA = self.parsed_values[0]
         self.AWR = self.parsed_values[1]
@@ -63,6 +68,10 @@ class Control(ABC):
         None, sets the attribute self.parsed_values
 
         """
-        control_line = ff.FortranRecordReader("(2G11.0,4I11,I4,I2,I3,I5)")
-        parsed_lines = [control_line.read(line) for line in self.lines]
+        if self.engine == "numpy":
+            floats, integers = read_cont(self.lines)
+            parsed_lines = [f + i for f, i in zip(floats.tolist(), integers.tolist())]
+        else:
+            control_line = fortran_reader("(2G11.0,4I11,I4,I2,I3,I5)")
+            parsed_lines = [control_line.read(line) for line in self.lines]
         self.parsed_values = [item for line in parsed_lines for item in line]
@@ -0,0 +1,215 @@
+import numpy as np
+
+# "numpy" is the vectorized reader, "fortranformat" the line-by-line reference
+ENGINES = ("numpy", "fortranformat")
+
+RECORD_WIDTH = 66
+LINE_WIDTH = 80
+FIELD_WIDTH = 11
+FIELDS_PER_LINE = 6
+
+# number of lines converted at a time, to bound the size of the temporaries
+CHUNK_LINES = 65536
+
+# column slices of the MAT, MF, MT and line number fields
+TAIL_FIELDS = ((66, 70), (70, 72), (72, 75), (75, 80))
+
+# Fortran record readers by format, for the "fortranformat" engine, which is
+# the only place fortranformat is imported
+_READERS = {}
+
+_SPACE = ord(" ")
+_PLUS = ord("+")
+_MINUS = ord("-")
+_DOT = ord(".")
+_ZERO = ord("0")
+_NINE = ord("9")
+_E = ord("E")
+
+
+def byte_matrix(lines, width):
+    """Function to pack text lines into a fixed-width byte matrix
+
+    Lines are cut or padded with blanks to exactly ``width`` characters, so
+    that every line occupies one row of the returned array.
+
+    Parameters
+    ----------
+    lines : list
+        list of text lines
+
+    width : int
+        number of columns to keep from each line
+
+    Returns
+    -------
+    np.array
+        2D uint8 array of shape (len(lines), width)
+
+    """
+    buffer = "".join([line[:width].ljust(width) for line in lines]).encode("ascii")
+    return np.frombuffer(buffer, dtype=np.uint8).reshape((len(lines), width))
+
+
+def fields_to_float(fields):
+    """Function to convert fixed-width ENDF float fields to floats
+
+    Handles the ENDF convention of dropping the 'E' in the exponent, so that
+    ``1.234567+5`` and ``2.67762-11`` are read as ``1.234567E+5`` and
+    ``2.67762E-11``. Fortran 'D' exponents are accepted and blank fields
+    are read as zero, the same as a Fortran G edit descriptor.
+
+    Parameters
+    ----------
+    fields : np.array
+        2D uint8 array, one field per row
+
+    Returns
+    -------
+    np.array
+        1D float64 array with one value per field
+
+    """
+    num_fields, width = fields.shape
+    fields = np.where((fields == ord("D")) | (fields == ord("d")), _E, fields)
+
+    # an exponent sign is a +/- that directly follows a digit or the decimal point
+    previous = fields[:, :-1]
+    is_sign = (fields[:, 1:] == _PLUS) | (fields[:, 1:] == _MINUS)
+    after_mantissa = ((previous >= _ZERO) & (previous <= _NINE)) | (previous == _DOT)
+    exponent = is_sign & after_mantissa
+    has_exponent = exponent.any(axis=1)
+    position = exponent.argmax(axis=1) + 1
+
+    # shift everything after the exponent sign by one column and insert an 'E'
+    unshifted = np.full((num_fields, width), _SPACE, dtype=np.uint8)
+    unshifted[:, :-1] = fields[:, 1:]
+    after = has_exponent[:, None] & (np.arange(1, width + 1)[None, :] > position[:, None])
+    converted = np.empty((num_fields, width + 1), dtype=np.uint8)
+    converted[:, 0] = fields[:, 0]
+    converted[:, 1:] = np.where(after, fields, unshifted)
+    converted[has_exponent, position[has_exponent]] = _E
+
+    # blank fields are zero
+    converted[np.all(fields == _SPACE, axis=1), 0] = _ZERO
+
+    return converted.view(f"S{width + 1}").ravel().astype(np.float64)
+
+
+def fields_to_int(fields):
+    """Function to convert fixed-width integer fields to integers
+
+    Parameters
+    ----------
+    fields : np.array
+        2D uint8 array, one field per row
+
+    Returns
+    -------
+    np.array
+        1D int64 array with one value per field, blank fields are zero
+
+    """
+    fields = fields.copy()
+    fields[np.all(fields == _SPACE, axis=1), -1] = _ZERO
+    return fields.view(f"S{fields.shape[1]}").ravel().astype(np.int64)
+
+
+def read_values(lines):
+    """Function to read all of the (6G11.0) value fields in a block of lines
+
+    Parameters
+    ----------
+    lines : list
+        list of value lines
+
+    Returns
+    -------
+    np.array
+        1D float64 array with the six values of each line, in order
+
+    """
+    values = np.empty(len(lines) * FIELDS_PER_LINE)
+    for start in range(0, len(lines), CHUNK_LINES):
+        chunk = lines[start : start + CHUNK_LINES]
+        fields = byte_matrix(chunk, RECORD_WIDTH).reshape((-1, FIELD_WIDTH))
+        values[start * FIELDS_PER_LINE : (start + len(chunk)) * FIELDS_PER_LINE] = fields_to_float(
+            fields
+        )
+    return values
+
+
+def read_cont(lines):
+    """Function to read a block of (2G11.0,4I11,I4,I2,I3,I5) control records
+
+    Parameters
+    ----------
+    lines : list
+        list of control lines
+
+    Returns
+    -------
+    floats : np.array
+        float64 array of shape (len(lines), 2) with the C1 and C2 fields
+
+    integers : np.array
+        int64 array of shape (len(lines), 8) with the L1, L2, N1, N2,
+        MAT, MF, MT and line number fields
+
+    """
+    num_lines = len(lines)
+    matrix = byte_matrix(lines, LINE_WIDTH)
+    record = matrix[:, :RECORD_WIDTH].reshape((num_lines, FIELDS_PER_LINE, FIELD_WIDTH))
+
+    floats = fields_to_float(record[:, :2].reshape((-1, FIELD_WIDTH))).reshape((num_lines, 2))
+
+    integers = np.empty((num_lines, 8), dtype=np.int64)
+    integers[:, :4] = fields_to_int(record[:, 2:].reshape((-1, FIELD_WIDTH))).reshape(
+        (num_lines, 4)
+    )
+    for i, (start, stop) in enumerate(TAIL_FIELDS):
+        integers[:, 4 + i] = fields_to_int(matrix[:, start:stop])
+
+    return floats, integers
+
+
+def check_engine(engine):
+    """Function to check the name of a parsing engine
+
+    Parameters
+    ----------
+    engine : str
+        name of the engine, one of ENGINES
+
+    Returns
+    -------
+    str
+        the engine name
+
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown parsing engine '{engine}', must be one of {ENGINES}")
+    return engine
+
+
+def fortran_reader(format):
+    """Function to get a fortranformat record reader for a format, which is
+    only created once. fortranformat is imported the first time this is
+    called, so it is not needed by the "numpy" engine
+
+    Parameters
+    ----------
+    format : str
+        the Fortran format, for example "(6G11.0)"
+
+    Returns
+    -------
+    fortranformat.FortranRecordReader
+        the reader
+
+    """
+    if format not in _READERS:
+        import fortranformat as ff
+
+        _READERS[format] = ff.FortranRecordReader(format)
+    return _READERS[format]
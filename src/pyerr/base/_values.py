@@ -1,5 +1,5 @@
-import fortranformat as ff
 from abc import ABC
+from pyerr.base._records import read_values, check_engine, fortran_reader
 
 
 class Values(ABC):
@@ -11,13 +11,18 @@ class Values(ABC):
     lines : list
         list of value lines from the file
 
+    engine : str, optional, default is "numpy"
+        parsing engine, either "numpy" for the vectorized fixed-width
+        reader or "fortranformat" for the line-by-line reference reader
+
     Attributes
     ----------
     lines : list
         list of value lines from the file
 
-    parsed_values : list
-        list of the values in the section
+    parsed_values : np.array or list
+        the values in the section, as a np.array with the "numpy"
+        engine and as a list with the "fortranformat" engine
 
     Methods
     -------
@@ -27,8 +32,9 @@ class Values(ABC):
 
     """
 
-    def __init__(self, lines):
+    def __init__(self, lines, engine="numpy"):
         self.lines = lines
+        self.engine = check_engine(engine)
         self.parse_lines()
 
     def parse_lines(self):
@@ -43,6 +49,10 @@ class Values(ABC):
         None, sets the attribute self.parsed_values
 
         """
-        control_line = ff.FortranRecordReader("(6G11.0)")
+        if self.engine == "numpy":
+            self.parsed_values = read_values(self.lines)
+            return
+
+        control_line = fortran_reader("(6G11.0)")
         parsed_lines = [control_line.read(line) for line in self.lines]
         self.parsed_values = [item for line in parsed_lines for item in line]
@@ -1,16 +1,33 @@
+import copy
 import numpy as np
-import ENDFtk
-from pyerr import Section
+from pyerr._energy import EnergyGroups
+from pyerr._covariance import Covariance
+from pyerr._section import Section
+from pyerr._joint import JointCovariance
+from pyerr._cache import SectionCache
+from pyerr._sections import LazySections
+from pyerr._sampling import DEFAULT_CHUNK_SIZE
+from pyerr._parallel import sample_sections
+from pyerr._tape import TapeIndex
+from pyerr._validation import CovarianceError
+
+# readers of the tape, see ErrorrOutput
+BACKENDS = ("auto", "native", "endftk")
 
 
 class ErrorrOutput:
     """
     Class to hold a full ERRORR output, with multiple sections
 
+    An ErrorrOutput can be pickled, for example to send it to worker
+    processes. Only the index of the file is pickled, and the sections are
+    parsed again the first time they are accessed after unpickling.
+
     Parameters
     ----------
-    filename : str
-        the ERRORR output file name
+    filename : str or TapeIndex
+        the ERRORR output file name, or an already opened TapeIndex of it,
+        for example one shared with the other materials of the tape
 
     lower_limit : float, optional, default is None
         the lower limit in energy (eV) to cut the values at. If not given, uses the lower
@@ -23,42 +40,559 @@ class ErrorrOutput:
         limit of the matrix in the file. If given, will cut out groups below the upper
         limit. If the upper limit falls within a group, that group is kept
 
+    engine : str, optional, default is "numpy"
+        parsing engine for the text, either "numpy" for the vectorized
+        fixed-width reader or "fortranformat" for the line-by-line
+        reference reader
+
+    preload : list or bool, optional, default is None
+        MT numbers of the sections to parse right away. Other sections are
+        only parsed the first time they are accessed. If True, every section
+        is parsed right away
+
+    cache : SectionCache, str, Path or bool, optional, default is None
+        on-disk cache of the parsed sections. If given, sections that are in
+        the cache are loaded from it without reading the file, and sections
+        that are parsed are added to it. Loaded sections are checked with the
+        validation policy as well. If True, a SectionCache in the default
+        directory is used, and a str or Path is used as the cache directory
+
+    scratch_dir : str or Path, optional, default is None
+        if given, the covariance and derived matrices of each section are
+        allocated as memory-mapped files under this directory instead of
+        in memory, see Section
+
+    storage : str, optional, default is "dense"
+        storage of the covariance and derived matrices of each section,
+        "dense" for full 2D arrays, "packed" for only their upper
+        triangles or "sparse" for only their nonzero values, see Section
+
+    backend : str, optional, default is "auto"
+        reader of the tape, "native" to index the sections with a TapeIndex
+        and only read the ones that are used from a memory map, "endftk" to
+        parse the whole tape with ENDFtk, or "auto" to use the native reader
+        and fall back to ENDFtk if it cannot index the tape
+
+    mat : int, optional, default is None
+        the MAT number of the material to read, for tapes with more than
+        one material. If None, the first material on the tape is read
+
+    index_file : str, Path or bool, optional, default is None
+        side-car index file of the section offsets for the native reader,
+        see TapeIndex.open. If True, it is next to the tape. It is written
+        the first time the tape is scanned and read after that
+
+    validation : str, optional, default is "raise"
+        what to do with a covariance matrix that fails validation when its
+        section is parsed, "raise", "warn", "clip" or "nearest_psd", see
+        Section. Use validate to check every section at once
+
     Attributes
     ----------
     filename : str
         the ERRORR output file name
 
-    sections : dictionary
-        Dictionary of Section classes, one for each MT value
+    sections : LazySections
+        Read-only dictionary of Section classes, one for each MT value,
+        that builds each Section on first access
+
+    cache : SectionCache
+        the on-disk cache, or None
+
+    backend : str
+        the reader of the tape, "native" or "endftk" once the tape is
+        opened, and the given backend before that
+
+    mat : int
+        the MAT number of the material, once the tape is opened
+
+    energy_groups : EnergyGroups
+        the energy groups of the file within the limits, which are only
+        parsed once and are shared by all of the sections
 
     Methods
     -------
     open_errorr_file
-        Function to parse the ERRORR file with ENDFtk
+        Function to index the ERRORR file with the backend
+
+    section_lines
+        Function to get the lines of a section of the file
+
+    build_section
+        Function to build the Section for a single MT value
+
+    update_cache
+        Function to store sections in the cache again, with their eigenpairs
+
+    get_pca_realizations
+        Function to sample PCA realizations of many sections in parallel
+
+    joint_covariance
+        Function to assemble the joint covariance of several reactions,
+        including the covariance between them
+
+    collapse
+        Function to collapse many sections onto another group structure
+
+    window
+        Function to get the output with other energy limits, without
+        parsing the file again
+
+    validate
+        Function to check the covariance matrices of many sections and
+        report the results in one table
+
+    to_parquet
+        Function to write the sections to Parquet files
 
     """
 
-    def __init__(self, filename, lower_limit=None, upper_limit=None):
+    def __init__(
+        self,
+        filename,
+        lower_limit=None,
+        upper_limit=None,
+        engine="numpy",
+        preload=None,
+        cache=None,
+        scratch_dir=None,
+        storage="dense",
+        backend="auto",
+        mat=None,
+        index_file=None,
+        validation="raise",
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', must be one of {BACKENDS}")
+        self._tape = None
+        if isinstance(filename, TapeIndex):
+            self._tape = filename
+            filename = filename.filename
         self.filename = filename
-        section_numbers = self.open_errorr_file()
-
-        # create Section class for each
-        self.sections = {}
-        for mf, mt in section_numbers:
-            energy_lines = self._mat.file(1).section(451).content.split("\n")
-            mean_lines = self._mat.file(mf).section(mt).content.split("\n")
-            cov_lines = self._mat.file(mf + 30).section(mt).content.split("\n")
-            self.sections[mt] = Section(
-                energy_lines, mean_lines, cov_lines, lower_limit, upper_limit
+        self.lower_limit = lower_limit
+        self.upper_limit = upper_limit
+        self.engine = engine
+        self.scratch_dir = scratch_dir
+        self.storage = storage
+        self.backend = backend
+        self.mat = mat
+        self.index_file = index_file
+        self.validation = validation
+        self._requested_mat = mat
+        self._mat = None
+        self._opened = False
+        self._energy_grid = None
+
+        if cache is True:
+            cache = SectionCache()
+        elif cache is not None and cache is not False and not isinstance(cache, SectionCache):
+            cache = SectionCache(cache)
+        self.cache = cache or None
+
+        section_numbers = None
+        if self.cache is not None:
+            self._cache_key = self.cache.key(filename, lower_limit, upper_limit, mat, validation)
+            section_numbers = self.cache.load_index(self._cache_key)
+        if section_numbers is None:
+            section_numbers = self.open_errorr_file()
+            if self.cache is not None:
+                self.cache.store_index(self._cache_key, section_numbers, filename)
+
+        # Section classes are only created when they are first accessed
+        self._section_files = {mt: mf for mf, mt in section_numbers}
+        self.sections = LazySections(self.build_section, self._section_files, preload)
+
+    def __getstate__(self):
+        # the ENDFtk material and the parsed sections are not pickled, so an
+        # output can be sent to worker processes cheaply. The file is opened
+        # again and the sections are parsed again when they are accessed
+        state = self.__dict__.copy()
+        state["_mat"] = None
+        state["sections"] = None
+        if self.backend == "endftk":
+            state["_opened"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.sections = LazySections(self.build_section, self._section_files)
+
+    @property
+    def energy_groups(self):
+        if self._energy_grid is None:
+            energy_lines = self.section_lines(1, 451)
+            self._energy_grid = EnergyGroups.shared(energy_lines, engine=self.engine)
+        return self._energy_grid.with_limits(self.lower_limit, self.upper_limit)
+
+    def build_section(self, mt):
+        """Function to build the Section for a single MT value
+
+        Parameters
+        ----------
+        mt : int
+            the MT number of the section
+
+        Returns
+        -------
+        Section
+            the parsed section
+
+        """
+        if self.cache is not None:
+            section = self.cache.load_section(self._cache_key, mt, self.scratch_dir)
+            if section is not None:
+                # the stored matrix is checked again, as when it is parsed
+                section.validate(eigenvalues=False, policy=self.validation)
+                return section
+
+        mf = self._section_files[mt]
+        mean_lines = self.section_lines(mf, mt)
+        cov_lines = self.section_lines(mf + 30, mt)
+        section = Section(
+            self.energy_groups,
+            mean_lines,
+            cov_lines,
+            self.lower_limit,
+            self.upper_limit,
+            self.engine,
+            self.scratch_dir,
+            self.storage,
+            self.validation,
+        )
+        if self.cache is not None:
+            self.cache.store_section(self._cache_key, section)
+        return section
+
+    def update_cache(self, mts=None, eigenpairs=True):
+        """Function to store sections in the cache again, for example to
+        add their eigenpairs once they have been computed
+
+        Parameters
+        ----------
+        mts : list, optional, default is None
+            the MT numbers of the sections to store. If None, every section
+            that has been loaded is stored
+
+        eigenpairs : bool, optional, default is True
+            if True, the eigenpairs of the sections that have them are stored
+
+        Returns
+        -------
+        None
+
+        """
+        if self.cache is None:
+            raise ValueError("ErrorrOutput was opened without a cache")
+        if mts is None:
+            mts = self.sections.loaded
+        for mt in mts:
+            self.cache.store_section(self._cache_key, self.sections[mt], eigenpairs)
+        self.cache.evict(keep=(self._cache_key,))
+
+    def get_pca_realizations(
+        self,
+        num_samples,
+        k=None,
+        mts=None,
+        seed=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        max_workers=None,
+        output_dir=None,
+    ):
+        """Function to sample PCA realizations of many sections in parallel,
+        see pyerr.sample_sections
+
+        Parameters
+        ----------
+        num_samples : int
+            the number of samples of each section
+
+        k : int, optional, default is None
+            the number of eigenvalues to use. If None, will use
+            all of the eigenvalues of each covariance matrix
+
+        mts : list, optional, default is None
+            the MT numbers of the sections to sample. If None, all of
+            the sections are sampled
+
+        seed : int, np.random.SeedSequence or np.random.Generator, optional
+            root seed of the random streams, default is None for fresh entropy
+
+        chunk_size : int, optional, default is DEFAULT_CHUNK_SIZE
+            the number of samples in each work item
+
+        max_workers : int, optional, default is None
+            the number of worker processes. If None, os.cpu_count() is used
+
+        output_dir : str or Path, optional, default is None
+            if given, the realizations are written to .npy files in this
+            directory and returned as memory maps
+
+        Returns
+        -------
+        dictionary
+            2D array of shape (num_samples, num_groups) of realizations for
+            each MT number
+
+        """
+        if mts is None:
+            mts = list(self.sections)
+        sections = {mt: self.sections[mt] for mt in mts}
+        return sample_sections(sections, num_samples, k, seed, chunk_size, max_workers, output_dir)
+
+    def joint_covariance(self, mts=None):
+        """Function to assemble the joint covariance of several reactions,
+        including the covariance between them
+
+        The blocks between reactions are read from the subsections of each
+        covariance section. ENDF only stores each pair once, in the section of
+        the smaller MT number, and the other block is its transpose.
+
+        Parameters
+        ----------
+        mts : list, optional, default is None
+            the MT numbers of the reactions, which have to be cross sections
+            or nu-bar (MF=3). If None, all of them are used
+
+        Returns
+        -------
+        JointCovariance
+            the joint covariance
+
+        """
+        if mts is None:
+            mts = [mt for mt, mf in self._section_files.items() if mf == 3]
+        for mt in mts:
+            if self._section_files.get(mt) != 3:
+                raise ValueError(f"MT{mt} is not a cross section or nu-bar section (MF=3)")
+
+        energy = self.energy_groups
+
+        blocks = {}
+        for mt in mts:
+            cov_lines = self.section_lines(33, mt)
+            others = [mt1 for mt1 in mts if mt1 != mt]
+            section_blocks = Covariance.read_blocks(
+                cov_lines, energy.control.num_groups, energy.indices, others
+            )
+            for mt1, block in section_blocks.items():
+                blocks[(mt, mt1)] = block
+
+        return JointCovariance({mt: self.sections[mt] for mt in mts}, blocks)
+
+    def collapse(self, group_boundaries, flux=None, mts=None):
+        """Function to collapse many sections onto another group structure,
+        see Section.collapse. The sections share their energy grid, so the
+        collapse operator is only built once
+
+        Parameters
+        ----------
+        group_boundaries : np.array
+            ascending boundaries of the new groups, in eV
+
+        flux : np.array, optional, default is None
+            weighting flux integrated over each group of the sections. If
+            None, a flux that is flat in lethargy is used
+
+        mts : list, optional, default is None
+            the MT numbers of the sections to collapse. If None, all of
+            the sections are collapsed
+
+        Returns
+        -------
+        dictionary
+            the collapsed Section for each MT number
+
+        """
+        if mts is None:
+            mts = list(self.sections)
+        return {mt: self.sections[mt].collapse(group_boundaries, flux) for mt in mts}
+
+    def window(self, lower_limit=None, upper_limit=None):
+        """Function to get the output with other energy limits, without
+        parsing the file again
+
+        Each section of the new output is the window of the section of this
+        output, see Section.window, and is only created the first time it is
+        accessed. The limits are applied to all of the groups in the file.
+
+        Parameters
+        ----------
+        lower_limit : float, optional, default is None
+            the lower limit in energy (eV). If the lower limit falls within a
+            group, that group is kept. If None, there is no lower limit
+
+        upper_limit : float, optional, default is None
+            the upper limit in energy (eV). If the upper limit falls within a
+            group, that group is kept. If None, there is no upper limit
+
+        Returns
+        -------
+        ErrorrOutput
+            the output with the new limits, which shares the parsed file
+            and sections with this one
+
+        """
+        output = copy.copy(self)
+        output.lower_limit = lower_limit
+        output.upper_limit = upper_limit
+        if self.cache is not None:
+            output._cache_key = self.cache.key(
+                self.filename, lower_limit, upper_limit, self._requested_mat, self.validation
             )
 
+        def build_window(mt):
+            return self.sections[mt].window(lower_limit, upper_limit)
+
+        output.sections = LazySections(build_window, self._section_files)
+        return output
+
+    def validate(self, mts=None, eigenvalues=True, as_frame=True):
+        """Function to check the covariance matrices of many sections and
+        report the results in one table, see Section.validate
+
+        A section that fails to parse because of the "raise" validation
+        policy does not stop the others, its row is the report of the
+        CovarianceError instead.
+
+        Parameters
+        ----------
+        mts : list, optional, default is None
+            the MT numbers of the sections to check. If None, all of the
+            sections are checked
+
+        eigenvalues : bool, optional, default is True
+            if True, the eigenvalues are checked as well, which is O(n^3)
+
+        as_frame : bool, optional, default is True
+            if True, the reports are a pandas DataFrame with one row per MT
+            number, otherwise a dictionary of ValidationReport objects
+
+        Returns
+        -------
+        pandas DataFrame or dictionary
+            the report of each section
+
+        """
+        if mts is None:
+            mts = list(self.sections)
+        reports = {}
+        for mt in mts:
+            try:
+                section = self.sections[mt]
+            except CovarianceError as error:
+                reports[mt] = error.report
+                continue
+            reports[mt] = section.validate(eigenvalues)
+
+        if not as_frame:
+            return reports
+
+        import pandas as pd
+
+        table = pd.DataFrame([report.as_dict() for report in reports.values()])
+        table.index = pd.Index(list(reports), name="MT")
+        return table
+
+    def to_parquet(self, directory, mts=None, layout="sparse"):
+        """Function to write the sections to Parquet files, one section at
+        a time, see pyerr.export_parquet
+
+        Parameters
+        ----------
+        directory : str or Path
+            the directory to write "groups.parquet" and "covariance.parquet"
+            to, which is created if needed
+
+        mts : list, optional, default is None
+            the MT numbers of the sections to write. If None, all of the
+            sections are written
+
+        layout : str, optional, default is "sparse"
+            layout of the covariance table, "sparse" for one row per nonzero
+            value of the upper triangle or "packed" for one row per matrix
+            row
+
+        Returns
+        -------
+        dictionary
+            the file names of the "groups" and "covariance" tables
+
+        """
+        from pyerr._export import export_parquet
+
+        return export_parquet([self], directory, mts, layout)
+
+    def section_lines(self, mf, mt):
+        """Function to get the lines of a section of the file, opening the
+        file first if it is not open yet
+
+        Parameters
+        ----------
+        mf : int
+            the MF number
+
+        mt : int
+            the MT number
+
+        Returns
+        -------
+        list
+            the lines of the section, including the SEND line
+
+        """
+        if not self._opened:
+            self.open_errorr_file()
+        if self.backend == "native":
+            return self._tape.lines(self.mat, mf, mt)
+        return self._mat.file(mf).section(mt).content.split("\n")
+
     def open_errorr_file(self):
-        """Function to parse the ERRORR file with ENDFtk"""
-        tape = ENDFtk.tree.Tape.from_file(str(self.filename))
-        mat_num = tape.material_numbers[0]
-        self._mat = tape.material(mat_num)
+        """Function to index the ERRORR file with the backend
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        list
+            (MF, MT) of each section with mean values and a covariance
+
+        """
+        if self.backend in ("auto", "native") and self._tape is None:
+            try:
+                self._tape = TapeIndex.open(self.filename, self.index_file)
+            except ValueError:
+                if self.backend == "native":
+                    raise
+
+        if self._tape is not None and self.backend != "endftk":
+            self.backend = "native"
+            material_numbers = self._tape.material_numbers
+        else:
+            import ENDFtk
+
+            tape = ENDFtk.tree.Tape.from_file(str(self.filename))
+            self.backend = "endftk"
+            material_numbers = list(tape.material_numbers)
 
-        list_of_mfs = self._mat.file_numbers.to_list()
+        if self._requested_mat is None:
+            self.mat = material_numbers[0]
+        elif self._requested_mat not in material_numbers:
+            raise ValueError(f"MAT{self._requested_mat} is not on {self.filename}")
+
+        if self.backend == "native":
+            list_of_mfs = self._tape.file_numbers(self.mat)
+            file_sections = {mf: self._tape.section_numbers(self.mat, mf) for mf in (3, 5)}
+        else:
+            self._mat = tape.material(self.mat)
+            list_of_mfs = self._mat.file_numbers.to_list()
+            file_sections = {
+                mf: list(self._mat.file(mf).section_numbers) for mf in (3, 5) if mf in list_of_mfs
+            }
+
+        self._opened = True
 
         # check that File 1 is there
         assert 1 in list_of_mfs
@@ -66,11 +600,165 @@ class ErrorrOutput:
         section_numbers = []
 
         if 3 in list_of_mfs:
-            for mt in self._mat.file(3).section_numbers:
+            for mt in file_sections[3]:
                 section_numbers.append((3, mt))
 
         if 5 in list_of_mfs:
-            for mt in self._mat.file(5).section_numbers:
+            for mt in file_sections[5]:
                 section_numbers.append((5, mt))
 
         return section_numbers
+
+
+class ErrorrTape:
+    """
+    Class to hold an ERRORR output tape with one or more materials, for
+    example the outputs of many ERRORR runs concatenated into one file
+
+    The tape is indexed once, with a side-car index file by default, and
+    all of the materials share the index and the memory map of the tape.
+    The ErrorrOutput of each material is only created the first time it
+    is accessed. With the "auto" backend, a tape that the native indexer
+    rejects is read with ENDFtk instead, one material at a time.
+
+    Parameters
+    ----------
+    filename : str
+        the tape file name
+
+    index_file : str, Path or bool, optional, default is True
+        side-car index file of the section offsets, see TapeIndex.open. If
+        True, it is next to the tape, and if None or False, none is used
+
+    preload : list or bool, optional, default is None
+        MAT numbers of the materials to open right away. If True, every
+        material is opened right away
+
+    **options
+        other arguments of ErrorrOutput, such as lower_limit, upper_limit,
+        engine, cache, scratch_dir, storage and backend, used for every
+        material
+
+    Attributes
+    ----------
+    filename : str
+        the tape file name
+
+    index : TapeIndex
+        the offsets of the sections on the tape, or None if the tape is read
+        with ENDFtk
+
+    material_numbers : list
+        the MAT numbers on the tape, in order
+
+    materials : LazySections
+        Read-only dictionary of ErrorrOutput classes, one for each MAT
+        number, that opens each material on first access
+
+    Methods
+    -------
+    open_material
+        Function to open a single material of the tape
+
+    to_parquet
+        Function to write the sections of the materials to Parquet files
+
+    """
+
+    def __init__(self, filename, index_file=True, preload=None, **options):
+        backend = options.get("backend", "auto")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', must be one of {BACKENDS}")
+        self.filename = filename
+        self.index = None
+        self._material_numbers = None
+        if backend != "endftk":
+            try:
+                self.index = TapeIndex.open(filename, index_file)
+            except ValueError:
+                if backend == "native":
+                    raise
+        if self.index is None:
+            import ENDFtk
+
+            tape = ENDFtk.tree.Tape.from_file(str(filename))
+            self._material_numbers = list(tape.material_numbers)
+        self._options = options
+        self.materials = LazySections(self.open_material, self.material_numbers, preload)
+
+    def __getstate__(self):
+        # the materials are opened again when they are accessed
+        state = self.__dict__.copy()
+        state["materials"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.materials = LazySections(self.open_material, self.material_numbers)
+
+    def __repr__(self):
+        return f"ErrorrTape({str(self.filename)!r}, materials={self.material_numbers})"
+
+    def __getitem__(self, mat):
+        return self.materials[mat]
+
+    @property
+    def material_numbers(self):
+        if self.index is None:
+            return self._material_numbers
+        return self.index.material_numbers
+
+    def open_material(self, mat):
+        """Function to open a single material of the tape
+
+        Parameters
+        ----------
+        mat : int
+            the MAT number
+
+        Returns
+        -------
+        ErrorrOutput
+            the output of the material
+
+        """
+        if self.index is None:
+            options = dict(self._options, backend="endftk")
+            return ErrorrOutput(self.filename, mat=mat, **options)
+        return ErrorrOutput(self.index, mat=mat, **self._options)
+
+    def to_parquet(self, directory, mats=None, mts=None, layout="sparse"):
+        """Function to write the sections of the materials to Parquet files,
+        one section at a time, see pyerr.export_parquet. The row groups of
+        the files are split by material
+
+        Parameters
+        ----------
+        directory : str or Path
+            the directory to write "groups.parquet" and "covariance.parquet"
+            to, which is created if needed
+
+        mats : list, optional, default is None
+            the MAT numbers of the materials to write. If None, all of the
+            materials are written
+
+        mts : list, optional, default is None
+            the MT numbers of the sections to write. If None, all of the
+            sections are written
+
+        layout : str, optional, default is "sparse"
+            layout of the covariance table, "sparse" for one row per nonzero
+            value of the upper triangle or "packed" for one row per matrix
+            row
+
+        Returns
+        -------
+        dictionary
+            the file names of the "groups" and "covariance" tables
+
+        """
+        from pyerr._export import export_parquet
+
+        if mats is None:
+            mats = self.material_numbers
+        return export_parquet((self.materials[mat] for mat in mats), directory, mts, layout)
@@ -0,0 +1,108 @@
+import os
+import pytest
+import multiprocessing
+import pandas as pd
+from pathlib import Path
+from pyerr import _batch
+from pyerr._batch import find_tapes, process_tape, process_tapes, main
+from pyerr._tape import INDEX_SUFFIX
+
+
+@pytest.fixture
+def tapes(tmp_path):
+    files = Path(__file__).parent / "files"
+    for name in ("nubar_example.txt", "u235_endf81_30.txt"):
+        (tmp_path / name).write_bytes((files / name).read_bytes())
+    return tmp_path
+
+
+def test_find_tapes(tapes):
+    (tapes / ("nubar_example.txt" + INDEX_SUFFIX)).write_text("{}")
+    assert find_tapes([tapes / "*.txt*"]) == [
+        str(tapes / "nubar_example.txt"),
+        str(tapes / "u235_endf81_30.txt"),
+    ]
+
+    manifest = tapes / "manifest.txt"
+    manifest.write_text("# nightly\nu235_endf81_30.txt\n\nmissing.txt\n")
+    assert find_tapes([tapes / "u235*"], manifest) == [
+        str(tapes / "u235_endf81_30.txt"),
+        str(tapes / "missing.txt"),
+    ]
+
+
+def test_process_tape(tapes):
+    rows, timing = process_tape(tapes / "nubar_example.txt", eigenvalues=True)
+    assert [row["MT"] for row in rows] == [452, 455, 456]
+    assert all(row["MAT"] == 9237 and row["MF"] == 3 for row in rows)
+    assert all(row["num_negative_eigenvalues"] is not None for row in rows)
+    assert timing["num_sections"] == 3
+    assert timing["error"] is None
+
+    # a section that fails validation does not stop the tape
+    rows, timing = process_tape(tapes / "u235_endf81_30.txt")
+    failed = [row for row in rows if not row["ok"]]
+    assert timing["num_failed_sections"] == len(failed) > 0
+    assert all(row["num_bad_diagonal"] > 0 for row in failed)
+
+    rows, timing = process_tape(tapes / "u235_endf81_30.txt", validation="clip")
+    assert all(row["repairs"] for row in rows if not row["ok"])
+
+    rows, timing = process_tape(tapes / "missing.txt")
+    assert rows == []
+    assert timing["error"].startswith("FileNotFoundError")
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_process_tapes(tapes, max_workers):
+    filenames = find_tapes([tapes / "*.txt", tapes / "missing.txt"])
+    output = tapes / "sections.parquet"
+    timings = process_tapes(filenames, output, max_workers=max_workers, index_file=False)
+    assert list(timings["filename"]) == filenames
+    assert timings["error"].isna().tolist() == [True, True, False]
+
+    sections = pd.read_parquet(output)
+    assert len(sections) == timings["num_sections"].sum()
+    nubar = sections[sections["filename"] == filenames[0]]
+    assert list(nubar["MT"]) == [452, 455, 456]
+    assert nubar["ok"].all()
+
+
+def test_process_tape_backend(tapes):
+    native, _ = process_tape(tapes / "nubar_example.txt", index_file=False)
+    rows, timing = process_tape(tapes / "nubar_example.txt", backend="endftk")
+    assert timing["error"] is None
+    assert [row["MT"] for row in rows] == [row["MT"] for row in native]
+    assert [row["max_uncertainty"] for row in rows] == [row["max_uncertainty"] for row in native]
+
+
+class CrashingTape(_batch.ErrorrTape):
+    def __init__(self, filename, *args, **options):
+        if "nubar" in str(filename):
+            os._exit(1)
+        super().__init__(filename, *args, **options)
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="the workers only see the patched class when they are forked",
+)
+def test_process_tapes_worker_dies(tapes, monkeypatch):
+    monkeypatch.setattr(_batch, "ErrorrTape", CrashingTape)
+    filenames = find_tapes([tapes / "u235_endf81_30.txt", tapes / "*.txt"])
+    output = tapes / "sections.parquet"
+    timings = process_tapes(filenames, output, max_workers=2, index_file=False)
+    assert list(timings["filename"]) == filenames
+    assert timings["error"].isna().tolist() == [True, False]
+    assert timings.loc[1, "error"].startswith("BrokenProcessPool")
+    assert len(pd.read_parquet(output)) == timings.loc[0, "num_sections"] > 0
+
+
+def test_main(tapes, capsys):
+    output = tapes / "sections.parquet"
+    timings = tapes / "timings.csv"
+    status = main([str(tapes / "*.txt"), "-o", str(output), "-t", str(timings), "-j", "1"])
+    assert status == 0
+    assert "2 tapes" in capsys.readouterr().out
+    assert len(pd.read_csv(timings)) == 2
+    assert main([str(tapes / "missing.txt"), "-o", str(output), "-j", "1"]) == 1
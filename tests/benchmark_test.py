@@ -0,0 +1,37 @@
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+BENCHMARKS = Path(__file__).parent.parent / "benchmarks"
+
+
+def run_script(*args):
+    return subprocess.run(
+        [sys.executable, str(BENCHMARKS / "run.py"), *args], capture_output=True, text=True
+    )
+
+
+def test_benchmark_suite(tmp_path):
+    output = tmp_path / "results.json"
+    result = run_script("--groups", "30", "--repeat", "1", "--output", str(output))
+    assert result.returncode == 0, result.stderr
+    results = json.loads(output.read_text())
+    assert results["metadata"]["pyerr_version"]
+    assert {r["benchmark"] for r in results["results"]} == {
+        "parse_covariance",
+        "section",
+        "get_eigenvalues",
+        "quantify_uncertainty_convergence",
+        "get_pca_realizations",
+    }
+    assert all(r["num_groups"] == 30 and r["peak_memory_bytes"] > 0 for r in results["results"])
+
+    assert run_script("--compare", str(output), str(output)).returncode == 0
+
+    # a benchmark that got twice as slow is a regression
+    for r in results["results"]:
+        r["median_seconds"] *= 2
+    slower = tmp_path / "slower.json"
+    slower.write_text(json.dumps(results))
+    assert run_script("--compare", str(output), str(slower)).returncode == 1
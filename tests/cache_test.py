@@ -0,0 +1,112 @@
+import os
+import pytest
+import numpy as np
+from pathlib import Path
+from pyerr import ErrorrOutput, SectionCache
+
+
+@pytest.fixture
+def nubar_test_file():
+    filename = Path(__file__).parent / "files" / "nubar_example.txt"
+    return filename
+
+
+@pytest.fixture
+def pfns_test_file():
+    filename = Path(__file__).parent / "files" / "u235_endf71.txt"
+    return filename
+
+
+def no_tape(self):
+    raise AssertionError("the file should not be read")
+
+
+def test_roundtrip(nubar_test_file, tmp_path, monkeypatch):
+    reference = ErrorrOutput(nubar_test_file, cache=tmp_path)
+    reference.sections.load(reference.sections)
+
+    monkeypatch.setattr(ErrorrOutput, "open_errorr_file", no_tape)
+    obj = ErrorrOutput(nubar_test_file, cache=tmp_path)
+    assert list(obj.sections) == list(reference.sections)
+    for mt in obj.sections:
+        section = obj.sections[mt]
+        assert isinstance(section.covariance_matrix, np.memmap)
+        assert section.MAT == reference.sections[mt].MAT
+        assert section.MF == reference.sections[mt].MF
+        assert section.MT == mt
+        assert np.array_equal(section.group_boundaries, reference.sections[mt].group_boundaries)
+        assert np.array_equal(section.mean_values, reference.sections[mt].mean_values)
+        assert np.array_equal(section.covariance_matrix, reference.sections[mt].covariance_matrix)
+        assert np.allclose(section.uncertainty, reference.sections[mt].uncertainty)
+
+
+def test_partial_entry(nubar_test_file, tmp_path):
+    first = ErrorrOutput(nubar_test_file, cache=tmp_path)
+    first.sections[452]
+
+    # sections that are not in the cache yet are parsed from the file
+    obj = ErrorrOutput(nubar_test_file, cache=tmp_path)
+    assert np.array_equal(obj.sections[456].mean_values, first.sections[456].mean_values)
+    assert obj.backend == "native"
+
+
+def test_limits(nubar_test_file, tmp_path):
+    cache = SectionCache(tmp_path)
+    assert cache.key(nubar_test_file) != cache.key(nubar_test_file, lower_limit=1e5)
+    obj = ErrorrOutput(nubar_test_file, lower_limit=1e5, cache=cache)
+    full = ErrorrOutput(nubar_test_file, cache=cache)
+    assert obj.sections[452].num_groups < full.sections[452].num_groups
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_eigenpairs(nubar_test_file, tmp_path, monkeypatch):
+    reference = ErrorrOutput(nubar_test_file, cache=tmp_path)
+    reference.sections[452].get_eigenvalues(k=5)
+    reference.update_cache()
+
+    monkeypatch.setattr(ErrorrOutput, "open_errorr_file", no_tape)
+    section = ErrorrOutput(nubar_test_file, cache=tmp_path).sections[452]
+    assert "eig_vals" in section.__dict__
+    assert np.array_equal(section.eig_vals, reference.sections[452].eig_vals)
+    assert np.array_equal(section.eig_vects, reference.sections[452].eig_vects)
+    assert section.eig_info["num_eigenpairs"] == 5
+
+
+def test_pfns(pfns_test_file, tmp_path, monkeypatch):
+    reference = ErrorrOutput(pfns_test_file, cache=tmp_path).sections[18]
+
+    monkeypatch.setattr(ErrorrOutput, "open_errorr_file", no_tape)
+    section = ErrorrOutput(pfns_test_file, cache=tmp_path).sections[18]
+    assert section.MF == 5
+    assert section.incident_energy == reference.incident_energy
+    assert np.isclose(section.average_energy, reference.average_energy)
+
+
+def test_evict(nubar_test_file, tmp_path):
+    cache = SectionCache(tmp_path)
+    ErrorrOutput(nubar_test_file, cache=cache).sections[452]
+    first = cache.key(nubar_test_file)
+    os.utime(tmp_path / first / "index.json", (0, 0))
+
+    # a limit smaller than both entries only keeps the newest one
+    cache.max_bytes = cache.size() - 1
+    ErrorrOutput(nubar_test_file, lower_limit=1e5, cache=cache).sections[452]
+    assert os.listdir(tmp_path) == [cache.key(nubar_test_file, lower_limit=1e5)]
+
+    cache.clear()
+    assert cache.size() == 0
+
+
+def test_evict_once_per_file(pfns_test_file, tmp_path, monkeypatch):
+    cache = SectionCache(tmp_path)
+    calls = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda keep=(): calls.append(keep) or evict(keep))
+
+    # the cache directory is scanned when the index is stored, not per section
+    obj = ErrorrOutput(pfns_test_file, cache=cache)
+    obj.sections.load(obj.sections)
+    assert calls == [(cache.key(pfns_test_file),)]
+
+    obj.update_cache()
+    assert len(calls) == 2
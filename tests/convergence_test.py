@@ -30,3 +30,66 @@ def test_convergence_table(u235_endf81):
     print(pfns.unc_convergence_table.head())
     assert pfns.unc_convergence_table.abs_ind.iloc[0] == 1
     assert pfns.unc_convergence_table.rel_ind.iloc[4] == 0
+
+
+@pytest.fixture
+def nubar_test_file():
+    filename = Path(__file__).parent / "files" / "nubar_example.txt"
+    return filename
+
+
+def reference_table(section):
+    # the diagonal of each reconstructed covariance matrix, one k at a time
+    data = []
+    for k in range(1, len(section.eig_vals) + 1):
+        unc = np.sqrt(np.diag(section.reconstruct_covariance(k))) / section.mean_values
+        rel_diff = (section.uncertainty - unc) / section.uncertainty
+        data.append([k, np.max(rel_diff), np.argmax(rel_diff)])
+    return np.array(data)
+
+
+def test_convergence_matches_reconstruction(nubar_test_file):
+    obj = ErrorrOutput(nubar_test_file)
+    nubar = obj.sections[452]
+    table = nubar.quantify_uncertainty_convergence()
+    reference = reference_table(nubar)
+    assert np.array_equal(table.k, reference[:, 0])
+    assert np.allclose(table.rel_diff, reference[:, 1])
+    assert np.array_equal(table.rel_ind, reference[:, 2])
+
+
+def test_convergence_options(nubar_test_file):
+    obj = ErrorrOutput(nubar_test_file)
+    nubar = obj.sections[452]
+    full = nubar.quantify_uncertainty_convergence()
+
+    table = nubar.quantify_uncertainty_convergence(k_values=[2, 5, 100], as_frame=False)
+    assert table is nubar.unc_convergence_table
+    assert np.array_equal(table["k"], [2, 5, 30])
+    assert np.allclose(table["rel_diff"], full.rel_diff.iloc[[1, 4, 29]])
+
+    tol = full.rel_diff.iloc[3]
+    table = nubar.quantify_uncertainty_convergence(tol=tol)
+    assert table.k.iloc[-1] == np.argmax(full.rel_diff <= tol) + 1
+    assert table.rel_diff.iloc[-1] <= tol
+
+
+def test_convergence_tolerance_at_block_end():
+    from pyerr import Section
+    from pyerr._section import CONVERGENCE_BLOCK
+
+    rng = np.random.default_rng(6)
+    num_groups = 600
+    factor = rng.normal(size=(num_groups, num_groups)) / num_groups
+    covariance = factor @ factor.T
+    section = Section.from_arrays(
+        9228, 33, 452, np.geomspace(1e-5, 2e7, num_groups + 1), np.ones(num_groups), covariance
+    )
+    full = section.quantify_uncertainty_convergence()
+
+    # the tolerance is first met at the last k of the first block
+    tol = full.rel_diff.iloc[CONVERGENCE_BLOCK - 1]
+    assert full.rel_diff.iloc[CONVERGENCE_BLOCK - 2] > tol
+    table = section.quantify_uncertainty_convergence(tol=tol)
+    assert len(table) == CONVERGENCE_BLOCK
+    assert table.k.iloc[-1] == CONVERGENCE_BLOCK
@@ -34,3 +34,105 @@ def test_u235_endf81(u235_endf81, u235_endf81_matrix):
     obj = Covariance(u235_endf81, 640, (0, 640))
     assert obj.matrix[0, 0] == 4.237122e-2
     assert np.array_equal(u235_endf81_matrix, obj.matrix)
+
+
+@pytest.fixture
+def nubar_452():
+    filename = Path(__file__).parent / "files" / "nubar_example.txt"
+    tape = ENDFtk.tree.Tape.from_file(str(filename))
+    mat_num = tape.material_numbers[0]
+    mat = tape.material(mat_num)
+    file33 = mat.file(33)
+    lines = file33.section(452).content.split("\n")
+    return lines
+
+
+@pytest.fixture
+def nubar_452_matrix():
+    filename = Path(__file__).parent / "files" / "nubar_example_matrix.npy"
+    return np.load(filename)
+
+
+def test_nubar_records(nubar_452, nubar_452_matrix):
+    obj = Covariance(nubar_452, 30, (0, 30))
+    # only the first of the three subsections is read
+    assert len(obj.records) == 30
+    assert np.array_equal(obj.records["row"], np.arange(30))
+    assert np.all(obj.records["column"] == 0)
+    assert np.all(obj.records["length"] == 30)
+    assert obj.records["offset"][1] == 6 * (1 + 5 + 1)
+    assert np.array_equal(obj.matrix, nubar_452_matrix)
+
+
+def test_nubar_engines(nubar_452):
+    obj = Covariance(nubar_452, 30, (0, 30))
+    reference = Covariance(nubar_452, 30, (0, 30), engine="fortranformat")
+    assert np.array_equal(reference.matrix, obj.matrix)
+
+
+@pytest.mark.parametrize("engine", ["numpy", "fortranformat"])
+def test_nubar_packed(nubar_452, nubar_452_matrix, engine):
+    obj = Covariance(nubar_452, 30, (0, 30), engine=engine, storage="packed")
+    assert obj.matrix.nbytes == 30 * 31 // 2 * 8
+    assert np.array_equal(np.asarray(obj.matrix), nubar_452_matrix)
+
+    window = Covariance(nubar_452, 30, (5, 20), storage="packed")
+    assert np.array_equal(np.asarray(window.matrix), nubar_452_matrix[5:20, 5:20])
+
+    with pytest.raises(ValueError):
+        Covariance(nubar_452, 30, (0, 30), storage="triangle")
+
+
+@pytest.mark.parametrize("engine", ["numpy", "fortranformat"])
+def test_nubar_sparse(nubar_452, nubar_452_matrix, engine):
+    obj = Covariance(nubar_452, 30, (0, 30), engine=engine, storage="sparse")
+    assert obj.matrix.nnz == np.count_nonzero(nubar_452_matrix)
+    assert np.array_equal(np.asarray(obj.matrix), nubar_452_matrix)
+
+    window = Covariance(nubar_452, 30, (5, 20), storage="sparse")
+    assert np.array_equal(np.asarray(window.matrix), nubar_452_matrix[5:20, 5:20])
+
+
+def set_value(lines, row, column, text):
+    # the control line of each row is followed by five lines of six values
+    lines = list(lines)
+    number = 2 + 6 * row + 1 + column // 6
+    start = 11 * (column % 6)
+    lines[number] = lines[number][:start] + text + lines[number][start + 11 :]
+    return lines
+
+
+@pytest.mark.parametrize("row, column", [(2, 10), (12, 3)])
+def test_nubar_asymmetry(nubar_452, row, column):
+    from pyerr._validation import CovarianceWarning
+
+    lines = set_value(nubar_452, row, column, " 9.999999-1")
+    reports = {}
+    for storage in ("dense", "packed", "sparse"):
+        with pytest.warns(CovarianceWarning):
+            obj = Covariance(lines, 30, (0, 30), storage=storage, validation="warn")
+        reports[storage] = obj.report
+        assert obj.report.max_asymmetry > 0
+
+        # the asymmetric pair is outside of the window
+        assert Covariance(lines, 30, (15, 30), storage=storage).report.ok
+    assert reports["packed"].max_asymmetry == reports["dense"].max_asymmetry
+    assert reports["sparse"].max_asymmetry == reports["dense"].max_asymmetry
+
+
+def test_nubar_blocks(nubar_452, nubar_452_matrix):
+    obj = CovarianceControl(nubar_452[:2])
+    assert obj.num_subsections == 3
+    blocks = Covariance.read_blocks(nubar_452, 30, (0, 30))
+    assert list(blocks) == [452, 455, 456]
+    assert np.array_equal(blocks[452], nubar_452_matrix)
+    assert blocks[455].shape == (30, 30)
+    assert np.count_nonzero(blocks[456]) == 900
+
+    window = Covariance.read_blocks(nubar_452, 30, (5, 20))
+    assert np.array_equal(window[456], blocks[456][5:20, 5:20])
+    assert window[456].base is None
+
+    # only the requested blocks are built
+    assert list(Covariance.read_blocks(nubar_452, 30, (0, 30), [455, 456])) == [455, 456]
+    assert Covariance.read_blocks(nubar_452, 30, (0, 30), []) == {}
@@ -22,3 +22,20 @@ def test_u235_endf81(u235_endf81):
     assert obj.group_boundaries[0] == 0.000139
     assert obj.num_boundaries == obj.num_groups + 1
     assert obj.temperature == 293.6
+
+
+def test_shared(u235_endf81):
+    obj = EnergyGroups.shared(u235_endf81)
+    assert EnergyGroups.shared(list(u235_endf81)) is obj
+    assert obj.num_groups == 30
+    with pytest.raises(ValueError):
+        obj.group_boundaries[0] = 1.0
+
+    # the energy groups for each pair of limits are memoized
+    limited = EnergyGroups.shared(u235_endf81, 1e2, 1e5)
+    assert limited is obj.with_limits(1e2, 1e5)
+    assert limited.values is obj.values
+    assert limited.indices == EnergyGroups(u235_endf81, 1e2, 1e5).indices
+    assert obj.indices == (0, 30)
+
+    assert EnergyGroups.shared(u235_endf81, engine="fortranformat") is not obj
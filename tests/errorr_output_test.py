@@ -1,8 +1,11 @@
+import os
+import pickle
 import pytest
 import numpy as np
 import ENDFtk
 from pathlib import Path
-from pyerr import ErrorrOutput
+from pyerr import errorr, ErrorrOutput, ErrorrTape
+from pyerr._validation import CovarianceError
 
 
 @pytest.fixture
@@ -40,8 +43,28 @@ def test_nubar(nubar_test_file, nubar_452_matrix):
 
 
 def test_U235_wrong_grouping(u235_endf81_30):
-    with pytest.raises(SystemExit):
-        ErrorrOutput(u235_endf81_30)
+    obj = ErrorrOutput(u235_endf81_30)
+    with pytest.raises(CovarianceError) as error:
+        obj.sections[18]
+    assert len(error.value.report.bad_diagonal) > 0
+
+
+def test_lazy_sections(nubar_test_file):
+    obj = ErrorrOutput(nubar_test_file)
+    assert list(obj.sections) == [452, 455, 456]
+    assert obj.sections.loaded == ()
+    section = obj.sections[455]
+    assert obj.sections.loaded == (455,)
+    assert obj.sections[455] is section
+    with pytest.raises(KeyError):
+        obj.sections[18]
+
+
+def test_preload(nubar_test_file):
+    obj = ErrorrOutput(nubar_test_file, preload=[452, 456])
+    assert obj.sections.loaded == (452, 456)
+    obj = ErrorrOutput(nubar_test_file, preload=True)
+    assert obj.sections.loaded == (452, 455, 456)
 
 
 def test_U235(u235_endf81):
@@ -65,3 +88,213 @@ def test_energy_boundaries(u235_endf81):
     # check bounds outside the region - should just default to the whole region
     obj = ErrorrOutput(u235_endf81, lower_limit=-10, upper_limit=5e7)
     assert len(obj.sections[18].group_boundaries) == 641
+
+
+def test_pca_realizations(nubar_test_file):
+    obj = ErrorrOutput(nubar_test_file)
+    samples = obj.get_pca_realizations(100, k=5, mts=[452, 456], seed=1, max_workers=1)
+    assert list(samples) == [452, 456]
+    assert samples[452].shape == (100, 30)
+    assert obj.sections.loaded == (452, 456)
+
+
+def test_scratch_dir(nubar_test_file, tmp_path):
+    obj = ErrorrOutput(nubar_test_file, scratch_dir=tmp_path)
+    assert isinstance(obj.sections[452].covariance_matrix, np.memmap)
+    assert isinstance(obj.sections[452].abs_covariance_matrix, np.memmap)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_collapse(nubar_test_file):
+    obj = ErrorrOutput(nubar_test_file)
+    boundaries = obj.sections[452].group_boundaries[::10]
+    collapsed = obj.collapse(boundaries, mts=[452, 456])
+    assert list(collapsed) == [452, 456]
+    assert collapsed[456].num_groups == 3
+    assert np.allclose(
+        collapsed[452].mean_values, obj.sections[452].collapse(boundaries).mean_values
+    )
+
+
+def test_window(nubar_test_file):
+    obj = ErrorrOutput(nubar_test_file, upper_limit=1e6)
+    window = obj.window(1e2, 1e5)
+    reference = ErrorrOutput(nubar_test_file, lower_limit=1e2, upper_limit=1e5)
+    assert window.sections.loaded == ()
+    assert np.array_equal(
+        window.sections[455].covariance_matrix, reference.sections[455].covariance_matrix
+    )
+    assert obj.sections.loaded == (455,)
+    assert window.upper_limit == 1e5
+    assert obj.upper_limit == 1e6
+
+
+def test_shared_energy_groups(nubar_test_file):
+    obj = ErrorrOutput(nubar_test_file, lower_limit=1e2)
+    assert obj.sections[452]._energy is obj.sections[456]._energy
+    assert obj.sections[452]._energy is obj.energy_groups
+    assert obj.window(1e3).energy_groups.values is obj.energy_groups.values
+
+
+def test_backends(nubar_test_file):
+    native = ErrorrOutput(nubar_test_file, backend="native")
+    endftk = ErrorrOutput(nubar_test_file, backend="endftk")
+    assert native.backend == "native"
+    assert endftk.backend == "endftk"
+    assert list(native.sections) == list(endftk.sections)
+    for mt in native.sections:
+        assert np.array_equal(
+            native.sections[mt].covariance_matrix, endftk.sections[mt].covariance_matrix
+        )
+    with pytest.raises(ValueError):
+        ErrorrOutput(nubar_test_file, backend="text")
+
+
+def test_tape(tmp_path):
+    files = Path(__file__).parent / "files"
+    filename = tmp_path / "tape30"
+    filename.write_bytes(
+        (files / "nubar_example.txt").read_bytes() + (files / "u235_endf71.txt").read_bytes()
+    )
+    tape = ErrorrTape(filename, upper_limit=1e6)
+    assert tape.material_numbers == [9237, 9228]
+    assert tape.materials.loaded == ()
+    assert list(tape[9228].sections) == [18]
+    assert tape[9228].mat == 9228
+    assert tape[9237].sections[452].group_boundaries[-1] >= 1e6
+    assert tape[9237].upper_limit == 1e6
+    assert tape[9228]._tape is tape.index
+
+    # a single material of the tape, with the first one by default
+    obj = ErrorrOutput(filename, upper_limit=1e6, mat=9228, index_file=True)
+    assert np.array_equal(obj.sections[18].mean_values, tape[9228].sections[18].mean_values)
+    assert ErrorrOutput(filename).mat == 9237
+    with pytest.raises(ValueError):
+        ErrorrOutput(filename, mat=9999)
+
+    # the materials of a tape have their own cache entries
+    cache = tmp_path / "cache"
+    first = ErrorrOutput(filename, mat=9237, cache=cache)
+    second = ErrorrOutput(filename, mat=9228, cache=cache)
+    assert first._cache_key != second._cache_key
+    assert list(ErrorrOutput(filename, mat=9228, cache=cache).sections) == [18]
+
+
+def test_tape_backends(nubar_test_file, monkeypatch):
+    tape = ErrorrTape(nubar_test_file, index_file=False, backend="endftk")
+    assert tape.index is None
+    assert tape.material_numbers == [9237]
+    assert tape[9237].backend == "endftk"
+    assert list(tape[9237].sections) == [452, 455, 456]
+    assert pickle.loads(pickle.dumps(tape)).material_numbers == [9237]
+
+    # tapes that the native indexer rejects are read with ENDFtk
+    def reject(filename, index_file=None):
+        raise ValueError("not a tape")
+
+    monkeypatch.setattr(errorr.TapeIndex, "open", reject)
+    tape = ErrorrTape(nubar_test_file, index_file=False)
+    assert tape.index is None
+    assert tape[9237].backend == "endftk"
+    with pytest.raises(ValueError):
+        ErrorrTape(nubar_test_file, index_file=False, backend="native")
+    with pytest.raises(ValueError):
+        ErrorrTape(nubar_test_file, backend="text")
+
+
+def test_validation(u235_endf81_30, nubar_test_file):
+    obj = ErrorrOutput(u235_endf81_30, validation="clip")
+    report = obj.sections[18].validation_report
+    assert len(report.bad_diagonal) > 0
+    assert len(report.repairs) > 0
+    assert np.all(obj.sections[18].covariance_matrix[report.bad_diagonal] == 0)
+
+    with pytest.warns(UserWarning):
+        ErrorrOutput(u235_endf81_30, validation="warn").sections[18]
+
+    # a section that fails to parse is reported without stopping the others
+    table = ErrorrOutput(u235_endf81_30).validate(eigenvalues=False)
+    assert table.index.name == "MT"
+    assert not table.loc[18, "ok"]
+    assert table.loc[18, "num_bad_diagonal"] > 0
+
+    reports = ErrorrOutput(nubar_test_file).validate(as_frame=False)
+    assert list(reports) == [452, 455, 456]
+    assert all(report.num_negative_eigenvalues is not None for report in reports.values())
+
+
+def test_validation_cache(u235_endf81_30, tmp_path):
+    with pytest.warns(UserWarning):
+        ErrorrOutput(u235_endf81_30, cache=tmp_path, validation="warn").sections[18]
+
+    # the unrepaired matrix stored with "warn" is not used with other policies
+    with pytest.raises(CovarianceError):
+        ErrorrOutput(u235_endf81_30, cache=tmp_path).sections[18]
+    for _ in range(2):
+        section = ErrorrOutput(u235_endf81_30, cache=tmp_path, validation="clip").sections[18]
+        assert len(section.validation_report.repairs) > 0
+        assert np.all(section.covariance_matrix[section.validation_report.bad_diagonal] == 0)
+    with pytest.warns(UserWarning):
+        section = ErrorrOutput(u235_endf81_30, cache=tmp_path, validation="warn").sections[18]
+    assert isinstance(section.covariance_matrix, np.memmap)
+    assert not section.validation_report.ok
+
+
+def test_validation_window(u235_endf81_30):
+    # the bad groups are above 7.79 MeV
+    obj = ErrorrOutput(u235_endf81_30, upper_limit=5e6)
+    assert obj.sections[18].validation_report.ok
+    assert obj.sections[18].window(1e3, 1e6).validation_report.ok
+    with pytest.raises(CovarianceError):
+        obj.sections[18].window()
+    with pytest.raises(CovarianceError):
+        obj.window().sections[18]
+
+    obj = ErrorrOutput(u235_endf81_30, upper_limit=5e6, validation="clip")
+    window = obj.window().sections[18]
+    assert window.num_groups == 30
+    assert window.validation_report.bad_diagonal.tolist() == [25, 26, 27, 28]
+    assert len(window.validation_report.repairs) > 0
+    assert np.all(window.covariance_matrix[25:29] == 0)
+
+    # a window inside of the repaired one gets its repaired matrix
+    inside = window.window(5e6)
+    assert inside.validation_report is window.validation_report
+    assert np.all(inside.covariance_matrix[-5:-1] == 0)
+
+
+@pytest.mark.parametrize("storage", ["dense", "packed", "sparse"])
+def test_validation_repaired_full_matrix(u235_endf81_30, storage):
+    # the section has the bad groups, and wider windows keep its repairs
+    obj = ErrorrOutput(u235_endf81_30, lower_limit=5e6, validation="clip", storage=storage)
+    section = obj.sections[18]
+    first = 30 - section.num_groups
+    assert len(section.validation_report.repairs) > 0
+
+    full = np.asarray(section._full.covariance_matrix)
+    assert np.array_equal(full[first:, first:], np.asarray(section.covariance_matrix))
+    assert np.all(full[25:29, first:] == 0)
+
+    window = section.window()
+    assert np.allclose(
+        np.asarray(window.covariance_matrix)[first:, first:], np.asarray(section.covariance_matrix)
+    )
+
+
+def test_pickle(nubar_test_file, tmp_path):
+    obj = ErrorrOutput(nubar_test_file, upper_limit=1e6)
+    obj.sections[452]
+    copy = pickle.loads(pickle.dumps(obj))
+    assert copy.sections.loaded == ()
+    assert copy.upper_limit == 1e6
+    assert np.array_equal(
+        copy.sections[452].covariance_matrix, obj.sections[452].covariance_matrix
+    )
+
+    obj = ErrorrOutput(nubar_test_file, backend="endftk")
+    obj.sections[455]
+    copy = pickle.loads(pickle.dumps(obj))
+    assert np.array_equal(copy.sections[455].mean_values, obj.sections[455].mean_values)
+
+    tape = pickle.loads(pickle.dumps(ErrorrTape(nubar_test_file, index_file=False)))
+    assert list(tape[9237].sections) == [452, 455, 456]
@@ -0,0 +1,92 @@
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from pathlib import Path
+from pyerr import ErrorrOutput, ErrorrTape, PackedSymmetricMatrix, CSRMatrix
+from pyerr._export import export_parquet, upper_rows
+
+
+@pytest.fixture
+def nubar_test_file():
+    return Path(__file__).parent / "files" / "nubar_example.txt"
+
+
+def read_covariance(table, mt, num_groups):
+    """reconstructs the full matrix of a section from the exported table"""
+    table = table[table["MT"] == mt]
+    matrix = np.zeros((num_groups, num_groups))
+    if "values" in table:
+        for row, values in zip(table["row"], table["values"]):
+            matrix[row, row:] = values
+    else:
+        matrix[table["row"], table["column"]] = table["value"]
+    return np.triu(matrix) + np.triu(matrix, 1).T
+
+
+def test_upper_rows():
+    rng = np.random.default_rng(5)
+    a = rng.normal(size=(20, 20))
+    a[np.abs(a) < 1] = 0
+    a = a + a.T
+    packed = PackedSymmetricMatrix.from_dense(a)
+    rows, columns = np.nonzero(a)
+    sparse = CSRMatrix.from_triplets(rows, columns, a[rows, columns], a.shape)
+    for matrix in (a, packed, sparse):
+        assert np.array_equal(upper_rows(matrix, 0, 20), packed.data)
+        assert np.array_equal(upper_rows(matrix, 3, 5), np.concatenate([a[3, 3:], a[4, 4:]]))
+
+
+@pytest.mark.parametrize("storage", ["dense", "packed", "sparse"])
+@pytest.mark.parametrize("layout", ["sparse", "packed"])
+def test_round_trip(nubar_test_file, tmp_path, storage, layout):
+    obj = ErrorrOutput(nubar_test_file, storage=storage)
+    obj.sections[452]
+    filenames = obj.to_parquet(tmp_path, layout=layout)
+    # sections that were not loaded are not kept
+    assert obj.sections.loaded == (452,)
+
+    groups = pd.read_parquet(filenames["groups"])
+    covariance = pd.read_parquet(filenames["covariance"])
+    assert pq.read_schema(filenames["covariance"]).metadata[b"pyerr_layout"] == layout.encode()
+    for mt in (452, 455, 456):
+        section = obj.sections[mt]
+        rows = groups[groups["MT"] == mt]
+        assert list(rows["group"]) == list(range(section.num_groups))
+        assert np.array_equal(rows["mean_value"], section.mean_values)
+        assert np.array_equal(rows["uncertainty"], section.uncertainty)
+        assert np.array_equal(rows["lower_energy"], section.group_boundaries[:-1])
+        assert rows["incident_energy"].isna().all()
+        matrix = read_covariance(covariance, mt, section.num_groups)
+        assert np.array_equal(matrix, np.asarray(section.covariance_matrix))
+    if layout == "sparse":
+        assert np.all((covariance["value"] != 0) | (covariance["row"] == covariance["column"]))
+        assert np.all(covariance["row"] <= covariance["column"])
+
+    with pytest.raises(ValueError):
+        obj.to_parquet(tmp_path, layout="dense")
+
+
+def test_tape(tmp_path):
+    files = Path(__file__).parent / "files"
+    filename = tmp_path / "tape30"
+    filename.write_bytes(
+        (files / "nubar_example.txt").read_bytes() + (files / "u235_endf71.txt").read_bytes()
+    )
+    tape = ErrorrTape(filename, index_file=False)
+    filenames = tape.to_parquet(tmp_path / "export", mts=[452, 18])
+
+    # each material is in its own row groups
+    for name in ("groups", "covariance"):
+        metadata = pq.ParquetFile(filenames[name]).metadata
+        mats = [
+            (
+                metadata.row_group(i).column(0).statistics.min,
+                metadata.row_group(i).column(0).statistics.max,
+            )
+            for i in range(metadata.num_row_groups)
+        ]
+        assert mats == [(9237, 9237), (9228, 9228)]
+
+    groups = pd.read_parquet(filenames["groups"])
+    assert sorted(set(zip(groups["MAT"], groups["MT"]))) == [(9228, 18), (9237, 452)]
@@ -0,0 +1,92 @@
+import pytest
+import numpy as np
+from pyerr._groups import (
+    group_overlap,
+    lethargy_widths,
+    collapse_operator,
+    clear_operators,
+    collapse_values,
+    _OPERATORS,
+)
+from pyerr._packed import PackedSymmetricMatrix
+
+
+@pytest.fixture
+def grids():
+    source = np.geomspace(1e-5, 2e7, 61)
+    target = np.array([1e-5, 0.625, 1e5, 2e7])
+    return source, target
+
+
+def test_group_overlap():
+    source = np.array([1.0, 10.0, 100.0, 1000.0])
+    target = np.array([1.0, 100.0, 1000.0])
+    overlap = group_overlap(source, target)
+    assert np.allclose(overlap, [[1, 1, 0], [0, 0, 1]])
+
+    # a coarse group is split into the fine groups by lethargy
+    overlap = group_overlap(target, source)
+    assert np.allclose(overlap, [[0.5, 0], [0.5, 0], [0, 1]])
+    assert np.allclose(
+        group_overlap(target, source, lethargy=False), [[9 / 99, 0], [90 / 99, 0], [0, 1]]
+    )
+
+    # parts of the source groups outside of the target groups are dropped
+    overlap = group_overlap(source, np.array([10.0, 100.0]))
+    assert np.allclose(overlap, [[0, 1, 0]])
+
+    with pytest.raises(ValueError):
+        group_overlap(source[::-1], target)
+
+
+def test_lethargy_widths():
+    assert np.allclose(lethargy_widths([1.0, np.e, np.e**3]), [1.0, 2.0])
+    assert np.allclose(lethargy_widths([0.0, 1.0, 3.0]), [1.0, 2.0])
+
+
+def test_collapse_operator(grids):
+    source, target = grids
+    clear_operators()
+    operator = collapse_operator(source, target)
+    assert operator.shape == (3, 60)
+    assert np.allclose(np.asarray(operator).sum(axis=1), 1.0)
+    assert collapse_operator(source, target) is operator
+    assert len(_OPERATORS) == 1
+
+    # a constant is unchanged by flux-weighted averaging
+    assert np.allclose(operator @ np.full(60, 2.5), 2.5)
+
+    # the flux weights the source groups
+    flux = np.ones(60)
+    flux[:10] = 0.0
+    weighted = np.asarray(collapse_operator(source, target, flux))
+    assert np.all(weighted[:, :10] == 0.0)
+    assert np.allclose(weighted.sum(axis=1), 1.0)
+
+    # summing keeps the total
+    summed = collapse_operator(source, target, average=False)
+    values = np.random.default_rng(0).random(60)
+    assert np.isclose(np.sum(summed @ values), np.sum(values))
+
+    with pytest.raises(ValueError):
+        collapse_operator(source, target, np.ones(5))
+    clear_operators()
+    assert len(_OPERATORS) == 0
+
+
+def test_collapse_values(grids):
+    source, target = grids
+    rng = np.random.default_rng(1)
+    mean = rng.random(60) + 1.0
+    factor = rng.normal(size=(60, 60)) * 1e-2
+    abs_covariance = factor @ factor.T
+    operator = collapse_operator(source, target)
+    dense = np.asarray(operator)
+
+    collapsed_mean, covariance = collapse_values(operator, mean, abs_covariance)
+    assert np.allclose(collapsed_mean, dense @ mean)
+    expected = dense @ abs_covariance @ dense.T
+    assert np.allclose(covariance, expected / np.outer(collapsed_mean, collapsed_mean))
+
+    packed = PackedSymmetricMatrix.from_dense(abs_covariance)
+    assert np.allclose(collapse_values(operator, mean, packed)[1], covariance)
@@ -0,0 +1,50 @@
+import sys
+import json
+import subprocess
+import pytest
+import pyerr
+
+# modules that are only imported when they are used
+HEAVY_MODULES = ["pandas", "pyarrow", "fortranformat", "ENDFtk", "scipy"]
+
+
+def imported_modules(statement):
+    """runs the statement in a new interpreter and gets the heavy modules
+    that it imported"""
+    code = (
+        f"import sys, json\n{statement}\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def test_import_pyerr():
+    assert imported_modules("import pyerr") == []
+    code = "import pyerr\nassert 'numpy' not in sys.modules"
+    assert imported_modules(code) == []
+
+
+@pytest.mark.parametrize(
+    "names", ["ErrorrOutput, ErrorrTape", "Section, SectionCache", "TapeIndex, sample_sections"]
+)
+def test_import_names(names):
+    assert imported_modules(f"from pyerr import {names}") == []
+
+
+def test_import_tape_index():
+    code = "from pyerr import TapeIndex\nassert 'pyerr._cache' not in sys.modules"
+    assert imported_modules(code) == []
+
+
+def test_lazy_attributes():
+    assert set(pyerr.__all__) <= set(dir(pyerr))
+    for name in pyerr.__all__:
+        assert getattr(pyerr, name).__name__ == name
+    from pyerr._section import Section
+
+    assert pyerr.Section is Section
+    with pytest.raises(AttributeError):
+        pyerr.NotAName
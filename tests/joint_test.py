@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+from pathlib import Path
+from pyerr import ErrorrOutput, JointCovariance
+
+
+@pytest.fixture
+def nubar_test_file():
+    filename = Path(__file__).parent / "files" / "nubar_example.txt"
+    return filename
+
+
+@pytest.fixture
+def nubar_joint(nubar_test_file):
+    return ErrorrOutput(nubar_test_file).joint_covariance()
+
+
+def test_assembly(nubar_test_file, nubar_joint):
+    sections = ErrorrOutput(nubar_test_file).sections
+    assert nubar_joint.mts == [452, 455, 456]
+    assert nubar_joint.covariance_matrix.shape == (90, 90)
+    assert np.array_equal(nubar_joint.covariance_matrix, nubar_joint.covariance_matrix.T)
+    assert np.array_equal(nubar_joint.slices[455], slice(30, 60))
+    for mt in nubar_joint.mts:
+        assert np.array_equal(nubar_joint.block(mt, mt), sections[mt].covariance_matrix)
+        assert np.allclose(
+            nubar_joint.block(mt, mt, absolute=True), sections[mt].abs_covariance_matrix
+        )
+    assert np.array_equal(nubar_joint.block(456, 452), nubar_joint.block(452, 456).T)
+    assert np.count_nonzero(nubar_joint.block(452, 456)) == 900
+    assert np.array_equal(
+        nubar_joint.split(nubar_joint.mean_values)[456], sections[456].mean_values
+    )
+
+
+def test_subset(nubar_test_file, nubar_joint):
+    obj = ErrorrOutput(nubar_test_file).joint_covariance([456, 452])
+    assert obj.mts == [456, 452]
+    assert np.array_equal(obj.block(452, 456), nubar_joint.block(452, 456))
+
+
+def test_correlated_sampling(nubar_joint):
+    nubar_joint.get_eigenvalues(k=10)
+    assert nubar_joint.eig_info["num_eigenpairs"] == 10
+    samples = nubar_joint.split(nubar_joint.get_pca_realizations(20000, seed=4))
+    sampled = np.corrcoef(samples[452][:, 10], samples[456][:, 10])[0, 1]
+    assert np.isclose(sampled, nubar_joint.correlation_matrix[10, 70], atol=0.01)
+
+    chunks = list(nubar_joint.iter_pca_realizations(1000, seed=4, chunk_size=256))
+    assert np.array_equal(np.vstack(chunks), nubar_joint.get_pca_realizations(1000, seed=4))
+
+    # the eigenpairs are truncated, and are dropped with the other quantities
+    assert nubar_joint._truncated_eigenpairs()
+    nubar_joint.clear_cache()
+    assert "eig_vals" not in nubar_joint.__dict__
+    assert "correlation_matrix" not in nubar_joint.__dict__
+
+
+def test_errors(nubar_test_file):
+    sections = ErrorrOutput(nubar_test_file).sections
+    pfns = ErrorrOutput(Path(__file__).parent / "files" / "u235_endf71.txt")
+    with pytest.raises(ValueError):
+        pfns.joint_covariance([18])
+    with pytest.raises(ValueError):
+        JointCovariance({452: sections[452], 18: pfns.sections[18]})
+    with pytest.raises(ValueError):
+        JointCovariance({})
@@ -0,0 +1,176 @@
+import pytest
+import numpy as np
+from pyerr import _linalg as linalg
+from pyerr._linalg import (
+    safe_reciprocal,
+    scale_outer,
+    covariance_to_correlation,
+    correlation_to_covariance,
+    leading_eigenpairs,
+)
+from pyerr._packed import PackedSymmetricMatrix
+from pyerr._sparse import CSRMatrix
+
+
+@pytest.fixture
+def covariance():
+    rng = np.random.default_rng(42)
+    a = rng.normal(size=(8, 8))
+    return a @ a.T
+
+
+def test_safe_reciprocal():
+    assert np.array_equal(safe_reciprocal([2.0, 0.0, -4.0]), [0.5, 0.0, -0.25])
+
+
+def test_scale_outer(covariance):
+    left = np.arange(1, 9.0)
+    right = np.linspace(0.5, 2.0, 8)
+    expected = np.diag(left) @ covariance @ np.diag(right)
+    assert np.allclose(scale_outer(covariance, left, right), expected)
+    assert np.allclose(scale_outer(covariance, left), np.diag(left) @ covariance @ np.diag(left))
+
+
+def test_scale_outer_in_place(covariance):
+    expected = scale_outer(covariance, np.arange(8.0))
+    scale_outer(covariance, np.arange(8.0), out=covariance)
+    assert np.array_equal(covariance, expected)
+
+
+def test_correlation_round_trip(covariance):
+    std = np.sqrt(np.diag(covariance))
+    correlation = covariance_to_correlation(covariance)
+    unc_mat = np.diag(std)
+    expected = np.linalg.inv(unc_mat) @ covariance @ np.linalg.inv(unc_mat)
+    assert np.allclose(correlation, expected)
+    assert np.all(np.diag(correlation) == 1.0)
+    assert np.allclose(correlation_to_covariance(correlation, std), covariance)
+
+
+def test_zero_uncertainty(covariance):
+    covariance[3, :] = 0
+    covariance[:, 3] = 0
+    correlation = covariance_to_correlation(covariance)
+    assert np.all(np.isfinite(correlation))
+    assert correlation[3, 3] == 1.0
+    assert np.all(correlation[3, :3] == 0)
+    assert np.all(correlation[:3, 3] == 0)
+
+
+@pytest.fixture
+def low_rank():
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=(200, 6)) * np.logspace(0, -3, 6)
+    return a @ a.T + 1e-10 * np.identity(200)
+
+
+def test_leading_eigenpairs_full(low_rank):
+    eig_vals, eig_vects, info = leading_eigenpairs(low_rank)
+    assert info["method"] == "full"
+    assert info["residual"] is None
+    assert len(eig_vals) == 200
+    assert np.array_equal(eig_vals, sorted(eig_vals, reverse=True))
+    assert np.allclose(eig_vals * eig_vects @ eig_vects.T, low_rank)
+
+
+@pytest.mark.parametrize("method", ["full", "subset", "randomized"])
+def test_leading_eigenpairs_truncated(low_rank, method):
+    if method == "subset":
+        pytest.importorskip("scipy")
+    reference, _, _ = leading_eigenpairs(low_rank)
+    eig_vals, eig_vects, info = leading_eigenpairs(low_rank, k=6, method=method, seed=1)
+    assert info["method"] == method
+    assert info["num_eigenpairs"] == 6
+    assert eig_vects.shape == (200, 6)
+    assert np.allclose(eig_vals, reference[:6])
+    assert info["residual"] < 1e-8
+    assert np.isclose(info["explained_variance"], 1.0)
+
+
+@pytest.mark.parametrize("method", ["full", "randomized"])
+def test_leading_eigenpairs_fraction(low_rank, method):
+    reference, _, _ = leading_eigenpairs(low_rank)
+    fraction = (np.sum(reference[:2]) + reference[2] / 2) / np.trace(low_rank)
+    eig_vals, _, info = leading_eigenpairs(low_rank, variance_fraction=fraction, method=method)
+    assert len(eig_vals) == 3
+    assert info["explained_variance"] >= fraction
+
+
+def test_leading_eigenpairs_auto(low_rank):
+    _, _, info = leading_eigenpairs(low_rank)
+    assert info["method"] == "full"
+    for options in [{"k": 6}, {"variance_fraction": 0.99}]:
+        _, _, info = leading_eigenpairs(low_rank, seed=1, **options)
+        assert info["method"] == "randomized"
+
+
+def test_leading_eigenpairs_subset_fraction(low_rank, monkeypatch):
+    scipy_eigh = pytest.importorskip("scipy.linalg").eigh
+    calls = []
+
+    def eigh(matrix, **options):
+        calls.append(options)
+        return scipy_eigh(matrix, **options)
+
+    # only the leading pairs are computed, without all of the eigenvalues
+    monkeypatch.setattr(linalg, "_scipy_eigh", lambda: eigh)
+    monkeypatch.setattr(linalg, "RANDOMIZED_START", 3)
+    reference, _, _ = leading_eigenpairs(low_rank)
+    fraction = (np.sum(reference[:2]) + reference[2] / 2) / np.trace(low_rank)
+    eig_vals, _, info = leading_eigenpairs(low_rank, variance_fraction=fraction, method="subset")
+    assert info["method"] == "subset"
+    assert np.allclose(eig_vals, reference[:3])
+    assert calls == [{"subset_by_index": [197, 199]}]
+
+    # more pairs than that are computed with a full solve
+    calls.clear()
+    fraction = (np.sum(reference[:4]) + reference[4] / 2) / np.trace(low_rank)
+    eig_vals, _, info = leading_eigenpairs(low_rank, variance_fraction=fraction, method="subset")
+    assert info["method"] == "full"
+    assert np.allclose(eig_vals, reference[:5])
+    assert calls == [{"subset_by_index": [197, 199]}]
+    eig_vals, _, info = leading_eigenpairs(
+        low_rank, k=5, variance_fraction=fraction, method="subset"
+    )
+    assert info["method"] == "subset"
+    assert calls[1:] == [{"subset_by_index": [197, 199]}, {"subset_by_index": [195, 199]}]
+
+
+def test_leading_eigenpairs_errors(low_rank):
+    with pytest.raises(ValueError):
+        leading_eigenpairs(low_rank, method="lanczos")
+    with pytest.raises(ValueError):
+        leading_eigenpairs(low_rank, variance_fraction=1.5)
+
+
+def test_packed(covariance, low_rank):
+    packed = PackedSymmetricMatrix.from_dense(covariance)
+    std = np.sqrt(np.diag(covariance))
+    correlation = covariance_to_correlation(packed)
+    assert isinstance(correlation, PackedSymmetricMatrix)
+    assert np.allclose(np.asarray(correlation), covariance_to_correlation(covariance))
+    assert np.allclose(np.asarray(scale_outer(packed, std)), scale_outer(covariance, std))
+    with pytest.raises(ValueError):
+        scale_outer(packed, std, std)
+
+    packed = PackedSymmetricMatrix.from_dense(low_rank)
+    reference, _, _ = leading_eigenpairs(low_rank, k=6)
+    for method in ["full", "randomized"]:
+        eig_vals, _, info = leading_eigenpairs(packed, k=6, method=method, seed=1)
+        assert np.allclose(eig_vals, reference)
+        assert info["residual"] < 1e-8
+
+
+def test_sparse(covariance, low_rank):
+    rows, columns = np.indices(covariance.shape)
+    sparse = CSRMatrix.from_triplets(rows.ravel(), columns.ravel(), covariance.ravel(), (8, 8))
+    correlation = covariance_to_correlation(sparse)
+    assert isinstance(correlation, CSRMatrix)
+    assert np.allclose(np.asarray(correlation), covariance_to_correlation(covariance))
+
+    rows, columns = np.indices(low_rank.shape)
+    sparse = CSRMatrix.from_triplets(rows.ravel(), columns.ravel(), low_rank.ravel(), (200, 200))
+    reference, _, _ = leading_eigenpairs(low_rank, k=6)
+    eig_vals, _, info = leading_eigenpairs(sparse, k=6, seed=1)
+    assert info["method"] == "randomized"
+    assert np.allclose(eig_vals, reference)
@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+from pyerr._packed import PackedSymmetricMatrix, packed_size
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(7)
+    a = rng.normal(size=(300, 300))
+    return a + a.T
+
+
+def test_round_trip(matrix):
+    packed = PackedSymmetricMatrix.from_dense(matrix)
+    assert len(packed.data) == packed_size(300) == 300 * 301 // 2
+    assert packed.shape == (300, 300)
+    assert np.array_equal(np.asarray(packed), matrix)
+    assert np.array_equal(packed.rows(10, 20), matrix[10:20])
+    assert np.array_equal(packed.diagonal(), np.diag(matrix))
+    assert packed.trace() == pytest.approx(np.trace(matrix))
+
+
+def test_put(matrix):
+    packed = PackedSymmetricMatrix(np.zeros(packed_size(300)), 300)
+    rows, columns = np.triu_indices(300)
+    packed.put(rows, columns, matrix[rows, columns])
+    assert np.array_equal(np.asarray(packed), matrix)
+
+    # the lower triangle sets the same elements
+    packed.put(5, np.arange(5), 1.0)
+    assert np.all(np.asarray(packed)[:5, 5] == 1.0)
+
+    with pytest.raises(ValueError):
+        PackedSymmetricMatrix(np.zeros(10), 5)
+
+
+def test_products(matrix):
+    packed = PackedSymmetricMatrix.from_dense(matrix)
+    vector = np.linspace(-1, 1, 300)
+    block = np.arange(900.0).reshape((300, 3))
+    assert np.allclose(packed @ vector, matrix @ vector)
+    assert np.allclose(packed @ block, matrix @ block)
+    assert np.allclose(block.T @ packed, block.T @ matrix)
+    assert np.allclose(vector @ packed @ vector, vector @ matrix @ vector)
+
+
+def test_scale_and_window(matrix):
+    packed = PackedSymmetricMatrix.from_dense(matrix)
+    scales = np.linspace(1, 2, 300)
+    assert np.allclose(np.asarray(packed.scale(scales)), matrix * np.outer(scales, scales))
+
+    window = packed.window(40, 250)
+    assert window.size == 210
+    assert np.array_equal(np.asarray(window), matrix[40:250, 40:250])
+
+    window.fill_diagonal(1.0)
+    assert np.all(window.diagonal() == 1.0)
@@ -0,0 +1,71 @@
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from pyerr import sample_sections
+
+
+@pytest.fixture
+def sections():
+    rng = np.random.default_rng(1)
+    sections = {}
+    for mt, num_groups in [(2, 20), (18, 30), (102, 25)]:
+        a = rng.normal(size=(num_groups, num_groups))
+        eig_vals, eig_vects = np.linalg.eigh(a @ a.T)
+        sections[mt] = SimpleNamespace(
+            eig_vals=eig_vals[::-1],
+            eig_vects=eig_vects[:, ::-1],
+            mean_values=np.linspace(1, 2, num_groups),
+        )
+    return sections
+
+
+def test_serial(sections):
+    samples = sample_sections(sections, 700, k=5, seed=3, chunk_size=256, max_workers=1)
+    assert list(samples) == [2, 18, 102]
+    assert samples[18].shape == (700, 30)
+    again = sample_sections(sections, 700, k=5, seed=3, chunk_size=256, max_workers=1)
+    assert all(np.array_equal(samples[mt], again[mt]) for mt in sections)
+    other = sample_sections(sections, 700, k=5, seed=4, chunk_size=256, max_workers=1)
+    assert not np.array_equal(samples[2], other[2])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 300, 700])
+def test_chunk_size(sections, chunk_size):
+    reference = sample_sections(sections, 700, k=5, seed=3, chunk_size=256, max_workers=1)
+    samples = sample_sections(sections, 700, k=5, seed=3, chunk_size=chunk_size, max_workers=1)
+    assert all(np.array_equal(samples[mt], reference[mt]) for mt in sections)
+
+
+def test_generator_seed(sections):
+    samples = sample_sections(sections, 300, seed=np.random.default_rng(5), max_workers=1)
+    again = sample_sections(sections, 300, seed=np.random.default_rng(5), max_workers=1)
+    assert all(np.array_equal(samples[mt], again[mt]) for mt in sections)
+
+
+def test_parallel_matches_serial(sections):
+    serial = sample_sections(sections, 700, seed=3, chunk_size=256, max_workers=1)
+    parallel = sample_sections(sections, 700, seed=3, chunk_size=256, max_workers=2)
+    assert all(np.array_equal(serial[mt], parallel[mt]) for mt in sections)
+
+    # the workers write into the returned arrays, which are not copied
+    assert not any(parallel[mt].flags.owndata for mt in sections)
+    rows = parallel[18][:10].copy()
+    del parallel[2], parallel[102]
+    assert np.array_equal(parallel[18][:10], rows)
+
+
+def test_independent_streams(sections):
+    samples = sample_sections(sections, 512, seed=3, chunk_size=256, max_workers=1)
+    # the standard normal samples of each chunk come from a different stream
+    factor = np.sqrt(sections[2].eig_vals) * sections[2].eig_vects
+    gaussian = np.linalg.solve(factor, (samples[2] - sections[2].mean_values).T).T
+    assert not np.allclose(gaussian[:256], gaussian[256:])
+
+
+def test_output_dir(sections, tmp_path):
+    serial = sample_sections(sections, 300, seed=8, chunk_size=128, max_workers=1)
+    files = sample_sections(
+        sections, 300, seed=8, chunk_size=128, max_workers=2, output_dir=tmp_path
+    )
+    assert isinstance(files[18], np.memmap)
+    assert np.array_equal(np.load(tmp_path / "MT18.npy"), serial[18])
@@ -0,0 +1,33 @@
+import pytest
+import numpy as np
+from pyerr._propagation import sandwich
+from pyerr._packed import PackedSymmetricMatrix
+
+
+@pytest.fixture
+def covariance():
+    rng = np.random.default_rng(11)
+    factor = rng.normal(size=(40, 40))
+    return factor @ factor.T, np.linalg.cholesky(factor @ factor.T)
+
+
+@pytest.fixture
+def sensitivities():
+    return np.random.default_rng(12).normal(size=(25, 40))
+
+
+def test_sandwich(covariance, sensitivities):
+    matrix, factor = covariance
+    expected = np.array([s @ matrix @ s for s in sensitivities])
+    assert np.allclose(sandwich(sensitivities, matrix=matrix), expected)
+    assert np.allclose(sandwich(sensitivities, factor=factor), expected)
+
+    full = sensitivities @ matrix @ sensitivities.T
+    assert np.allclose(sandwich(sensitivities, matrix=matrix, full=True), full)
+    assert np.allclose(sandwich(sensitivities, factor=factor, full=True), full)
+
+    packed = PackedSymmetricMatrix.from_dense(matrix)
+    assert np.allclose(sandwich(sensitivities, matrix=packed), expected)
+
+    with pytest.raises(ValueError):
+        sandwich(sensitivities)
@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+import fortranformat as ff
+from pyerr.base import read_values, read_cont
+
+
+@pytest.fixture
+def value_lines():
+    return [
+        " 1.390000-4 1.520000-1 4.140000-1 1.130000+0 3.060000+0 8.320000+09228 1451    3",
+        " 5.01631-18 1.38605-18-1.34316-20-1.98945-20-2.58200-20-2.64669-20922835 18   19",
+        " 1.234567+5 1.0E+5     -2.5D-3             7-1.700000+7           9228 1451    8",
+    ]
+
+
+@pytest.fixture
+def control_lines():
+    return [
+        " 9.223500+4 2.330248+2          6          0        -12          09228 1451    1",
+        " 2.936000+2 0.000000+0         30          0         31          09228 1451    2",
+    ]
+
+
+def test_endf_floats(value_lines):
+    values = read_values(value_lines)
+    assert len(values) == 18
+    assert values[0] == 1.39e-4
+    assert values[8] == -1.34316e-20
+    assert values[12] == 1.234567e5
+    assert values[13] == 1e5
+    assert values[14] == -2.5e-3
+    assert values[15] == 7
+    assert values[16] == -1.7e7
+    assert values[17] == 0
+
+
+def test_values_match_fortranformat(value_lines):
+    reader = ff.FortranRecordReader("(6G11.0)")
+    reference = [item for line in value_lines[:2] for item in reader.read(line)]
+    assert np.array_equal(read_values(value_lines[:2]), reference)
+
+
+def test_cont(control_lines):
+    floats, integers = read_cont(control_lines)
+    assert floats.shape == (2, 2)
+    assert integers.shape == (2, 8)
+    assert floats[0, 0] == 92235
+    assert floats[1, 0] == 293.6
+    assert np.array_equal(integers[0], [6, 0, -12, 0, 9228, 1, 451, 1])
+    assert np.array_equal(integers[1], [30, 0, 31, 0, 9228, 1, 451, 2])
+
+
+def test_cont_matches_fortranformat(control_lines):
+    reader = ff.FortranRecordReader("(2G11.0,4I11,I4,I2,I3,I5)")
+    floats, integers = read_cont(control_lines)
+    for line, f, i in zip(control_lines, floats, integers):
+        assert list(f) + list(i) == reader.read(line)
+
+
+def test_empty_block():
+    assert len(read_values([])) == 0
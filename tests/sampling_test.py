@@ -0,0 +1,65 @@
+import pytest
+import numpy as np
+from pyerr._sampling import pca_factor, iter_realizations, fill_realizations
+
+
+@pytest.fixture
+def eigenpairs():
+    rng = np.random.default_rng(7)
+    a = rng.normal(size=(40, 40))
+    eig_vals, eig_vects = np.linalg.eigh(a @ a.T)
+    return eig_vals[::-1], eig_vects[:, ::-1]
+
+
+@pytest.fixture
+def mean_values():
+    return np.linspace(1.0, 2.0, 40)
+
+
+def test_pca_factor(eigenpairs):
+    factor = pca_factor(*eigenpairs, k=5)
+    assert factor.shape == (40, 5)
+    assert np.allclose(
+        factor @ factor.T, eigenpairs[0][:5] * eigenpairs[1][:, :5] @ eigenpairs[1][:, :5].T
+    )
+    assert pca_factor(*eigenpairs, k=100).shape == (40, 40)
+
+
+def test_chunk_size_invariance(eigenpairs, mean_values):
+    factor = pca_factor(*eigenpairs, k=10)
+    reference = fill_realizations(mean_values, factor, 1000, seed=12)
+    for chunk_size in [1, 7, 256, 300, 5000]:
+        realizations = fill_realizations(mean_values, factor, 1000, chunk_size=chunk_size, seed=12)
+        assert np.array_equal(realizations, reference)
+        chunks = list(iter_realizations(mean_values, factor, 1000, chunk_size, seed=12))
+        assert len(chunks) == int(np.ceil(1000 / chunk_size))
+        assert np.array_equal(np.concatenate(chunks), reference)
+
+
+def test_seeding(eigenpairs, mean_values):
+    factor = pca_factor(*eigenpairs)
+    first = fill_realizations(mean_values, factor, 50, seed=np.random.default_rng(3))
+    second = fill_realizations(mean_values, factor, 50, seed=3)
+    assert np.array_equal(first, second)
+    assert not np.array_equal(first, fill_realizations(mean_values, factor, 50, seed=4))
+
+
+def test_output_buffer(eigenpairs, mean_values, tmp_path):
+    factor = pca_factor(*eigenpairs, k=3)
+    out = np.lib.format.open_memmap(tmp_path / "samples.npy", mode="w+", shape=(600, 40))
+    returned = fill_realizations(mean_values, factor, 600, out=out, chunk_size=128, seed=1)
+    assert returned is out
+    out.flush()
+    assert np.array_equal(
+        np.load(tmp_path / "samples.npy"), fill_realizations(mean_values, factor, 600, seed=1)
+    )
+    with pytest.raises(ValueError):
+        fill_realizations(mean_values, factor, 10, out=np.empty((10, 3)))
+
+
+def test_statistics(eigenpairs, mean_values):
+    factor = pca_factor(*eigenpairs)
+    realizations = fill_realizations(mean_values, factor, 100000, seed=0)
+    assert np.allclose(np.mean(realizations, axis=0), mean_values, atol=0.5)
+    covariance = eigenpairs[0] * eigenpairs[1] @ eigenpairs[1].T
+    assert np.allclose(np.cov(realizations.T), covariance, atol=0.05 * np.max(covariance))
@@ -0,0 +1,43 @@
+import gc
+import os
+import numpy as np
+from pyerr._scratch import ScratchSpace
+
+
+def test_allocate(tmp_path):
+    scratch = ScratchSpace(tmp_path)
+    array = scratch.allocate("matrix", (3, 4))
+    assert isinstance(array, np.memmap)
+    assert array.shape == (3, 4)
+    assert np.all(array == 0)
+
+    array[1, 2] = 5.0
+    array.flush()
+    opened = scratch.open("matrix")
+    assert isinstance(opened, np.memmap)
+    assert opened[1, 2] == 5.0
+
+
+def test_replace(tmp_path):
+    scratch = ScratchSpace(tmp_path)
+    first = scratch.store("values", np.arange(4.0))
+
+    # the first array is still valid after it is replaced
+    second = scratch.store("values", np.ones(6))
+    assert np.array_equal(first, np.arange(4.0))
+    assert np.array_equal(scratch.open("values"), second)
+
+
+def test_cleanup(tmp_path):
+    scratch = ScratchSpace(tmp_path)
+    path = scratch.path
+    scratch.allocate("matrix", (2, 2))
+    del scratch
+    gc.collect()
+    assert not os.path.exists(path)
+
+    kept = ScratchSpace(tmp_path, keep=True)
+    path = kept.path
+    del kept
+    gc.collect()
+    assert os.path.exists(path)
@@ -1,8 +1,11 @@
+import os
 import pytest
 import numpy as np
 import ENDFtk
 from pathlib import Path
 from pyerr import Section
+from pyerr._packed import PackedSymmetricMatrix
+from pyerr._sparse import CSRMatrix
 import matplotlib.pyplot as plt
 
 
@@ -46,6 +49,63 @@ def test_nubar_452(nubar_test_452, nubar_452_matrix):
     assert np.array_equal(np.sqrt(np.diag(nubar_452_matrix)), obj.uncertainty)
     assert np.array_equal(obj.eig_vals, sorted(obj.eig_vals, reverse=True))
     assert "average_energy" not in obj.__dict__.keys()
+    assert not hasattr(obj, "average_energy")
+
+
+def test_nubar_452_cache(nubar_test_452):
+    obj = Section(*nubar_test_452)
+    assert "correlation_matrix" not in obj.__dict__.keys()
+    assert "eig_vals" not in obj.__dict__.keys()
+    obj.uncertainty
+    assert "uncertainty" in obj.__dict__.keys()
+    assert "abs_covariance_matrix" not in obj.__dict__.keys()
+    assert "eig_vals" not in obj.__dict__.keys()
+    eig_vals = obj.eig_vals
+    assert obj.eig_vals is eig_vals
+    assert "eig_vects" in obj.__dict__.keys()
+    obj.clear_cache()
+    assert "eig_vals" not in obj.__dict__.keys()
+    assert np.array_equal(obj.eig_vals, eig_vals)
+
+
+def test_nubar_452_engines(nubar_test_452):
+    obj = Section(*nubar_test_452)
+    reference = Section(*nubar_test_452, engine="fortranformat")
+    assert np.array_equal(obj.group_boundaries, reference.group_boundaries)
+    assert np.array_equal(obj.mean_values, reference.mean_values)
+    assert np.array_equal(obj.covariance_matrix, reference.covariance_matrix)
+
+
+def test_nubar_452_scratch(nubar_test_452, tmp_path):
+    reference = Section(*nubar_test_452)
+    obj = Section(*nubar_test_452, scratch_dir=tmp_path)
+    assert isinstance(obj.covariance_matrix, np.memmap)
+    assert np.array_equal(obj.covariance_matrix, reference.covariance_matrix)
+    for name in ["correlation_matrix", "abs_covariance_matrix"]:
+        assert isinstance(getattr(obj, name), np.memmap)
+        assert np.array_equal(getattr(obj, name), getattr(reference, name))
+
+    obj.get_eigenvalues(k=5)
+    assert isinstance(obj.eig_vects, np.memmap)
+    assert len(os.listdir(obj.scratch.path)) == 4
+
+    # recomputing replaces the files
+    obj.clear_cache()
+    assert np.array_equal(obj.correlation_matrix, reference.correlation_matrix)
+
+
+def test_nubar_452_packed(nubar_test_452, tmp_path):
+    reference = Section(*nubar_test_452)
+    for scratch_dir in [None, tmp_path]:
+        obj = Section(*nubar_test_452, scratch_dir=scratch_dir, storage="packed")
+        assert np.array_equal(np.asarray(obj.covariance_matrix), reference.covariance_matrix)
+        assert np.array_equal(obj.uncertainty, reference.uncertainty)
+        for name in ["correlation_matrix", "abs_covariance_matrix"]:
+            assert isinstance(getattr(obj, name), PackedSymmetricMatrix)
+            assert np.allclose(np.asarray(getattr(obj, name)), getattr(reference, name))
+        obj.get_eigenvalues(k=5)
+        reference.get_eigenvalues(k=5)
+        assert np.allclose(obj.eig_vals, reference.eig_vals)
 
 
 @pytest.fixture
@@ -79,11 +139,22 @@ def endf71_eigs():
 
 def test_average_energy(endf71_pfns):
     obj = Section(*endf71_pfns)
+    assert "average_energy" not in obj.__dict__.keys()
+    obj.calculate_average_energy()
     assert "average_energy" in obj.__dict__.keys()
     assert np.isclose(obj.average_energy, 2.032238561494875e6)
     assert np.isclose(obj.average_energy_uncertainty, 0.07429457079357842e6)
 
 
+def test_sparse_pfns(endf71_pfns):
+    reference = Section(*endf71_pfns)
+    obj = Section(*endf71_pfns, storage="sparse")
+    assert isinstance(obj.abs_covariance_matrix, CSRMatrix)
+    assert np.allclose(obj.uncertainty, reference.uncertainty)
+    assert np.allclose(np.asarray(obj.correlation_matrix), reference.correlation_matrix)
+    assert np.isclose(obj.average_energy_uncertainty, reference.average_energy_uncertainty)
+
+
 def test_endf71_pca(endf71_pfns, endf71_eigs):
     obj = Section(*endf71_pfns)
     assert obj.incident_energy == 2.5e5
@@ -102,3 +173,172 @@ def test_endf71_pca(endf71_pfns, endf71_eigs):
 
     realizations = obj.get_pca_realizations(10, 100)
     assert np.array_equal(realizations.shape, (10, 275))
+
+    # seeded realizations do not depend on the chunk size
+    realizations = obj.get_pca_realizations(1000, 20, seed=5)
+    assert np.array_equal(realizations, obj.get_pca_realizations(1000, 20, seed=5, chunk_size=99))
+    chunks = list(obj.iter_pca_realizations(1000, 20, seed=5, chunk_size=300))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+    assert np.array_equal(np.concatenate(chunks), realizations)
+
+
+def test_endf71_truncated_pca(endf71_pfns):
+    obj = Section(*endf71_pfns)
+    assert obj.eig_info["method"] == "full"
+    eig_vals = obj.eig_vals
+
+    obj.get_eigenvalues(k=20, method="full")
+    assert len(obj.eig_vals) == 20
+    assert np.array_equal(obj.eig_vals, eig_vals[:20])
+    assert obj.eig_info["num_eigenpairs"] == 20
+    assert obj.eig_info["residual"] < 1e-10
+
+    obj.get_eigenvalues(variance_fraction=0.9999, method="randomized", seed=0)
+    assert obj.eig_info["method"] == "randomized"
+    assert obj.eig_info["explained_variance"] >= 0.9999
+    assert np.allclose(obj.reconstruct_covariance(), obj.abs_covariance_matrix)
+
+
+def test_nubar_452_propagate(nubar_test_452):
+    obj = Section(*nubar_test_452)
+    sensitivities = np.random.default_rng(4).normal(size=(10, obj.num_groups))
+    relative = np.array([s @ obj.covariance_matrix @ s for s in sensitivities])
+    absolute = np.array([s @ obj.abs_covariance_matrix @ s for s in sensitivities])
+
+    assert np.allclose(obj.propagate(sensitivities), relative)
+    assert np.allclose(obj.propagate(sensitivities, relative=False), absolute)
+    assert np.isclose(obj.propagate(sensitivities[0]), relative[0])
+    assert "eig_vals" not in obj.__dict__.keys()
+    assert np.allclose(obj.propagate(sensitivities, method="eig"), relative)
+    assert np.allclose(obj.propagate(sensitivities, relative=False, method="eig"), absolute)
+
+    # the evaluated matrix is only positive semi-definite
+    with pytest.raises(ValueError):
+        obj.propagate(sensitivities, method="cholesky")
+    covariance = np.asarray(obj.covariance_matrix) + np.diag(obj.uncertainty**2)
+    positive = Section.from_arrays(
+        obj.MAT, obj.MF, obj.MT, obj.group_boundaries, obj.mean_values, covariance
+    )
+    assert np.allclose(
+        positive.propagate(sensitivities, method="cholesky"),
+        positive.propagate(sensitivities, method="direct"),
+    )
+
+    full = obj.propagate(sensitivities, full_covariance=True)
+    assert np.allclose(full, sensitivities @ obj.covariance_matrix @ sensitivities.T)
+
+    # sensitivities on the groups of the section are unchanged
+    assert np.allclose(obj.propagate(sensitivities, energy_grid=obj.group_boundaries), relative)
+
+    # one sensitivity on a coarse group is split by lethargy
+    grid = obj.group_boundaries[[0, -1]]
+    split = np.diff(np.log(obj.group_boundaries)) / np.log(grid[1] / grid[0])
+    assert np.isclose(
+        obj.propagate([1.0], energy_grid=grid), split @ obj.covariance_matrix @ split
+    )
+
+    with pytest.raises(ValueError):
+        obj.propagate(sensitivities[:, 1:])
+    with pytest.raises(ValueError):
+        obj.propagate(sensitivities, method="monte carlo")
+
+
+def test_nubar_452_propagate_truncated(nubar_test_452):
+    obj = Section(*nubar_test_452)
+    sensitivities = np.ones(obj.num_groups)
+    direct = obj.propagate(sensitivities, method="direct")
+
+    # "auto" does not use truncated eigenpairs
+    obj.get_eigenvalues(k=3)
+    assert len(obj.eig_vals) == 3
+    assert np.isclose(obj.propagate(sensitivities), direct)
+    with pytest.warns(UserWarning, match="truncated"):
+        truncated = obj.propagate(sensitivities, method="eig")
+    leading = sensitivities / obj.mean_values @ obj.eig_vects
+    assert np.isclose(truncated, np.sum(obj.eig_vals * leading**2))
+    assert truncated < direct
+
+    # but it does use all of them
+    obj.get_eigenvalues()
+    assert np.isclose(obj.propagate(sensitivities), direct)
+
+
+def test_nubar_452_collapse(nubar_test_452):
+    obj = Section(*nubar_test_452)
+    boundaries = obj.group_boundaries[[0, 10, 20, 30]]
+    collapsed = obj.collapse(boundaries)
+    assert collapsed.num_groups == 3
+    assert collapsed.MT == 452
+    assert np.array_equal(collapsed.group_boundaries, boundaries)
+
+    # nested groups are averaged over lethargy
+    widths = np.diff(np.log(obj.group_boundaries))
+    for g in range(3):
+        fine = slice(10 * g, 10 * (g + 1))
+        mean = np.sum(obj.mean_values[fine] * widths[fine]) / np.sum(widths[fine])
+        assert np.isclose(collapsed.mean_values[g], mean)
+
+    # collapsing onto the same groups changes nothing
+    same = obj.collapse(obj.group_boundaries)
+    assert np.allclose(same.mean_values, obj.mean_values)
+    assert np.allclose(same.covariance_matrix, obj.covariance_matrix)
+
+    # the sum of the groups has the same uncertainty either way
+    flux = np.random.default_rng(2).random(obj.num_groups)
+    collapsed = obj.collapse(boundaries, flux)
+    sensitivity = np.zeros((1, 3))
+    sensitivity[0, 1] = 1.0
+    fine = np.zeros((1, obj.num_groups))
+    fine[0, 10:20] = flux[10:20] / np.sum(flux[10:20])
+    assert np.isclose(
+        collapsed.propagate(sensitivity, relative=False)[0],
+        obj.propagate(fine, relative=False)[0],
+    )
+
+
+def test_pfns_collapse(endf71_pfns):
+    obj = Section(*endf71_pfns, storage="sparse")
+    collapsed = obj.collapse([1e-5, 1e6, 3e7])
+    assert collapsed.incident_energy == obj.incident_energy
+    assert np.isclose(np.sum(collapsed.mean_values), np.sum(obj.mean_values))
+
+
+def test_nubar_452_window(nubar_test_452):
+    obj = Section(*nubar_test_452, lower_limit=1e3, upper_limit=1e6)
+    reference = Section(*nubar_test_452, lower_limit=1e2, upper_limit=1e5)
+    obj.uncertainty
+    obj.eig_vals
+
+    # the window can be wider than the section, and is cut from the parsed arrays
+    window = obj.window(1e2, 1e5)
+    assert np.array_equal(window.group_boundaries, reference.group_boundaries)
+    assert np.array_equal(window.mean_values, reference.mean_values)
+    assert np.array_equal(window.covariance_matrix, reference.covariance_matrix)
+    assert np.shares_memory(window.covariance_matrix, obj.covariance_matrix)
+    assert "uncertainty" not in window.__dict__.keys()
+    assert np.allclose(window.eig_vals, reference.eig_vals)
+
+    # the cached quantities of a window inside the section are reused
+    inner = obj.window(1e4, 1e5)
+    assert np.shares_memory(inner.uncertainty, obj.uncertainty)
+    assert "eig_vals" not in inner.__dict__.keys()
+    assert np.allclose(inner.uncertainty, Section(*nubar_test_452, 1e4, 1e5).uncertainty)
+
+    full = obj.window()
+    assert full.num_groups == 30
+    assert np.array_equal(full.covariance_matrix, Section(*nubar_test_452).covariance_matrix)
+
+
+def test_nubar_452_packed_window(nubar_test_452):
+    reference = Section(*nubar_test_452, lower_limit=1e2, upper_limit=1e5)
+    for storage in ("packed", "sparse"):
+        obj = Section(*nubar_test_452, lower_limit=1e3, storage=storage)
+        obj.correlation_matrix
+        window = obj.window(1e2, 1e5)
+        assert np.array_equal(np.asarray(window.covariance_matrix), reference.covariance_matrix)
+        inner = obj.window(1e4, 1e5)
+        assert "correlation_matrix" in inner.__dict__.keys()
+        assert np.allclose(
+            np.asarray(inner.correlation_matrix),
+            Section(*nubar_test_452, 1e4, 1e5).correlation_matrix,
+        )
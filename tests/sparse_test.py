@@ -0,0 +1,62 @@
+import pytest
+import numpy as np
+from pyerr._sparse import CSRMatrix
+
+
+@pytest.fixture
+def banded():
+    rng = np.random.default_rng(3)
+    matrix = rng.normal(size=(400, 400))
+    matrix = matrix + matrix.T
+    rows, columns = np.indices(matrix.shape)
+    matrix[np.abs(rows - columns) > 20] = 0.0
+    matrix[350:, :] = 0.0
+    matrix[:, 350:] = 0.0
+    return matrix
+
+
+def from_dense(matrix):
+    rows, columns = np.nonzero(matrix)
+    return CSRMatrix.from_triplets(rows, columns, matrix[rows, columns], matrix.shape)
+
+
+def test_from_triplets(banded):
+    sparse = from_dense(banded)
+    assert sparse.nnz == np.count_nonzero(banded) + 50
+    assert np.array_equal(np.asarray(sparse), banded)
+    assert np.array_equal(sparse.diagonal(), np.diag(banded))
+
+    # unsorted triplets with a repeated element keep the last value
+    sparse = CSRMatrix.from_triplets([2, 0, 2, 1], [0, 1, 0, 1], [5.0, 0.0, 7.0, 3.0], (3, 3))
+    assert np.array_equal(sparse.todense(), [[0, 0, 0], [0, 3, 0], [7, 0, 0]])
+    assert sparse.nnz == 4
+
+
+def test_products(banded):
+    sparse = from_dense(banded)
+    vector = np.linspace(-1, 1, 400)
+    block = np.arange(1200.0).reshape((400, 3))
+    assert np.allclose(sparse @ vector, banded @ vector)
+    assert np.allclose(sparse @ block, banded @ block)
+    assert np.allclose(block.T @ sparse, block.T @ banded)
+    assert np.array_equal(np.asarray(sparse.transpose()), banded.T)
+
+
+def test_scale_and_window(banded):
+    sparse = from_dense(banded)
+    left = np.linspace(1, 2, 400)
+    right = np.linspace(3, 1, 400)
+    assert np.allclose(np.asarray(sparse.scale(left, right)), banded * np.outer(left, right))
+
+    window = sparse.window(100, 380)
+    assert window.shape == (280, 280)
+    assert np.array_equal(np.asarray(window), banded[100:380, 100:380])
+
+    window.fill_diagonal(1.0)
+    assert np.all(window.diagonal() == 1.0)
+
+
+def test_to_scipy(banded):
+    pytest.importorskip("scipy")
+    sparse = from_dense(banded)
+    assert np.array_equal(sparse.to_scipy().toarray(), banded)
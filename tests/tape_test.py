@@ -0,0 +1,101 @@
+import os
+import json
+import pickle
+import pytest
+import ENDFtk
+from pathlib import Path
+from pyerr._tape import TapeIndex, INDEX_SUFFIX
+
+
+@pytest.fixture(params=["nubar_example.txt", "u235_endf71.txt"])
+def tape_file(request):
+    return Path(__file__).parent / "files" / request.param
+
+
+def test_matches_endftk(tape_file):
+    tape = ENDFtk.tree.Tape.from_file(str(tape_file))
+    with TapeIndex(tape_file) as index:
+        assert index.material_numbers == list(tape.material_numbers)
+        for mat in tape.material_numbers:
+            material = tape.material(mat)
+            assert index.file_numbers(mat) == list(material.file_numbers)
+            for mf in material.file_numbers:
+                assert index.section_numbers(mat, mf) == list(material.file(mf).section_numbers)
+                for mt in material.file(mf).section_numbers:
+                    assert index.content(mat, mf, mt) == material.file(mf).section(mt).content
+
+
+def test_nubar_sections():
+    filename = Path(__file__).parent / "files" / "nubar_example.txt"
+    index = TapeIndex(filename)
+    assert index.section_numbers(9237, 33) == [452, 455, 456]
+    lines = index.lines(9237, 3, 452)
+    assert lines[0][66:75] == "9237 3452"
+    assert lines[-2][66:75] == "9237 3  0"
+    assert lines[-1] == ""
+    with pytest.raises(KeyError):
+        index.content(9237, 3, 18)
+
+    # stored offsets are used without scanning the tape
+    copy = TapeIndex(filename, index.sections)
+    assert copy.content(9237, 33, 456) == index.content(9237, 33, 456)
+
+    # the memory map is opened again when the index is unpickled
+    copy = pickle.loads(pickle.dumps(index))
+    assert copy.sections == index.sections
+    assert copy.content(9237, 33, 456) == index.content(9237, 33, 456)
+
+
+def test_not_a_tape(tmp_path):
+    filename = tmp_path / "empty.txt"
+    filename.write_text("")
+    with pytest.raises(ValueError):
+        TapeIndex(filename)
+    filename.write_text("not an ENDF tape\nat all")
+    with pytest.raises(ValueError):
+        TapeIndex(filename)
+
+
+@pytest.fixture
+def two_materials(tmp_path):
+    files = Path(__file__).parent / "files"
+    filename = tmp_path / "tape30"
+    filename.write_bytes(
+        (files / "nubar_example.txt").read_bytes() + (files / "u235_endf71.txt").read_bytes()
+    )
+    return filename
+
+
+def test_two_materials(two_materials):
+    index = TapeIndex(two_materials)
+    assert index.material_numbers == [9237, 9228]
+    assert index.file_numbers(9228) == [1, 5, 35]
+    assert index.lines(9228, 5, 18)[0][66:75] == "9228 5 18"
+
+
+def test_index_file(two_materials, monkeypatch):
+    index = TapeIndex.open(two_materials)
+    index_file = Path(str(two_materials) + INDEX_SUFFIX)
+    assert index_file.exists()
+
+    # the index file is read instead of scanning the tape again
+    def scan(self):
+        raise AssertionError("the tape was scanned")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(TapeIndex, "scan", scan)
+        again = TapeIndex.open(two_materials)
+    assert again.sections == index.sections
+    assert again.content(9228, 35, 18) == index.content(9228, 35, 18)
+
+    # a changed tape is scanned again
+    with open(two_materials, "ab") as f:
+        f.write(b"\n")
+    changed = TapeIndex.open(two_materials)
+    assert changed.sections == index.sections
+    assert json.loads(index_file.read_text())["stamp"][0] == os.path.getsize(two_materials)
+
+    # without an index file nothing is written
+    index_file.unlink()
+    TapeIndex.open(two_materials, index_file=None)
+    assert not index_file.exists()
@@ -0,0 +1,86 @@
+import pytest
+import numpy as np
+from pyerr._packed import PackedSymmetricMatrix
+from pyerr._sparse import CSRMatrix
+from pyerr._validation import (
+    CovarianceError,
+    CovarianceWarning,
+    validate_covariance,
+    repair_covariance,
+    apply_policy,
+)
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(3)
+    a = rng.normal(size=(40, 40))
+    return a @ a.T / 40 + np.eye(40) * 0.1
+
+
+def test_valid(matrix):
+    report = validate_covariance(matrix, "test", eigenvalues=True)
+    assert report.ok
+    assert report.num_negative_eigenvalues == 0
+    assert report.min_eigenvalue > 0
+    assert "passed" in report.summary()
+    assert apply_policy(matrix)[0] is matrix
+
+
+def test_storage(matrix):
+    matrix[3, :] = matrix[:, 3] = 0.0
+    packed = PackedSymmetricMatrix.from_dense(matrix)
+    rows, columns = np.nonzero(matrix)
+    sparse = CSRMatrix.from_triplets(rows, columns, matrix[rows, columns], matrix.shape)
+    for stored in (matrix, packed, sparse):
+        report = validate_covariance(stored)
+        assert report.bad_diagonal.tolist() == [3]
+        assert report.max_asymmetry == 0
+        assert report.num_bad_correlations == 0
+
+    repaired = repair_covariance(packed, validate_covariance(packed))
+    assert isinstance(repaired, PackedSymmetricMatrix)
+    repaired = repair_covariance(sparse, validate_covariance(sparse))
+    assert isinstance(repaired, CSRMatrix)
+    assert np.allclose(np.asarray(repaired), matrix)
+
+
+def test_bad_matrix(matrix):
+    matrix[0, 1] *= 1.5
+    matrix[2, 5] = matrix[5, 2] = 2 * np.sqrt(matrix[2, 2] * matrix[5, 5])
+    report = validate_covariance(matrix, "MAT1 MF33 MT1")
+    assert report.max_asymmetry > 0
+    assert report.num_bad_correlations == 2
+    assert report.max_abs_correlation == pytest.approx(2)
+    assert len(report.issues()) == 2
+    assert report.as_dict()["num_bad_correlations"] == 2
+
+    with pytest.raises(CovarianceError) as error:
+        apply_policy(matrix.copy(), "raise", "MAT1 MF33 MT1")
+    assert "MAT1 MF33 MT1" in str(error.value)
+    assert error.value.report.num_bad_correlations == 2
+
+    with pytest.warns(CovarianceWarning):
+        kept, report = apply_policy(matrix.copy(), "warn")
+    assert np.array_equal(kept, matrix)
+
+    clipped, report = apply_policy(matrix.copy(), "clip")
+    assert len(report.repairs) == 2
+    assert validate_covariance(clipped).ok
+
+    with pytest.raises(ValueError):
+        apply_policy(matrix, "ignore")
+
+
+def test_nearest_psd(matrix):
+    values, vectors = np.linalg.eigh(matrix)
+    values[:3] = -0.5
+    indefinite = (vectors * values) @ vectors.T
+    indefinite = (indefinite + indefinite.T) / 2
+    assert validate_covariance(indefinite).ok
+    report = validate_covariance(indefinite, eigenvalues=True)
+    assert report.num_negative_eigenvalues == 3
+
+    repaired, report = apply_policy(indefinite, "nearest_psd", eigenvalues=True)
+    assert np.min(np.linalg.eigvalsh(repaired)) > -1e-12
+    assert validate_covariance(repaired, eigenvalues=True).ok
@@ -1,5 +1,6 @@
 import pytest
 import ENDFtk
+import numpy as np
 from pathlib import Path
 from pyerr.base import Values
 from pyerr import EnergyGroupValues
@@ -32,3 +33,15 @@ def test_energies_U235_ENDF81(u235_endf81):
     obj = EnergyGroupValues(lines, 30)
     assert obj.parsed_values[0] == 0.000139
     assert obj.parsed_values[-1] == 17000000.0
+
+
+def test_engines_U235_ENDF81(u235_endf81):
+    file1 = u235_endf81.file(1)
+    energy_groups = file1.section(451)
+    lines = energy_groups.content.split("\n")
+    lines = lines[2:-2]
+    obj = Values(lines)
+    reference = Values(lines, engine="fortranformat")
+    assert np.array_equal(obj.parsed_values, reference.parsed_values)
+    with pytest.raises(ValueError):
+        Values(lines, engine="fortran")